@@ -0,0 +1,189 @@
+"""
+    Frame time benchmark runner
+
+    Runs scripted GameScene scenarios headless (with rendering) for a fixed number of frames and
+    reports frame time percentiles, throughput and an FPS versus object count curve as JSON.
+
+    Usage: python -m benchmarks.runner [--frames N] [--count N] [--ecs] [--output results.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# The report can go to stdout so pygame mustn't print its banner there (set before pygame is imported)
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import spacerocks
+
+from benchmarks import scenarios
+from scenes import level
+
+
+class BenchmarkRunner(object):
+
+    DEFAULT_FRAMES = 300
+    DEFAULT_WARMUP_FRAMES = 30
+    DEFAULT_CURVE_COUNTS = [50, 100, 200, 400, 800]
+
+    def __init__(self, frames=DEFAULT_FRAMES, warmup_frames=DEFAULT_WARMUP_FRAMES, seed=0, render=True, ecs=False):
+
+        """
+            :param frames:          (int) Number of timed frames per scenario
+            :param warmup_frames:   (int) Untimed frames run before timing starts (fills caches and pools)
+            :param seed:            (int) Random seed used for every scenario
+            :param render:          (bool) Include drawing the scene in the frame time
+            :param ecs:             (bool) Run explosions and floating text as ECS entities
+        """
+
+        self._frames = frames
+        self._warmup_frames = warmup_frames
+        self._seed = seed
+        self._ecs = ecs
+
+        self._game = spacerocks.Spacerocks(headless=True)
+        self._game.set_render_enabled(render)
+
+        self._scene = None
+
+    @property
+    def game(self):
+        return self._game
+
+    def run_scenario(self, scenario):
+        self._game.set_seed(self._seed)
+
+        # Return the previous scenario's pooled sprites so pool sizes and memory don't carry over
+        if self._scene is not None:
+            self._scene.clear()
+
+        scene = level.GameScene(self._game, use_ecs=self._ecs)
+        self._scene = scene
+        scenario.setup(scene)
+
+        self._game.set_active_scene(scene)
+
+        for frame_index in range(self._warmup_frames):
+            scenario.frame(scene, frame_index)
+            self._game.step()
+
+        frame_times = []
+        object_counts = []
+        culled_counts = []
+
+        start_time = time.perf_counter()
+
+        for frame_index in range(self._warmup_frames, self._warmup_frames + self._frames):
+            frame_start = time.perf_counter()
+
+            scenario.frame(scene, frame_index)
+            self._game.step()
+
+            frame_times.append((time.perf_counter() - frame_start) * 1000.0)
+            object_counts.append(scene.object_count)
+            culled_counts.append(scene.culled_count)
+
+        elapsed = time.perf_counter() - start_time
+
+        result = scenario.describe()
+        result.update(BenchmarkRunner.get_frame_time_stats(frame_times))
+        result.update({
+            'frames': self._frames,
+            'elapsed_seconds': elapsed,
+            'frames_per_second': self._frames / elapsed if elapsed else 0.0,
+            'mean_object_count': sum(object_counts) / len(object_counts),
+            'max_object_count': max(object_counts),
+            'mean_culled_count': sum(culled_counts) / len(culled_counts),
+        })
+
+        return result
+
+    def run_scaling_curve(self, counts=None):
+
+        """
+            Measures FPS for asteroid fields of increasing size
+
+            :return:    (dict[]) One entry per count with the object count and FPS
+        """
+
+        curve = []
+
+        for count in counts or BenchmarkRunner.DEFAULT_CURVE_COUNTS:
+            result = self.run_scenario(scenarios.AsteroidField(count, name='curve_{0}'.format(count)))
+
+            curve.append({
+                'asteroids': count,
+                'mean_object_count': result['mean_object_count'],
+                'frames_per_second': result['frames_per_second'],
+                'p95_ms': result['p95_ms'],
+            })
+
+        return curve
+
+    def run(self, scenario_list=None, curve_counts=None):
+        results = [self.run_scenario(scenario) for scenario in scenario_list or scenarios.get_default_scenarios()]
+
+        return {
+            'timestamp': time.time(),
+            'frames': self._frames,
+            'warmup_frames': self._warmup_frames,
+            'seed': self._seed,
+            'ecs': self._ecs,
+            'python': sys.version.split()[0],
+            'scenarios': results,
+            'scaling_curve': self.run_scaling_curve(curve_counts),
+        }
+
+    @staticmethod
+    def get_frame_time_stats(frame_times):
+        ordered = sorted(frame_times)
+
+        return {
+            'mean_ms': sum(ordered) / len(ordered),
+            'min_ms': ordered[0],
+            'max_ms': ordered[-1],
+            'p50_ms': BenchmarkRunner.get_percentile(ordered, 50),
+            'p95_ms': BenchmarkRunner.get_percentile(ordered, 95),
+            'p99_ms': BenchmarkRunner.get_percentile(ordered, 99),
+        }
+
+    @staticmethod
+    def get_percentile(ordered, percentile):
+        # Nearest rank percentile of an already sorted list
+        index = max(0, min(len(ordered) - 1, int(round(percentile / 100.0 * len(ordered) + 0.5)) - 1))
+
+        return ordered[index]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Spacerocks frame time benchmarks')
+    parser.add_argument('--frames', type=int, default=BenchmarkRunner.DEFAULT_FRAMES)
+    parser.add_argument('--warmup', type=int, default=BenchmarkRunner.DEFAULT_WARMUP_FRAMES)
+    parser.add_argument('--count', type=int, default=200, help='Number of asteroids in each scenario')
+    parser.add_argument('--curve', type=int, nargs='*', default=BenchmarkRunner.DEFAULT_CURVE_COUNTS,
+                        help='Asteroid counts for the FPS versus object count curve')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-render', action='store_true', help='Exclude drawing from the frame time')
+    parser.add_argument('--ecs', action='store_true', help='Run explosions and floating text as ECS entities')
+    parser.add_argument('--output', help='Write the JSON report to a file instead of stdout')
+
+    args = parser.parse_args(argv)
+
+    # Anything the game prints while running goes to stderr so a report written to stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        runner = BenchmarkRunner(args.frames, args.warmup, args.seed, not args.no_render, args.ecs)
+        report = runner.run(scenarios.get_default_scenarios(args.count), args.curve)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
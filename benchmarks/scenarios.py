@@ -0,0 +1,142 @@
+import abc
+
+from entities import asteroid
+from player import weapons
+
+
+class Scenario(abc.ABC):
+    """
+        Base class for scripted benchmark scenarios. A scenario prepares a freshly created GameScene
+        and can then drive it (e.g fire weapons, spawn explosions) before each frame
+    """
+
+    def __init__(self, name, parallax=True):
+
+        """
+            :param name:        (str) Name used in the benchmark report
+            :param parallax:    (bool) False to disable all parallax background layers
+        """
+
+        self._name = name
+        self._parallax = parallax
+
+    @property
+    def name(self):
+        return self._name
+
+    def setup(self, scene):
+        scene.clear_asteroids()
+
+        if not self._parallax:
+            scene.background.set_active_layer_count(0)
+
+    def frame(self, scene, frame_index):
+        pass
+
+    def describe(self):
+        return {'name': self._name, 'parallax': self._parallax}
+
+
+class AsteroidField(Scenario):
+    """
+        A field of asteroids of a single type (or random types) drifting and rotating
+    """
+
+    def __init__(self, count, asteroid_type=None, parallax=True, name=None):
+        if name is None:
+            name = 'asteroids_{0}_{1}'.format(AsteroidField.get_type_name(asteroid_type), count)
+
+        super().__init__(name, parallax)
+
+        self._count = count
+        self._asteroid_type = asteroid_type
+
+    @property
+    def count(self):
+        return self._count
+
+    def setup(self, scene):
+        super().setup(scene)
+        scene.spawn_asteroids(self._count, self._asteroid_type)
+
+    def describe(self):
+        description = super().describe()
+        description.update({'asteroids': self._count, 'asteroid_type': AsteroidField.get_type_name(self._asteroid_type)})
+
+        return description
+
+    @staticmethod
+    def get_type_name(asteroid_type):
+        return {
+            asteroid.Asteroid.TYPE_TINY: 'tiny',
+            asteroid.Asteroid.TYPE_SMALL: 'small',
+            asteroid.Asteroid.TYPE_MEDIUM: 'medium',
+            asteroid.Asteroid.TYPE_LARGE: 'large',
+        }.get(asteroid_type, 'mixed')
+
+
+class RadialFire(AsteroidField):
+    """
+        Continuous RadialShot fire from the player ship into an asteroid field
+    """
+
+    def __init__(self, count, fire_interval=5, parallax=True):
+        super().__init__(count, None, parallax, 'radial_fire_{0}'.format(count))
+
+        self._fire_interval = fire_interval
+
+    def setup(self, scene):
+        super().setup(scene)
+
+        ship = scene.player_ship
+        ship.set_secondary_weapon(weapons.RadialShot(scene.game, ship))
+
+    def frame(self, scene, frame_index):
+        if frame_index % self._fire_interval == 0:
+            scene.player_ship.fire_weapon(scene.player_ship.SECONDARY_WEAPON)
+
+        # Keep the field topped up as asteroids are destroyed
+        if scene.asteroid_count < self._count // 2:
+            scene.spawn_asteroids(self._count - scene.asteroid_count)
+
+
+class MassExplosions(Scenario):
+    """
+        Bursts of explosions spread across the screen
+    """
+
+    def __init__(self, count, burst_interval=10, parallax=True):
+        super().__init__('mass_explosions_{0}'.format(count), parallax)
+
+        self._count = count
+        self._burst_interval = burst_interval
+
+    def frame(self, scene, frame_index):
+        if frame_index % self._burst_interval == 0:
+            rect = scene.rect
+
+            for n in range(self._count):
+                scene.spawn_explosion(rect.left + (rect.width * n) // self._count,
+                                      rect.top + (rect.height * ((n * 7) % self._count)) // self._count)
+
+    def describe(self):
+        description = super().describe()
+        description.update({'explosions': self._count, 'burst_interval': self._burst_interval})
+
+        return description
+
+
+def get_default_scenarios(count=200):
+    scenarios = []
+
+    for asteroid_type in range(asteroid.Asteroid.TYPE_FIRST, asteroid.Asteroid.TYPE_LAST + 1):
+        scenarios.append(AsteroidField(count, asteroid_type))
+
+    scenarios.append(RadialFire(count))
+    scenarios.append(MassExplosions(count // 4))
+
+    for parallax in [True, False]:
+        scenarios.append(AsteroidField(count, None, parallax,
+                                       'parallax_{0}'.format('on' if parallax else 'off')))
+
+    return scenarios
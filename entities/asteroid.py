@@ -1,9 +1,6 @@
-import random
 
 from entities import entity
 from gamelib import sprite
-from gamelib import spritesheet
-from gamelib import utils
 
 
 class Factory(object):
@@ -44,27 +41,29 @@ class Factory(object):
     _TILE_SET = 'asteroid_set_01'
 
     _game = None
+    _random = None
     _asteroid_tiles = None
     _asteroid_config = {}
 
     @classmethod
     def init(cls, game):
         if cls._game is None:
-            cls._asteroid_tiles = spritesheet.SpriteSheet(game.image_cache.get(Factory._TILE_SET),
-                                                          Factory._TILE_WIDTH, Factory._TILE_HEIGHT)
+            cls._asteroid_tiles = game.image_cache.get_sheet(Factory._TILE_SET, Factory._TILE_WIDTH,
+                                                             Factory._TILE_HEIGHT)
 
             cls._asteroid_config[Asteroid.TYPE_LARGE] = Factory.Config(1.00, 200, 60, 2, Asteroid.TYPE_MEDIUM)
             cls._asteroid_config[Asteroid.TYPE_MEDIUM] = Factory.Config(0.80, 150, 40, 2, Asteroid.TYPE_SMALL)
             cls._asteroid_config[Asteroid.TYPE_SMALL] = Factory.Config(0.60, 100, 20, 2, Asteroid.TYPE_TINY)
             cls._asteroid_config[Asteroid.TYPE_TINY] = Factory.Config(0.40, 50, 10, 0, 0)
 
+            cls._random = game.random('asteroids')
             cls._game = game
 
     @classmethod
     def create(cls, x, y, asteroid_type=None):
 
         if asteroid_type is None or not (Asteroid.TYPE_FIRST <= asteroid_type <= Asteroid.TYPE_LAST):
-            asteroid_type = random.randrange(Asteroid.TYPE_FIRST, Asteroid.TYPE_LAST + 1)
+            asteroid_type = cls._random.randrange(Asteroid.TYPE_FIRST, Asteroid.TYPE_LAST + 1)
 
         return Asteroid(x, y, cls._asteroid_tiles, asteroid_type, cls._asteroid_config[asteroid_type])
 
@@ -89,23 +88,33 @@ class Asteroid(entity.Entity):
     _COLLISION_RADIUS = 44
 
     def __init__(self, x, y, frames, asteroid_type, config):
-        super().__init__(x, y, frames, 0, self.choose_velocity(Asteroid._MIN_VELOCITY, Asteroid._MAX_VELOCITY))
+        # Speeds and sizes are designed for the window resolution and scaled to the render resolution
+        self._render_scale = Factory._game.render_scale
+
+        super().__init__(x, y, frames, 0,
+                         self.choose_velocity(Asteroid._MIN_VELOCITY, Asteroid._MAX_VELOCITY, Factory._random) *
+                         self._render_scale)
 
         self._asteroid_type = asteroid_type
         self._config = config
 
-        self.set_rotation_velocity(self.choose_range(Asteroid._MIN_ROTATE_VELOCITY, Asteroid._MAX_ROTATE_VELOCITY))
+        self.set_rotation_velocity(self.choose_range(Asteroid._MIN_ROTATE_VELOCITY, Asteroid._MAX_ROTATE_VELOCITY,
+                                                     Factory._random))
         self.set_frame_animator(sprite.LinearFrameAnimator(Asteroid._FRAME_SPEED, True))
         self.set_scale(config.scale)
 
     @property
     def entity_type(self):
-        # FIXME: Return the correct subtype
-        return entity.Entity.TYPE_ASTEROID_SMALL
+        # Asteroid sizes map on to the entity subtypes in order (tiny asteroids are TYPE_ASTEROID_SMALL)
+        return entity.Entity.TYPE_ASTEROID_SMALL + self._asteroid_type
+
+    @property
+    def asteroid_type(self):
+        return self._asteroid_type
 
     @property
     def radius(self):
-        return int(Asteroid._COLLISION_RADIUS * self.scale)
+        return int(Asteroid._COLLISION_RADIUS * self.scale * self._render_scale)
 
     @property
     def score(self):
@@ -114,11 +123,11 @@ class Asteroid(entity.Entity):
     def reflect(self):
         self.set_velocity(self.velocity.x * -1, self.velocity.y * -1)
 
-    def update(self, scene, dt):
-        super().update(scene, dt)
+    def scene_add(self, scene, layer):
+        super().scene_add(scene, layer)
 
         # If the asteroid runs off the edge of the screen it should warp to the opposite side
-        self.rect.center = utils.clamp_point_to_rect(self.rect.center, scene.rect)
+        self.set_wrap_rect(scene.rect)
 
     def get_shards(self):
         shards = []
@@ -0,0 +1,84 @@
+from gamelib import particles
+
+
+class Factory(object):
+    """
+        Particle effects: asteroid debris and sparks when an asteroid is destroyed and the ships engine exhaust
+    """
+
+    _DEBRIS_SPEED = (40, 220)           # Pixels per second
+    _SPARK_SPEED = (120, 420)
+    _EXHAUST_SPEED = (120, 240)
+    _EXHAUST_RATE = 90                  # Particles per second while thrusting
+    _EXHAUST_SPREAD = 25                # Degrees
+
+    _game = None
+    _render_scale = 1.0
+    _random = None
+
+    _debris = None
+    _sparks = None
+    _exhaust = None
+
+    @classmethod
+    def init(cls, game):
+        if cls._game is None:
+            cls._render_scale = game.render_scale
+
+            scale = cls._render_scale
+
+            cls._debris = particles.ParticleClass.create(2.0 * scale, [(150, 140, 130), (90, 80, 75), (40, 35, 35)],
+                                                         drag=0.6)
+            cls._sparks = particles.ParticleClass.create(1.5 * scale, [(255, 255, 200), (255, 180, 60), (120, 30, 0)],
+                                                         drag=1.5, additive=True)
+            cls._exhaust = particles.ParticleClass.create(2.5 * scale, [(200, 220, 255), (255, 140, 40), (60, 20, 10)],
+                                                          drag=2.0, additive=True)
+
+            cls._random = game.random('particles')
+            cls._game = game
+
+    @classmethod
+    def create_system(cls, layer):
+
+        """
+            :param layer:   (int) Scene layer to draw the particles in
+            :return:        (ParticleSystem) Particle system with the debris, spark and exhaust classes
+        """
+
+        system = particles.ParticleSystem(layer, seed=cls._random.getrandbits(32))
+
+        system.add_class(cls._debris)
+        system.add_class(cls._sparks)
+        system.add_class(cls._exhaust)
+
+        return system
+
+    @classmethod
+    def emit_asteroid_debris(cls, system, x, y, radius, velocity=(0.0, 0.0)):
+
+        """
+            :param system:      (ParticleSystem) System from create_system ()
+            :param radius:      (int) Radius of the destroyed asteroid, bigger asteroids throw out more debris
+            :param velocity:    (Vector2) Velocity of the asteroid
+        """
+
+        scale = cls._render_scale
+        count = max(8, int(radius / scale))
+
+        system.emit(0, count, x, y, (cls._DEBRIS_SPEED[0] * scale, cls._DEBRIS_SPEED[1] * scale), life=(0.6, 1.4),
+                    velocity=(velocity[0], velocity[1]), radius=radius * 0.5)
+        system.emit(1, count // 2, x, y, (cls._SPARK_SPEED[0] * scale, cls._SPARK_SPEED[1] * scale), life=(0.2, 0.5),
+                    velocity=(velocity[0], velocity[1]))
+
+    @classmethod
+    def create_thrust_emitter(cls, system):
+
+        """
+            :return:    (Emitter) Exhaust emitter for PlayerShip.set_thrust_emitter ()
+        """
+
+        scale = cls._render_scale
+
+        return particles.Emitter(system, 2, cls._EXHAUST_RATE, (cls._EXHAUST_SPEED[0] * scale,
+                                                                cls._EXHAUST_SPEED[1] * scale),
+                                 cls._EXHAUST_SPREAD, (0.15, 0.35))
@@ -23,12 +23,17 @@ class Entity(sprite.KinematicSprite):
         pass
 
     @staticmethod
-    def choose_velocity(min_velocity, max_velocity):
-        vx = Entity.choose_range(min_velocity, max_velocity)
-        vy = Entity.choose_range(min_velocity, max_velocity)
+    def choose_velocity(min_velocity, max_velocity, rng=random):
+        vx = Entity.choose_range(min_velocity, max_velocity, rng)
+        vy = Entity.choose_range(min_velocity, max_velocity, rng)
 
         return pygame.math.Vector2(vx, vy)
 
     @staticmethod
-    def choose_range(min_range, max_range):
-        return random.randrange(min_range, max_range) * random.choice([1, -1])
+    def choose_range(min_range, max_range, rng=random):
+
+        """
+            :param rng:     Random number generator (e.g a seeded stream from Game.random ())
+        """
+
+        return rng.randrange(min_range, max_range) * rng.choice([1, -1])
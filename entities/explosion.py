@@ -1,36 +1,75 @@
+from gamelib import audio
+from gamelib import pool
 from gamelib import sprite
-from gamelib import spritesheet
-from random import choice
 
 
 class Factory(object):
     TYPE_ONE = 0
     TYPE_TWO = 1
 
+    _SOUND_MAX_INSTANCES = 3
+
     _game = None
+    _random = None
     _explosion_tiles = []
     _explosion_sounds = []
+    _explosion_pool = None
 
     @classmethod
     def init(cls, game):
         if cls._game is None:
-            cls._explosion_tiles.append(spritesheet.SpriteSheet(game.image_cache.get('explosion_set_01'), 192, 192))
-            cls._explosion_tiles.append(spritesheet.SpriteSheet(game.image_cache.get('explosion_set_02'), 256, 256))
+            cls._explosion_tiles.append(game.image_cache.get_sheet('explosion_set_01', 192, 192))
+            cls._explosion_tiles.append(game.image_cache.get_sheet('explosion_set_02', 256, 256))
 
             cls._explosion_sounds.append(game.audio_cache.get('explosion1'))
             cls._explosion_sounds.append(game.audio_cache.get('explosion2'))
             cls._explosion_sounds.append(game.audio_cache.get('explosion3'))
             cls._explosion_sounds.append(game.audio_cache.get('explosion4'))
 
+            for sound in cls._explosion_sounds:
+                game.sound_manager.configure(sound, Factory._SOUND_MAX_INSTANCES, audio.SoundManager.PRIORITY_NORMAL)
+
+            cls._explosion_pool = pool.ObjectPool(Explosion, 'explosion')
+            cls._random = game.random('explosions')
             cls._game = game
 
     @classmethod
     def create(cls, x, y, type=None):
 
         if type not in [Factory.TYPE_ONE, Factory.TYPE_TWO]:
-            type = choice([Factory.TYPE_ONE, Factory.TYPE_TWO])
+            type = cls._random.choice([Factory.TYPE_ONE, Factory.TYPE_TWO])
+
+        return cls._explosion_pool.acquire(x, y, cls._explosion_tiles[type], 0.02,
+                                         cls._random.choice(cls._explosion_sounds))
+
+    @classmethod
+    def create_entity(cls, world, x, y, layer, type=None):
+
+        """
+            Creates an explosion as an ECS entity instead of a scene node (same random numbers as create ())
+
+            :param world:   (World) ECS world to add the explosion to
+            :param layer:   (int) Scene layer to draw the explosion in
+            :return:        (tuple) Entity id and the sound to play
+        """
+
+        if type not in [Factory.TYPE_ONE, Factory.TYPE_TWO]:
+            type = cls._random.choice([Factory.TYPE_ONE, Factory.TYPE_TWO])
 
-        return Explosion(x, y, cls._explosion_tiles[type], 0.02, choice(cls._explosion_sounds))
+        entity = world.create(x, y, cls._explosion_tiles[type], layer, type)
+        world.set_animation(entity, 0.02, False, True)
+
+        return entity, cls._random.choice(cls._explosion_sounds)
+
+    @classmethod
+    def get_type(cls, frames):
+
+        """
+            :param frames:  (SpriteSheet) Frames of an explosion created by the factory
+            :return:        (int) TYPE_ONE or TYPE_TWO
+        """
+
+        return next((type for type, tiles in enumerate(cls._explosion_tiles) if tiles is frames), Factory.TYPE_ONE)
 
 
 class Explosion(sprite.SceneSprite):
@@ -39,7 +78,15 @@ class Explosion(sprite.SceneSprite):
         super().__init__(x, y, frames, 0)
 
         self._sound = sound
-        self.set_frame_animator(sprite.LinearFrameAnimator(frame_speed, False, True))
+        self._frame_animator = sprite.LinearFrameAnimator(frame_speed, False, True)
+        self.set_frame_animator(self._frame_animator)
+
+    def reset(self, x, y, frames, frame_speed, sound=None):
+        self._reset_sprite(x, y, frames, 0)
+
+        self._sound = sound
+        self._frame_animator.reset(frame_speed)
+        self.set_frame_animator(self._frame_animator)
 
     @property
     def sound(self):
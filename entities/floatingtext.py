@@ -1,6 +1,8 @@
 import pygame
 
 from entities import entity
+from gamelib import glyphs
+from gamelib import pool
 
 
 class Factory(object):
@@ -9,35 +11,69 @@ class Factory(object):
 
     _game = None
     _font = None
+    _text_pool = None
 
     @classmethod
     def init(cls, game):
         if cls._game is None:
-            cls._font = game.load_font('kenvector_future_thin.ttf', 16)
+            cls._font = game.load_font('kenvector_future_thin.ttf', int(16 * game.render_scale))
+            cls._text_pool = pool.ObjectPool(FloatingText, 'floating_text')
             cls._game = game
 
     @classmethod
     def create(cls, x, y, text, color):
-        return FloatingText(x, y, text, cls._font, color, Factory.DEFAULT_VELOCITY)
+        return cls._text_pool.acquire(x, y, text, cls._font, color, Factory.DEFAULT_VELOCITY * cls._game.render_scale)
+
+    @classmethod
+    def create_entity(cls, world, x, y, text, color, layer):
+
+        """
+            Creates floating text as an ECS entity instead of a scene node
+
+            :param world:   (World) ECS world to add the text to
+            :param layer:   (int) Scene layer to draw the text in
+            :return:        (int) Entity id
+        """
+
+        velocity = Factory.DEFAULT_VELOCITY * cls._game.render_scale
+
+        entity = world.create(x, y, [glyphs.FontGlyphAtlas.get(cls._font, color).get_image(text)], layer)
+        world.set_kinematics(entity, velocity.x, velocity.y)
+        world.set_time_to_live(entity, Factory.DEFAULT_TIME_TO_LIVE)
+
+        return entity
 
 
 class FloatingText(entity.Entity):
     def __init__(self, x, y, text, font, color, velocity, time_to_live=Factory.DEFAULT_TIME_TO_LIVE):
-        super().__init__(x, y, [self._get_frame(text, font, color)], 0, velocity)
+        super().__init__(x, y, [self._get_frame(text, font, color)], 0, pygame.math.Vector2(velocity))
 
-        self._time_to_live = time_to_live
+        self._text = text
+        self._color = color
+
+        self.set_time_to_live(time_to_live)
+
+    def reset(self, x, y, text, font, color, velocity, time_to_live=Factory.DEFAULT_TIME_TO_LIVE):
+        self._reset_sprite(x, y, [self._get_frame(text, font, color)], 0)
+        self._reset_kinematics(pygame.math.Vector2(velocity))
+
+        self._text = text
+        self._color = color
+
+        self.set_time_to_live(time_to_live)
 
     @property
     def entity_type(self):
         return entity.Entity.TYPE_FLOATING_TEXT
 
-    def update(self, scene, dt):
-        super().update(scene, dt)
+    @property
+    def text(self):
+        return self._text
 
-        if self._time_to_live > 0:
-            self._time_to_live -= dt
-        else:
-            self.kill()
+    @property
+    def color(self):
+        return self._color
 
     def _get_frame(self, text, font, color):
-        return font.render(text, True, color)
+        # Rendered strings are shared, a burst of identical '+score' texts only composes the string once
+        return glyphs.FontGlyphAtlas.get(font, color).get_image(text)
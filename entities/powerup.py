@@ -1,10 +1,8 @@
 import pygame
-import random
 
 from entities import entity
+from gamelib import audio
 from gamelib import sprite
-from gamelib import spritesheet
-from gamelib import utils
 
 
 class Factory(object):
@@ -71,6 +69,7 @@ class Factory(object):
     _COLOR_WHITE = (255, 255, 255)
 
     _game = None
+    _random = None
     _frames = []
     _sounds = []
     _powerup_config = {}
@@ -78,7 +77,7 @@ class Factory(object):
     @classmethod
     def init(cls, game):
         if cls._game is None:
-            cls._frames = spritesheet.SpriteSheet(game.image_cache.get('powerup_set_01'), Factory._WIDTH, Factory._HEIGHT)
+            cls._frames = game.image_cache.get_sheet('powerup_set_01', Factory._WIDTH, Factory._HEIGHT)
 
             cls._sounds.append(game.audio_cache.get('powerup_01'))
             cls._sounds.append(game.audio_cache.get('powerup_02'))
@@ -86,22 +85,28 @@ class Factory(object):
             cls._sounds.append(game.audio_cache.get('powerup_04'))
             cls._sounds.append(game.audio_cache.get('powerup_05'))
 
+            cls._random = game.random('powerups')
+
+            # Collecting a power-up should always be heard
+            for sound in cls._sounds:
+                game.sound_manager.configure(sound, priority=audio.SoundManager.PRIORITY_HIGH)
+
             # FIXME: Python must have a nicer way to do this
-            cls._powerup_config[Factory.TYPE_POWER_YELLOW] = Factory.Config(Factory.TYPE_POWER_YELLOW, random.choice(cls._sounds), 'Yellow Power-up', '', Factory._COLOR_YELLOW)
-            cls._powerup_config[Factory.TYPE_POWER_RED] = Factory.Config(Factory.TYPE_POWER_RED, random.choice(cls._sounds), 'Red Power-up', '', Factory._COLOR_RED)
-            cls._powerup_config[Factory.TYPE_POWER_WHITE] = Factory.Config(Factory.TYPE_POWER_WHITE, random.choice(cls._sounds), 'White Power-up', '', Factory._COLOR_WHITE)
+            cls._powerup_config[Factory.TYPE_POWER_YELLOW] = Factory.Config(Factory.TYPE_POWER_YELLOW, cls._random.choice(cls._sounds), 'Yellow Power-up', '', Factory._COLOR_YELLOW)
+            cls._powerup_config[Factory.TYPE_POWER_RED] = Factory.Config(Factory.TYPE_POWER_RED, cls._random.choice(cls._sounds), 'Red Power-up', '', Factory._COLOR_RED)
+            cls._powerup_config[Factory.TYPE_POWER_WHITE] = Factory.Config(Factory.TYPE_POWER_WHITE, cls._random.choice(cls._sounds), 'White Power-up', '', Factory._COLOR_WHITE)
 
-            cls._powerup_config[Factory.TYPE_STAR_YELLOW] = Factory.Config(Factory.TYPE_STAR_YELLOW, random.choice(cls._sounds), 'Yellow Star', '', Factory._COLOR_YELLOW)
-            cls._powerup_config[Factory.TYPE_STAR_RED] = Factory.Config(Factory.TYPE_STAR_RED, random.choice(cls._sounds), 'Red Star', '', Factory._COLOR_RED)
-            cls._powerup_config[Factory.TYPE_STAR_WHITE] = Factory.Config(Factory.TYPE_STAR_WHITE, random.choice(cls._sounds), 'White Star', '', Factory._COLOR_WHITE)
+            cls._powerup_config[Factory.TYPE_STAR_YELLOW] = Factory.Config(Factory.TYPE_STAR_YELLOW, cls._random.choice(cls._sounds), 'Yellow Star', '', Factory._COLOR_YELLOW)
+            cls._powerup_config[Factory.TYPE_STAR_RED] = Factory.Config(Factory.TYPE_STAR_RED, cls._random.choice(cls._sounds), 'Red Star', '', Factory._COLOR_RED)
+            cls._powerup_config[Factory.TYPE_STAR_WHITE] = Factory.Config(Factory.TYPE_STAR_WHITE, cls._random.choice(cls._sounds), 'White Star', '', Factory._COLOR_WHITE)
 
-            cls._powerup_config[Factory.TYPE_ENERGY_YELLOW] = Factory.Config(Factory.TYPE_ENERGY_YELLOW, random.choice(cls._sounds), 'Yellow Energy', '', Factory._COLOR_YELLOW)
-            cls._powerup_config[Factory.TYPE_ENERGY_RED] = Factory.Config(Factory.TYPE_ENERGY_RED, random.choice(cls._sounds), 'Red Energy', '', Factory._COLOR_RED)
-            cls._powerup_config[Factory.TYPE_ENERGY_WHITE] = Factory.Config(Factory.TYPE_ENERGY_WHITE, random.choice(cls._sounds), 'White Energy', '', Factory._COLOR_WHITE)
+            cls._powerup_config[Factory.TYPE_ENERGY_YELLOW] = Factory.Config(Factory.TYPE_ENERGY_YELLOW, cls._random.choice(cls._sounds), 'Yellow Energy', '', Factory._COLOR_YELLOW)
+            cls._powerup_config[Factory.TYPE_ENERGY_RED] = Factory.Config(Factory.TYPE_ENERGY_RED, cls._random.choice(cls._sounds), 'Red Energy', '', Factory._COLOR_RED)
+            cls._powerup_config[Factory.TYPE_ENERGY_WHITE] = Factory.Config(Factory.TYPE_ENERGY_WHITE, cls._random.choice(cls._sounds), 'White Energy', '', Factory._COLOR_WHITE)
 
-            cls._powerup_config[Factory.TYPE_SHIELD_YELLOW] = Factory.Config(Factory.TYPE_SHIELD_YELLOW, random.choice(cls._sounds), 'Yellow Shield', '', Factory._COLOR_YELLOW)
-            cls._powerup_config[Factory.TYPE_SHIELD_RED] = Factory.Config(Factory.TYPE_SHIELD_RED, random.choice(cls._sounds), 'Red Shield', '', Factory._COLOR_RED)
-            cls._powerup_config[Factory.TYPE_SHIELD_WHITE] = Factory.Config(Factory.TYPE_SHIELD_WHITE, random.choice(cls._sounds), 'White Shield', '', Factory._COLOR_WHITE)
+            cls._powerup_config[Factory.TYPE_SHIELD_YELLOW] = Factory.Config(Factory.TYPE_SHIELD_YELLOW, cls._random.choice(cls._sounds), 'Yellow Shield', '', Factory._COLOR_YELLOW)
+            cls._powerup_config[Factory.TYPE_SHIELD_RED] = Factory.Config(Factory.TYPE_SHIELD_RED, cls._random.choice(cls._sounds), 'Red Shield', '', Factory._COLOR_RED)
+            cls._powerup_config[Factory.TYPE_SHIELD_WHITE] = Factory.Config(Factory.TYPE_SHIELD_WHITE, cls._random.choice(cls._sounds), 'White Shield', '', Factory._COLOR_WHITE)
 
             cls._game = game
 
@@ -109,7 +114,7 @@ class Factory(object):
     def create(cls, x, y, powerup_type=None):
 
         if powerup_type is None or powerup_type < 0 or powerup_type >= Factory._TYPE_COUNT:
-            powerup_type = random.randrange(Factory._TYPE_COUNT)
+            powerup_type = cls._random.randrange(Factory._TYPE_COUNT)
 
         frames = cls._frames[powerup_type * Factory._FRAME_COUNT:(powerup_type + 1) * Factory._FRAME_COUNT]
 
@@ -126,13 +131,19 @@ class PowerUp(entity.Entity):
     _COLLISION_RADIUS = 38
 
     def __init__(self, x, y, config, frames, frame_speed, time_to_live):
-        super().__init__(x, y, frames, 0, self.choose_velocity(PowerUp._MIN_VELOCITY, PowerUp._MAX_VELOCITY))
+        self._render_scale = Factory._game.render_scale
+
+        super().__init__(x, y, frames, 0,
+                         self.choose_velocity(PowerUp._MIN_VELOCITY, PowerUp._MAX_VELOCITY, Factory._random) *
+                         self._render_scale)
 
         self._config = config
-        self._time_to_live = time_to_live
+
+        self.set_time_to_live(time_to_live)
 
         self.set_frame_animator(sprite.LinearFrameAnimator(frame_speed, True))
-        self.set_rotation_velocity(self.choose_range(PowerUp._MIN_ROTATION_VELOCITY, PowerUp._MAX_ROTATION_VELOCITY))
+        self.set_rotation_velocity(self.choose_range(PowerUp._MIN_ROTATION_VELOCITY, PowerUp._MAX_ROTATION_VELOCITY,
+                                                     Factory._random))
 
     @property
     def config(self):
@@ -148,14 +159,10 @@ class PowerUp(entity.Entity):
 
     @property
     def radius(self):
-        return int(PowerUp._COLLISION_RADIUS * self.scale)
-
-    def update(self, scene, dt):
-        super().update(scene, dt)
+        return int(PowerUp._COLLISION_RADIUS * self.scale * self._render_scale)
 
-        if self._time_to_live > 0:
-            self._time_to_live -= dt
-            self.rect.center = utils.clamp_point_to_rect(self.rect.center, scene.rect)
+    def scene_add(self, scene, layer):
+        super().scene_add(scene, layer)
 
-        else:
-            self.kill()
+        # If the power-up runs off the edge of the screen it should warp to the opposite side
+        self.set_wrap_rect(scene.rect)
@@ -1,5 +1,4 @@
 from gamelib import sprite
-from gamelib import spritesheet
 
 
 class Shield(sprite.SceneSprite):
@@ -7,7 +6,6 @@ class Shield(sprite.SceneSprite):
     _TILE_HEIGHT = 224
 
     def __init__(self, x, y, image_cache):
-        super().__init__(x, y, spritesheet.SpriteSheet(image_cache.get('shield_set_01'),
-                                                       Shield._TILE_WIDTH, Shield._TILE_HEIGHT))
+        super().__init__(x, y, image_cache.get_sheet('shield_set_01', Shield._TILE_WIDTH, Shield._TILE_HEIGHT))
 
         self.set_frame_animator(sprite.LinearFrameAnimator(100, True))
@@ -4,3 +4,4 @@
 
 DEBUG_SCENE = False
 DEBUG_ASSETS = False
+DEBUG_AUDIO = False
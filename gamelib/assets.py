@@ -1,8 +1,13 @@
 import os
 import abc
+import time
 import pygame
 import gamelib
 
+from gamelib import spritesheet
+
+from concurrent import futures
+
 _DEBUG_ASSET_CACHE = gamelib.DEBUG_ASSETS and True
 
 
@@ -12,40 +17,179 @@ class AssetCache(abc.ABC):
 
         Base class for simple dictionary based asset cache and loading
 
+        Assets can be loaded eagerly (one after another), in parallel (files are decoded on a thread pool
+        and then finalized on the calling thread) or lazily (files are only decoded on the first get ()).
+        The time spent decoding and finalizing each asset is recorded in 'timings'
+
     """
 
     def __init__(self):
         self.__items = dict()
+        self.__paths = dict()
+        self.__pending = dict()
+        self.__timings = dict()
+        self.__load_time = 0.0
 
     def get(self, tag):
-        return self.__items.get(tag)
+        item = self.__items.get(tag)
+
+        if item is None and tag in self.__pending:
+            item = self.__load_pending(tag)
+
+        return item
+
+    def has(self, tag):
+        return tag in self.__items or tag in self.__pending
+
+    def release(self, tag):
+
+        """
+            Drops a loaded asset, it will be loaded again (lazily) on its next get ()
+        """
+
+        if self.__items.pop(tag, None) is not None and tag in self.__paths:
+            self.__pending[tag] = self.__paths[tag]
+
+    def get_path(self, tag):
+        return self.__paths.get(tag)
+
+    @property
+    def tags(self):
+        return list(self.__items.keys()) + list(self.__pending.keys())
+
+    @property
+    def pending_count(self):
+        return len(self.__pending)
+
+    @property
+    def timings(self):
+
+        """
+            :return:    (dict) Tag -> {'decode': seconds, 'finalize': seconds} for each asset loaded
+        """
+
+        return self.__timings
+
+    @property
+    def load_time(self):
+
+        """
+            :return:    (float) Total wall clock time spent in load () and lazy loading in seconds
+        """
+
+        return self.__load_time
+
+    def load(self, path, lazy=False, workers=0):
+
+        """
+            Loads all supported files in a directory
+
+            :param path:        (str) Directory to load
+            :param lazy:        (bool) Only record the files, each asset is decoded on its first get ()
+            :param workers:     (int) Number of threads used to decode files in parallel (0 to decode
+                                on the calling thread), ignored when lazy is True
+        """
 
-    def load(self, path):
+        start = time.perf_counter()
+        files = []
 
         for filename in os.listdir(path):
-            if os.path.isfile(os.path.join(path, filename)):
-                item = self._loadfile(path, filename)
+            if os.path.isfile(os.path.join(path, filename)) and self._accepts(filename):
+                files.append((os.path.splitext(filename)[0].lower(), os.path.join(path, filename)))
 
-                if item:
-                    tag = os.path.splitext(filename)[0].lower()
-                    self.__items[tag] = item
+        for tag, filepath in files:
+            self.__paths[tag] = filepath
 
-                    if _DEBUG_ASSET_CACHE:
-                        print('DBG: AssetCache::load (): Filename=', filename, 'Tag=', tag)
+        if lazy:
+            for tag, filepath in files:
+                self.__pending[tag] = filepath
+        elif workers > 0:
+            with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                decoded = list(executor.map(lambda file: self.__decode(*file), files))
+
+            # Finalizing (e.g converting to the display format) is done on the calling thread
+            for (tag, filepath), item in zip(files, decoded):
+                self.__finalize(tag, filepath, item)
+        else:
+            for tag, filepath in files:
+                self.__finalize(tag, filepath, self.__decode(tag, filepath))
+
+        self.__load_time += time.perf_counter() - start
+
+        if _DEBUG_ASSET_CACHE:
+            print('DBG: AssetCache::load (): Path=', path, 'Files=', len(files), 'Lazy=', lazy,
+                  'Workers=', workers, 'Time=', self.__load_time)
+
+    def __load_pending(self, tag):
+        start = time.perf_counter()
+        filepath = self.__pending.pop(tag)
+
+        item = self.__finalize(tag, filepath, self.__decode(tag, filepath))
+
+        self.__load_time += time.perf_counter() - start
+
+        return item
+
+    def __decode(self, tag, filepath):
+        start = time.perf_counter()
+        item = self._decode(filepath)
+
+        self.__timings[tag] = {'decode': time.perf_counter() - start, 'finalize': 0.0}
+
+        return item
+
+    def __finalize(self, tag, filepath, item):
+        start = time.perf_counter()
+
+        if item is not None:
+            item = self._finalize(filepath, item)
+
+        if item is not None:
+            self.__items[tag] = item
+
+            if _DEBUG_ASSET_CACHE:
+                print('DBG: AssetCache::load (): Filename=', os.path.basename(filepath), 'Tag=', tag)
+
+        self.__timings[tag]['finalize'] = time.perf_counter() - start
+
+        return item
 
     @abc.abstractmethod
-    def _loadfile(self, path, filename):
+    def _accepts(self, filename):
         """
-            Called for each file found while loaded the asset cache. Sub classes must implement this
-            method and return the loaded asset or None to skip
+            Called for each file found while loading the asset cache. Sub classes must implement this
+            method and return True for the file types they can load
 
-            :param path:            File path
             :param filename:        File name
-            :return:                Asset (object) or None
+            :return:                True if the file should be loaded
+        """
+
+        pass
+
+    @abc.abstractmethod
+    def _decode(self, filepath):
+        """
+            Called to load each accepted file. When loading in parallel this is called from a worker
+            thread so sub classes must not do anything here that requires the main thread
+
+            :param filepath:        Path to the file
+            :return:                Asset (object) or None to skip
         """
 
         pass
 
+    def _finalize(self, filepath, item):
+        """
+            Called on the loading thread after an asset has been decoded, sub classes can override this
+            to perform any work that must be done on the main thread
+
+            :param filepath:        Path to the file
+            :param item:            Decoded asset
+            :return:                Asset (object) or None to skip
+        """
+
+        return item
+
 
 class ImageCache(AssetCache):
     """
@@ -58,16 +202,167 @@ class ImageCache(AssetCache):
     def __init__(self):
         super().__init__()
 
-    def _loadfile(self, path, filename):
-        file_extension = os.path.splitext(filename)[1]
-        image = None
+        self.__disk_cache = None
+        self.__baked = set()
+        self.__atlas = None
+        self.__sheets = dict()
+        self.__scale = 1.0
+        self.__scaled_images = dict()
 
-        if file_extension in ['.png', '.jpg', '.jpeg']:
+    @property
+    def disk_cache(self):
+        return self.__disk_cache
 
-            if file_extension == '.png':
-                image = pygame.image.load(os.path.join(path, filename)).convert_alpha()
+    def set_disk_cache(self, disk_cache):
+
+        """
+            Loads images from (and saves decoded images to) a SurfaceDiskCache, must be set before load ()
+        """
+
+        self.__disk_cache = disk_cache
+
+    @property
+    def scale(self):
+        return self.__scale
+
+    def set_scale(self, scale):
+
+        """
+            Sets the scale applied to images returned by get_sheet () and get_scaled () (e.g when rendering
+            at a lower internal resolution), must be set before the first get_sheet ()
+        """
+
+        self.__scale = scale
+
+    def get_scaled(self, tag):
+
+        """
+            :return:    (Surface) Image scaled by the cache's scale, get () always returns the original image
+        """
+
+        if self.__scale == 1.0:
+            return self.get(tag)
+
+        image = self.__scaled_images.get(tag)
+
+        if image is None:
+            image = self.__build(tag, lambda: self.__scale_image(self.get(tag)), 'scaled', self.__scale)
+            self.__scaled_images[tag] = image
+
+            # Only the scaled image is used from now on
+            self.release(tag)
+
+        return image
+
+    @property
+    def atlas(self):
+        return self.__atlas
+
+    def set_atlas(self, atlas):
+
+        """
+            Packs sprite sheets returned by get_sheet () into a TextureAtlas, must be set before the first
+            get_sheet ()
+        """
+
+        self.__atlas = atlas
+
+    def get_sheet(self, tag, tile_width, tile_height):
+
+        """
+            Returns a sprite sheet for an image, sheets are shared so each image is only sliced (or packed
+            into the atlas) once. When the sheet is packed into the atlas the source image is released.
+
+            When the cache has a scale each tile is scaled separately (so rounding never changes the number
+            of tiles) and the tile size of the returned sheet is the scaled size
+
+            :param tag:             (str) Image tag
+            :param tile_width:      (int) Width of each tile
+            :param tile_height:     (int) Height of each tile
+            :return:                (SpriteSheet or AtlasSheet)
+        """
+
+        key = (tag, tile_width, tile_height)
+        sheet = self.__sheets.get(key)
+
+        if sheet is None:
+            if self.__scale != 1.0:
+                image, tile_width, tile_height = self.__scale_sheet(tag, tile_width, tile_height)
+                self.release(tag)
             else:
-                image = pygame.image.load(os.path.join(path, filename)).convert()
+                image = self.get(tag)
+
+            if self.__atlas is not None:
+                sheet = self.__atlas.add_sheet(tag, image, tile_width, tile_height)
+
+                if sheet is not None:
+                    self.release(tag)
+
+            if sheet is None:
+                sheet = spritesheet.SpriteSheet(image, tile_width, tile_height)
+
+            self.__sheets[key] = sheet
+
+        return sheet
+
+    def __scale_image(self, image):
+        return pygame.transform.smoothscale(image, (max(1, round(image.get_width() * self.__scale)),
+                                                    max(1, round(image.get_height() * self.__scale))))
+
+    def __scale_sheet(self, tag, tile_width, tile_height):
+        scaled_width = max(1, round(tile_width * self.__scale))
+        scaled_height = max(1, round(tile_height * self.__scale))
+
+        def build():
+            image = self.get(tag)
+            columns = image.get_width() // tile_width
+            rows = image.get_height() // tile_height
+
+            sheet = pygame.Surface((columns * scaled_width, rows * scaled_height), pygame.SRCALPHA).convert_alpha()
+            sheet.fill((0, 0, 0, 0))
+
+            for row in range(rows):
+                for col in range(columns):
+                    tile = image.subsurface((col * tile_width, row * tile_height, tile_width, tile_height))
+                    sheet.blit(pygame.transform.smoothscale(tile, (scaled_width, scaled_height)),
+                               (col * scaled_width, row * scaled_height))
+
+            return sheet
+
+        return self.__build(tag, build, 'sheet', tile_width, tile_height, self.__scale), scaled_width, scaled_height
+
+    def __build(self, tag, builder, *parameters):
+        # Scaled variants are baked to the disk cache (when set) so they are only computed once
+        path = self.get_path(tag)
+
+        if self.__disk_cache is not None and path is not None:
+            has_alpha = os.path.splitext(path)[1] == '.png'
+            return self.__disk_cache.get_or_build(path, builder, has_alpha, *parameters)
+
+        return builder()
+
+    def _accepts(self, filename):
+        return os.path.splitext(filename)[1] in ['.png', '.jpg', '.jpeg']
+
+    def _decode(self, filepath):
+        if self.__disk_cache is not None:
+            image = self.__disk_cache.load(filepath)
+
+            if image is not None:
+                self.__baked.add(filepath)
+                return image
+
+        return pygame.image.load(filepath)
+
+    def _finalize(self, filepath, image):
+        # Converting to the display format has to happen on the main thread once the display is set
+        if os.path.splitext(filepath)[1] == '.png':
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+
+        if self.__disk_cache is not None and filepath not in self.__baked:
+            self.__disk_cache.save(filepath, image)
 
         return image
 
@@ -83,13 +378,10 @@ class AudioCache(AssetCache):
     def __init__(self):
         super().__init__()
 
-    def _loadfile(self, path, filename):
-        file_extension = os.path.splitext(filename)[1]
-        sound = None
-
-        if file_extension in ['.wav', '.ogg']:
-            sound = pygame.mixer.Sound(os.path.join(path, filename))
+    def _accepts(self, filename):
+        return os.path.splitext(filename)[1] in ['.wav', '.ogg']
 
-        return sound
+    def _decode(self, filepath):
+        return pygame.mixer.Sound(filepath)
 
 # TODO: Add TileSetCache (Maybe put all tilesets in a sub director of 'images'
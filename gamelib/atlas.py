@@ -0,0 +1,220 @@
+import pygame
+import gamelib
+
+_DEBUG_ATLAS = gamelib.DEBUG_ASSETS and True
+
+
+class AtlasSheet(object):
+    """
+        AtlasSheet
+
+        Sprite sheet whose tiles live in the pages of a TextureAtlas. Supports the same get_tile ()
+        and indexing API as SpriteSheet.
+
+        When the atlas trims tiles each tile is cropped by the same amount on opposite edges, so the tile
+        center (used to position and rotate sprites) is unchanged. The tight bounding box of each tile,
+        relative to the untrimmed tile, is available from get_trim_rect ()
+    """
+
+    def __init__(self, tile_width, tile_height, tiles, trim_rects):
+        self._tile_width = tile_width
+        self._tile_height = tile_height
+        self._tiles = tiles
+        self._trim_rects = trim_rects
+
+    def get_tile(self, index):
+        return self.__getitem__(index)
+
+    def get_trim_rect(self, index):
+        return self._trim_rects[index]
+
+    def tile_width(self):
+        return self._tile_width
+
+    def tile_height(self):
+        return self._tile_height
+
+    def count(self):
+        return self.__len__()
+
+    def __getitem__(self, index):
+        return self._tiles.__getitem__(index)
+
+    def __len__(self):
+        return self._tiles.__len__()
+
+
+class TextureAtlas(object):
+    """
+        TextureAtlas
+
+        Packs sprite sheet tiles and loose images into a small number of large page surfaces using
+        shelf packing. Tiles are packed as they are added so sheets can be added on demand (e.g as each
+        entity factory is initialised). Images or tiles larger than a page are not packed.
+    """
+
+    DEFAULT_PAGE_SIZE = 2048
+    DEFAULT_PADDING = 1
+
+    class Page(object):
+
+        def __init__(self, size):
+            self.surface = pygame.Surface((size, size), pygame.SRCALPHA).convert_alpha()
+            self.surface.fill((0, 0, 0, 0))
+
+            self.shelves = []           # [y, height, x] of each shelf
+            self.next_y = 0
+            self.used_area = 0
+
+    def __init__(self, page_size=DEFAULT_PAGE_SIZE, padding=DEFAULT_PADDING, trim=True):
+
+        """
+            :param page_size:   (int) Width and height of each atlas page
+            :param padding:     (int) Empty pixels between packed tiles (avoids bleeding when scaling)
+            :param trim:        (bool) Crop transparent borders from tiles (symmetrically)
+        """
+
+        self.__page_size = page_size
+        self.__padding = padding
+        self.__trim = trim
+        self.__pages = []
+        self.__sheets = dict()
+        self.__source_area = 0
+
+    @property
+    def pages(self):
+        return [page.surface for page in self.__pages]
+
+    def has_sheet(self, tag):
+        return tag in self.__sheets
+
+    def get_sheet(self, tag):
+        return self.__sheets.get(tag)
+
+    def add_sheet(self, tag, image, tile_width, tile_height):
+
+        """
+            Slices an image into tiles and packs them into the atlas
+
+            :param tag:             (str) Name of the sheet
+            :param image:           (Surface) Sprite sheet image
+            :param tile_width:      (int) Width of each tile
+            :param tile_height:     (int) Height of each tile
+            :return:                (AtlasSheet) Packed sheet or None if the tiles are too big for a page
+        """
+
+        if tile_width > self.__page_size or tile_height > self.__page_size:
+            return None
+
+        trimmed_tiles = []
+        trim_rects = []
+
+        for row in range(0, image.get_height() // tile_height):
+            for col in range(0, image.get_width() // tile_width):
+                tile = image.subsurface((col * tile_width, row * tile_height, tile_width, tile_height))
+
+                trim_rect = tile.get_bounding_rect()
+                trimmed_tiles.append(tile.subsurface(self.__get_symmetric_rect(tile, trim_rect)))
+                trim_rects.append(trim_rect)
+
+        # Packing the tallest tiles first keeps the shelves tightly filled
+        tiles = [None] * len(trimmed_tiles)
+
+        for index in sorted(range(len(trimmed_tiles)), key=lambda i: -trimmed_tiles[i].get_height()):
+            tiles[index] = self.__pack(trimmed_tiles[index])
+
+        self.__source_area += tile_width * tile_height * len(tiles)
+
+        sheet = AtlasSheet(tile_width, tile_height, tiles, trim_rects)
+        self.__sheets[tag] = sheet
+
+        if _DEBUG_ATLAS:
+            print('DBG: TextureAtlas::add_sheet (): Tag=', tag, 'Tiles=', len(tiles), 'Pages=', len(self.__pages))
+
+        return sheet
+
+    def add_image(self, tag, image):
+
+        """
+            Packs a loose image as a single tile sheet
+
+            :return:    (Surface) Packed image or None if the image is too big for a page
+        """
+
+        sheet = self.add_sheet(tag, image, image.get_width(), image.get_height())
+
+        return sheet[0] if sheet else None
+
+    def get_report(self):
+
+        """
+            :return:    (dict) Packing statistics, 'efficiency' is the fraction of the page area used by
+                        tiles and 'trim_saving' the fraction of the source tile area removed by trimming
+        """
+
+        page_area = len(self.__pages) * self.__page_size * self.__page_size
+        used_area = sum(page.used_area for page in self.__pages)
+
+        return {
+            'pages': len(self.__pages),
+            'page_size': self.__page_size,
+            'sheets': len(self.__sheets),
+            'tiles': sum(len(sheet) for sheet in self.__sheets.values()),
+            'source_area': self.__source_area,
+            'used_area': used_area,
+            'page_area': page_area,
+            'efficiency': used_area / page_area if page_area else 0.0,
+            'page_efficiency': [page.used_area / (self.__page_size * self.__page_size) for page in self.__pages],
+            'trim_saving': 1.0 - used_area / self.__source_area if self.__source_area else 0.0,
+        }
+
+    def __get_symmetric_rect(self, tile, trim_rect):
+        width, height = tile.get_size()
+
+        if not self.__trim:
+            return pygame.Rect(0, 0, width, height)
+
+        if trim_rect.width == 0 or trim_rect.height == 0:
+            return pygame.Rect(width // 2, height // 2, min(width, 1), min(height, 1))
+
+        # Crop the same amount from opposite edges so the center of the tile doesn't move
+        x_crop = min(trim_rect.left, width - trim_rect.right)
+        y_crop = min(trim_rect.top, height - trim_rect.bottom)
+
+        return pygame.Rect(x_crop, y_crop, width - x_crop * 2, height - y_crop * 2)
+
+    def __pack(self, tile):
+        width, height = tile.get_size()
+        padded_width = width + self.__padding
+        padded_height = height + self.__padding
+
+        page, x, y = self.__allocate(padded_width, padded_height)
+
+        page.surface.blit(tile, (x, y))
+        page.used_area += width * height
+
+        return page.surface.subsurface((x, y, width, height))
+
+    def __allocate(self, width, height):
+
+        for page in self.__pages:
+            # Use the first shelf the tile fits on without wasting too much of the shelf height
+            for shelf in page.shelves:
+                if height <= shelf[1] <= height * 2 and shelf[2] + width <= self.__page_size:
+                    x = shelf[2]
+                    shelf[2] += width
+                    return page, x, shelf[0]
+
+            if page.next_y + height <= self.__page_size:
+                y = page.next_y
+                page.shelves.append([y, height, width])
+                page.next_y += height
+                return page, 0, y
+
+        page = TextureAtlas.Page(self.__page_size)
+        page.shelves.append([0, height, width])
+        page.next_y = height
+
+        self.__pages.append(page)
+
+        return page, 0, 0
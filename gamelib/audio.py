@@ -0,0 +1,200 @@
+import pygame
+import gamelib
+
+_DEBUG_SOUND_MANAGER = gamelib.DEBUG_AUDIO and True
+
+
+class SoundManager(object):
+    """
+        SoundManager
+
+        Plays sound effects on a fixed pool of mixer channels. Sounds requested with play () are queued and
+        started once per frame by update () so identical sounds triggered in the same frame are coalesced
+        into a single voice. Each sound can be limited to a number of concurrent instances, when every
+        channel is busy a new sound steals the channel of the oldest lower priority voice or is dropped.
+    """
+
+    PRIORITY_LOW = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_HIGH = 2
+
+    DEFAULT_CHANNELS = 16
+    DEFAULT_MAX_INSTANCES = 4
+
+    class Voice(object):
+
+        def __init__(self, channel):
+            self.channel = channel
+            self.sound = None
+            self.priority = SoundManager.PRIORITY_LOW
+            self.start_frame = 0
+
+        @property
+        def is_playing(self):
+            return self.sound is not None and self.channel.get_busy() and self.channel.get_sound() is self.sound
+
+    def __init__(self, channels=DEFAULT_CHANNELS, max_instances=DEFAULT_MAX_INSTANCES, enabled=True):
+
+        """
+            :param channels:        (int) Number of mixer channels owned by the manager
+            :param max_instances:   (int) Default limit of concurrent instances of each sound
+            :param enabled:         (bool) When False sounds are counted but never played (e.g headless)
+        """
+
+        self.__max_instances = max_instances
+        self.__enabled = enabled
+        self.__sound_config = dict()
+        self.__requests = dict()
+        self.__frame = 0
+
+        self.__played = 0
+        self.__dropped = 0
+        self.__stolen = 0
+        self.__coalesced = 0
+
+        # Without a mixer (e.g no audio device) the manager only counts requests
+        self.__enabled = enabled = enabled and pygame.mixer.get_init() is not None
+
+        if enabled:
+            pygame.mixer.set_num_channels(channels)
+            self.__voices = [SoundManager.Voice(pygame.mixer.Channel(index)) for index in range(channels)]
+        else:
+            self.__voices = []
+
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    @property
+    def stats(self):
+
+        """
+            :return:    (dict) Counts of sounds played, dropped (instance limit or no free channel), stolen
+                        (another voice was stopped to play it) and coalesced (duplicate requests in a frame)
+        """
+
+        return {
+            'played': self.__played,
+            'dropped': self.__dropped,
+            'stolen': self.__stolen,
+            'coalesced': self.__coalesced,
+            'active_voices': sum(1 for voice in self.__voices if voice.is_playing),
+            'channels': len(self.__voices),
+        }
+
+    def reset_stats(self):
+        self.__played = 0
+        self.__dropped = 0
+        self.__stolen = 0
+        self.__coalesced = 0
+
+    def configure(self, sound, max_instances=None, priority=PRIORITY_NORMAL):
+
+        """
+            Sets the concurrency limit and default priority of a sound
+
+            :param sound:           (Sound) Sound to configure
+            :param max_instances:   (int) Maximum concurrent instances or None for the default
+            :param priority:        (int) Default priority (PRIORITY_LOW, PRIORITY_NORMAL or PRIORITY_HIGH)
+        """
+
+        self.__sound_config[sound] = (max_instances or self.__max_instances, priority)
+
+    def play(self, sound, priority=None):
+
+        """
+            Queues a sound to be started on the next update ()
+
+            :param sound:       (Sound) Sound to play
+            :param priority:    (int) Priority or None to use the sounds configured priority
+        """
+
+        if sound is None:
+            return
+
+        if priority is None:
+            priority = self.__sound_config.get(sound, (0, SoundManager.PRIORITY_NORMAL))[1]
+
+        queued_priority = self.__requests.get(sound)
+
+        if queued_priority is not None:
+            self.__coalesced += 1
+            priority = max(priority, queued_priority)
+
+        self.__requests[sound] = priority
+
+    def update(self):
+
+        """
+            Starts the sounds queued since the last update, called once per frame by the game loop
+        """
+
+        self.__frame += 1
+
+        if not self.__requests:
+            return
+
+        # Higher priority requests get the first pick of the free channels
+        requests = sorted(self.__requests.items(), key=lambda request: -request[1])
+        self.__requests.clear()
+
+        for sound, priority in requests:
+            if self.__enabled:
+                self.__start(sound, priority)
+            else:
+                self.__played += 1
+
+    def stop_all(self):
+        for voice in self.__voices:
+            voice.channel.stop()
+            voice.sound = None
+
+    def __start(self, sound, priority):
+        max_instances = self.__sound_config.get(sound, (self.__max_instances,))[0]
+        free_voice = None
+        instances = 0
+
+        for voice in self.__voices:
+            if voice.is_playing:
+                if voice.sound is sound:
+                    instances += 1
+            elif free_voice is None:
+                free_voice = voice
+
+        if instances >= max_instances:
+            self.__dropped += 1
+            return
+
+        voice = free_voice
+
+        if voice is None:
+            voice = self.__get_steal_candidate(priority)
+
+            if voice is None:
+                self.__dropped += 1
+
+                if _DEBUG_SOUND_MANAGER:
+                    print('DBG: SoundManager::__start (): No free channel, dropped sound with priority', priority)
+
+                return
+
+            voice.channel.stop()
+            self.__stolen += 1
+
+        voice.channel.play(sound)
+        voice.sound = sound
+        voice.priority = priority
+        voice.start_frame = self.__frame
+
+        self.__played += 1
+
+    def __get_steal_candidate(self, priority):
+        # The oldest voice with a lower priority or, failing that, the oldest voice with the same priority
+        candidate = None
+
+        for voice in self.__voices:
+            if voice.priority <= priority:
+                if candidate is None or (voice.priority, voice.start_frame) < (candidate.priority, candidate.start_frame):
+                    candidate = voice
+
+        return candidate
@@ -0,0 +1,173 @@
+import hashlib
+import mmap
+import os
+import struct
+import pygame
+import gamelib
+
+_DEBUG_DISK_CACHE = gamelib.DEBUG_ASSETS and True
+
+
+class SurfaceDiskCache(object):
+    """
+        SurfaceDiskCache
+
+        Persistent cache of decoded surfaces stored as raw pixel buffers in the displays pixel layout.
+        Each entry is keyed by its source (e.g the image file path and any build parameters) and stamped
+        with a signature of the source files modification time and size plus the display format, entries
+        whose signature no longer matches are rebuilt and overwritten automatically.
+
+        Cached buffers are memory mapped and wrapped with pygame.image.frombuffer () so loading an entry
+        costs little more than converting it to a display surface.
+    """
+
+    _MAGIC = b'SRKS'
+    _VERSION = 1
+    _HEADER = struct.Struct('<4sHHII4s20s')      # magic, version, has_alpha, width, height, format, signature
+
+    def __init__(self, path):
+
+        """
+            :param path:    (str) Directory used to store the cached surfaces (created if required)
+        """
+
+        self.__path = path
+        self.__hits = 0
+        self.__misses = 0
+
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    def load(self, source_path, *parameters):
+
+        """
+            Returns the cached surface for a source or None if there is no valid cache entry. The surface
+            wraps the memory mapped file and still needs converting to the display format
+
+            :param source_path:     (str) File the surface was built from
+            :param parameters:      Any additional parameters used to build the surface
+            :return:                (Surface) Cached surface or None
+        """
+
+        filepath = self.__get_filepath(source_path, parameters)
+
+        if os.path.isfile(filepath):
+            try:
+                with open(filepath, 'rb') as file:
+                    buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+                magic, version, has_alpha, width, height, pixel_format, signature = \
+                    SurfaceDiskCache._HEADER.unpack_from(buffer)
+
+                if magic == SurfaceDiskCache._MAGIC and version == SurfaceDiskCache._VERSION \
+                        and signature == SurfaceDiskCache.__get_signature(source_path) \
+                        and len(buffer) == SurfaceDiskCache._HEADER.size + width * height * 4:
+
+                    self.__hits += 1
+
+                    # Note: The surface keeps a reference to the mapped buffer, the file is unmapped
+                    # once the surface is released
+                    return pygame.image.frombuffer(memoryview(buffer)[SurfaceDiskCache._HEADER.size:],
+                                                   (width, height), pixel_format.decode('ascii'))
+
+            except (OSError, ValueError, struct.error) as e:
+                if _DEBUG_DISK_CACHE:
+                    print('DBG: SurfaceDiskCache::load (): Failed to load', filepath, e)
+
+        self.__misses += 1
+
+        return None
+
+    def save(self, source_path, surface, *parameters):
+
+        """
+            Stores a surface (normally already converted to the display format) for a source
+        """
+
+        filepath = self.__get_filepath(source_path, parameters)
+        pixel_format = SurfaceDiskCache.__get_pixel_format()
+        has_alpha = surface.get_flags() & pygame.SRCALPHA != 0
+
+        header = SurfaceDiskCache._HEADER.pack(SurfaceDiskCache._MAGIC, SurfaceDiskCache._VERSION,
+                                               int(has_alpha), surface.get_width(), surface.get_height(),
+                                               pixel_format.encode('ascii'),
+                                               SurfaceDiskCache.__get_signature(source_path))
+
+        # Write to a temporary file first so a partially written entry is never picked up, the name is
+        # unique per process as several processes (e.g batch simulation workers) may build the same entry
+        temp_filepath = '{0}.{1}.tmp'.format(filepath, os.getpid())
+
+        try:
+            with open(temp_filepath, 'wb') as file:
+                file.write(header)
+                file.write(pygame.image.tobytes(surface, pixel_format))
+
+            os.replace(temp_filepath, filepath)
+
+        except OSError as e:
+            if _DEBUG_DISK_CACHE:
+                print('DBG: SurfaceDiskCache::save (): Failed to save', filepath, e)
+
+    def get_or_build(self, source_path, builder, has_alpha, *parameters):
+
+        """
+            Returns the cached surface for a source, calling builder () to create and cache it if required
+
+            :param source_path:     (str) File the surface is built from
+            :param builder:         (callable) Returns the surface (in the display format) on a cache miss
+            :param has_alpha:       (bool) True if the surface has per pixel alpha
+            :param parameters:      Any additional parameters used to build the surface
+            :return:                (Surface) Surface converted to the display format
+        """
+
+        surface = self.load(source_path, *parameters)
+
+        if surface is not None:
+            return surface.convert_alpha() if has_alpha else surface.convert()
+
+        surface = builder()
+        self.save(source_path, surface, *parameters)
+
+        return surface
+
+    def clear(self):
+        for filename in os.listdir(self.__path):
+            os.remove(os.path.join(self.__path, filename))
+
+    def __get_filepath(self, source_path, parameters):
+        key = repr((os.path.abspath(source_path),) + tuple(parameters)).encode('utf-8')
+
+        return os.path.join(self.__path, hashlib.sha1(key).hexdigest() + '.surface')
+
+    @staticmethod
+    def __get_signature(source_path):
+        # Any change to the source file or the display format invalidates the entry
+        stat = os.stat(source_path)
+        display = pygame.display.get_surface()
+        display_format = (display.get_bitsize(), display.get_masks()) if display else None
+
+        key = repr((stat.st_mtime_ns, stat.st_size, display_format, SurfaceDiskCache.__get_pixel_format()))
+
+        return hashlib.sha1(key.encode('utf-8')).digest()
+
+    @staticmethod
+    def __get_pixel_format():
+        # Store pixels in the same byte order as the display (normally ARGB8888 which is BGRA in memory
+        # on little endian machines) so converting the mapped surface is a straight copy
+        display = pygame.display.get_surface()
+
+        if display is not None and display.get_bytesize() == 4 and display.get_masks()[:3] == (0xff0000, 0xff00, 0xff):
+            return 'BGRA'
+
+        return 'RGBA'
@@ -0,0 +1,642 @@
+from gamelib import framecache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_available():
+    return numpy is not None
+
+
+COMPONENT_TRANSFORM = 0x01          # Position, rotation and scale (every entity has one)
+COMPONENT_KINEMATICS = 0x02         # Velocity, rotation velocity and screen wrap
+COMPONENT_ANIMATION = 0x04          # Frame timer, optionally looping or destroying the entity at the end
+COMPONENT_TIME_TO_LIVE = 0x08       # Destroys the entity when it expires
+COMPONENT_COLLIDER = 0x10           # Collision circle and group
+COMPONENT_RENDERABLE = 0x20         # Frames drawn in a scene layer
+
+
+class World(object):
+    """
+        World
+
+        Data oriented alternative to scene nodes for large numbers of simple entities. An entity is just an
+        id, its components live in rows of NumPy arrays (one set of arrays per component, packed so the
+        first count rows are in use) and systems process every entity with the components they need in
+        a single batched operation per update instead of a method call per node.
+
+        A world is added to a Scene with Scene.add_world (), its entities are updated after the scene's
+        nodes and drawn in their scene layer alongside the nodes. Entities are destroyed at the end of an
+        update (or by destroy ()) and their ids are never reused.
+
+        Note: Requires NumPy, use is_available () to check before creating a world
+    """
+
+    DEFAULT_CAPACITY = 256
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, systems=None):
+
+        """
+            :param capacity:    (int) Initial number of rows, the arrays grow as required
+            :param systems:     (list) Systems run by update () in order, None for the default kinematics,
+                                animation and time to live systems
+        """
+
+        if numpy is None:
+            raise RuntimeError('World requires NumPy')
+
+        self.__count = 0
+        self.__next_id = 1
+        self.__rows = dict()                # Entity id -> row
+        self.__destroyed = []
+
+        self.__ids = numpy.zeros(capacity, dtype=numpy.int64)
+        self.__components = numpy.zeros(capacity, dtype=numpy.uint8)
+        self.__tags = numpy.zeros(capacity, dtype=numpy.int32)
+
+        # Transform
+        self.__positions = numpy.zeros((capacity, 2))
+        self.__previous_positions = numpy.zeros((capacity, 2))
+        self.__rotations = numpy.zeros(capacity)
+        self.__scales = numpy.ones(capacity)
+
+        # Kinematics
+        self.__velocities = numpy.zeros((capacity, 2))
+        self.__rotation_velocities = numpy.zeros(capacity)
+        self.__wrap_rects = numpy.zeros((capacity, 4))      # left, top, right, bottom
+        self.__has_wrap = numpy.zeros(capacity, dtype=bool)
+
+        # Animation
+        self.__frame_indices = numpy.zeros(capacity, dtype=numpy.int32)
+        self.__frame_counts = numpy.ones(capacity, dtype=numpy.int32)
+        self.__frame_times = numpy.zeros(capacity)           # Milliseconds per frame like LinearFrameAnimator
+        self.__frame_elapsed = numpy.zeros(capacity)
+        self.__frame_loop = numpy.zeros(capacity, dtype=bool)
+        self.__frame_destroy = numpy.zeros(capacity, dtype=bool)
+
+        # Time to live
+        self.__time_to_live = numpy.zeros(capacity)
+
+        # Collider
+        self.__radii = numpy.zeros(capacity)
+        self.__collision_groups = numpy.zeros(capacity, dtype=numpy.int32)
+
+        # Renderable, frames are surfaces so they are kept in a list alongside the arrays
+        self.__frames = []
+        self.__layers = numpy.zeros(capacity, dtype=numpy.int32)
+
+        self.__systems = systems if systems is not None else [KinematicsSystem(), AnimationSystem(),
+                                                              TimeToLiveSystem()]
+        self.__render_system = RenderSystem()
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def capacity(self):
+        return len(self.__ids)
+
+    @property
+    def systems(self):
+        return self.__systems
+
+    def __len__(self):
+        return self.__count
+
+    # ----------------------------------------------------------------------------------------------------
+    # Entities
+
+    def create(self, x, y, frames=None, layer=0, tag=0):
+
+        """
+            Creates an entity with a transform (and a renderable if it has frames)
+
+            :param x:       (float) Center position on the x-axis
+            :param y:       (float) Center position on the y-axis
+            :param frames:  (image[]) Frames to draw or None for an entity that isn't drawn
+            :param layer:   (int) Scene layer the entity is drawn in
+            :param tag:     (int) Application defined value, e.g to tell entity types apart
+            :return:        (int) Entity id
+        """
+
+        if self.__count == self.capacity:
+            self.__grow()
+
+        row = self.__count
+        entity = self.__next_id
+
+        self.__next_id += 1
+        self.__count += 1
+        self.__rows[entity] = row
+
+        self.__ids[row] = entity
+        self.__components[row] = COMPONENT_TRANSFORM
+        self.__tags[row] = tag
+
+        self.__positions[row] = (x, y)
+        self.__previous_positions[row] = (x, y)
+        self.__rotations[row] = 0.0
+        self.__scales[row] = 1.0
+
+        self.__velocities[row] = 0.0
+        self.__rotation_velocities[row] = 0.0
+        self.__has_wrap[row] = False
+
+        self.__frame_indices[row] = 0
+        self.__frame_counts[row] = len(frames) if frames else 1
+        self.__frame_elapsed[row] = 0.0
+
+        self.__layers[row] = layer
+        self.__frames.append(frames)
+
+        if frames:
+            self.__components[row] |= COMPONENT_RENDERABLE
+
+        return entity
+
+    def destroy(self, entity):
+
+        """
+            Removes an entity straight away, systems mark entities for removal with mark_destroyed () instead
+        """
+
+        row = self.__rows.pop(entity, None)
+
+        if row is None:
+            return
+
+        # Keep the arrays packed by moving the last row into the row being freed
+        last = self.__count - 1
+
+        if row != last:
+            for array in self.__get_arrays():
+                array[row] = array[last]
+
+            self.__frames[row] = self.__frames[last]
+            self.__rows[int(self.__ids[row])] = row
+
+        self.__frames.pop()
+        self.__count -= 1
+
+    def mark_destroyed(self, rows):
+
+        """
+            :param rows:    (ndarray) Rows of entities to destroy at the end of the update
+        """
+
+        self.__destroyed.extend(int(entity) for entity in self.__ids[rows])
+
+    def clear(self):
+        self.__rows.clear()
+        self.__frames.clear()
+        self.__destroyed.clear()
+        self.__count = 0
+
+    def is_alive(self, entity):
+        return entity in self.__rows
+
+    def has_components(self, entity, components):
+        row = self.__rows.get(entity)
+
+        return row is not None and (self.__components[row] & components) == components
+
+    # ----------------------------------------------------------------------------------------------------
+    # Components
+
+    def set_kinematics(self, entity, vx, vy, rotation_velocity=0.0, wrap_rect=None):
+
+        """
+            :param vx:                  (float) Velocity on the x-axis in pixels per second
+            :param vy:                  (float) Velocity on the y-axis in pixels per second
+            :param rotation_velocity:   (float) Degrees per second
+            :param wrap_rect:           (Rect) Rectangle to warp around when leaving an edge or None
+        """
+
+        row = self.__rows[entity]
+
+        self.__components[row] |= COMPONENT_KINEMATICS
+        self.__velocities[row] = (vx, vy)
+        self.__rotation_velocities[row] = rotation_velocity
+        self.__has_wrap[row] = wrap_rect is not None
+
+        if wrap_rect is not None:
+            self.__wrap_rects[row] = (wrap_rect.left, wrap_rect.top, wrap_rect.right, wrap_rect.bottom)
+
+    def set_animation(self, entity, frame_time, loop=False, destroy_at_end=False):
+
+        """
+            :param frame_time:      (float) Time between frames in milliseconds
+            :param loop:            (bool) Restart from the first frame after the last frame
+            :param destroy_at_end:  (bool) Destroy the entity after the last frame (when not looping)
+        """
+
+        row = self.__rows[entity]
+
+        self.__components[row] |= COMPONENT_ANIMATION
+        self.__frame_times[row] = frame_time
+        self.__frame_elapsed[row] = 0.0
+        self.__frame_loop[row] = loop
+        self.__frame_destroy[row] = destroy_at_end
+
+    def set_time_to_live(self, entity, time_to_live):
+
+        """
+            :param time_to_live:    (float) Seconds before the entity is destroyed, None removes the component
+        """
+
+        row = self.__rows[entity]
+
+        if time_to_live is None:
+            self.__components[row] &= ~COMPONENT_TIME_TO_LIVE
+        else:
+            self.__components[row] |= COMPONENT_TIME_TO_LIVE
+            self.__time_to_live[row] = time_to_live
+
+    def set_collider(self, entity, radius, group=0):
+
+        """
+            :param radius:  (float) Collision circle radius in pixels
+            :param group:   (int) Application defined group used to filter queries
+        """
+
+        row = self.__rows[entity]
+
+        self.__components[row] |= COMPONENT_COLLIDER
+        self.__radii[row] = radius
+        self.__collision_groups[row] = group
+
+    def set_transform(self, entity, x, y, rotation=None, scale=None):
+        row = self.__rows[entity]
+
+        self.__positions[row] = (x, y)
+        self.__previous_positions[row] = (x, y)
+
+        if rotation is not None:
+            self.__rotations[row] = rotation
+
+        if scale is not None:
+            self.__scales[row] = scale
+
+    def get_position(self, entity):
+        row = self.__rows[entity]
+
+        return float(self.__positions[row, 0]), float(self.__positions[row, 1])
+
+    def get_tag(self, entity):
+        return int(self.__tags[self.__rows[entity]])
+
+    def get_frame_index(self, entity):
+        return int(self.__frame_indices[self.__rows[entity]])
+
+    # ----------------------------------------------------------------------------------------------------
+    # Column access for systems, the views cover the rows in use
+
+    @property
+    def ids(self):
+        return self.__ids[:self.__count]
+
+    @property
+    def components(self):
+        return self.__components[:self.__count]
+
+    @property
+    def tags(self):
+        return self.__tags[:self.__count]
+
+    @property
+    def positions(self):
+        return self.__positions[:self.__count]
+
+    @property
+    def previous_positions(self):
+        return self.__previous_positions[:self.__count]
+
+    @property
+    def rotations(self):
+        return self.__rotations[:self.__count]
+
+    @property
+    def scales(self):
+        return self.__scales[:self.__count]
+
+    @property
+    def velocities(self):
+        return self.__velocities[:self.__count]
+
+    @property
+    def rotation_velocities(self):
+        return self.__rotation_velocities[:self.__count]
+
+    @property
+    def wrap_rects(self):
+        return self.__wrap_rects[:self.__count]
+
+    @property
+    def has_wrap(self):
+        return self.__has_wrap[:self.__count]
+
+    @property
+    def frame_indices(self):
+        return self.__frame_indices[:self.__count]
+
+    @property
+    def frame_counts(self):
+        return self.__frame_counts[:self.__count]
+
+    @property
+    def frame_times(self):
+        return self.__frame_times[:self.__count]
+
+    @property
+    def frame_elapsed(self):
+        return self.__frame_elapsed[:self.__count]
+
+    @property
+    def frame_loop(self):
+        return self.__frame_loop[:self.__count]
+
+    @property
+    def frame_destroy(self):
+        return self.__frame_destroy[:self.__count]
+
+    @property
+    def time_to_live(self):
+        return self.__time_to_live[:self.__count]
+
+    @property
+    def radii(self):
+        return self.__radii[:self.__count]
+
+    @property
+    def collision_groups(self):
+        return self.__collision_groups[:self.__count]
+
+    @property
+    def frames(self):
+        return self.__frames
+
+    @property
+    def layers(self):
+        return self.__layers[:self.__count]
+
+    def get_rows(self, components):
+
+        """
+            :param components:  (int) COMPONENT_* flags
+            :return:            (ndarray) Boolean mask of the rows that have all the components
+        """
+
+        return (self.components & components) == components
+
+    # ----------------------------------------------------------------------------------------------------
+    # Update, collision queries and drawing
+
+    def update(self, dt):
+
+        """
+            Runs every system then removes the entities they destroyed
+
+            :param dt:  (float) Time since last update in seconds
+        """
+
+        if self.__count == 0:
+            return
+
+        self.previous_positions[:] = self.positions
+
+        for system in self.__systems:
+            system.update(self, dt)
+
+        if self.__destroyed:
+            for entity in self.__destroyed:
+                self.destroy(entity)
+
+            self.__destroyed.clear()
+
+    def query_circle(self, x, y, radius, group=None):
+
+        """
+            :param x:       (float) Circle center on the x-axis
+            :param y:       (float) Circle center on the y-axis
+            :param radius:  (float) Circle radius
+            :param group:   (int) Only test colliders in this group or None for all
+            :return:        (list) Ids of the entities whose collider overlaps the circle
+        """
+
+        rows = self.get_rows(COMPONENT_COLLIDER)
+
+        if group is not None:
+            rows &= self.collision_groups == group
+
+        rows = numpy.flatnonzero(rows)
+
+        if len(rows) == 0:
+            return []
+
+        offsets = self.__positions[rows] - (x, y)
+        reach = self.__radii[rows] + radius
+
+        hits = rows[numpy.einsum('ij,ij->i', offsets, offsets) <= reach * reach]
+
+        return [int(entity) for entity in self.__ids[hits]]
+
+    def draw(self, surface, layer, alpha=None):
+
+        """
+            Draws the renderable entities in a scene layer, see RenderSystem
+
+            :param alpha:   (float) Interpolation between the previous and current positions or None
+        """
+
+        if self.__count:
+            self.__render_system.draw(self, surface, layer, alpha)
+
+    def update_digest(self, digest):
+
+        """
+            Adds the simulation state of the entities to a hashlib digest (see Scene.get_state_checksum ())
+        """
+
+        digest.update(self.ids.tobytes())
+        digest.update(self.positions.tobytes())
+        digest.update(self.velocities.tobytes())
+        digest.update(self.rotations.tobytes())
+        digest.update(self.frame_indices.tobytes())
+
+    def __grow(self):
+        capacity = self.capacity * 2
+
+        self.__ids, self.__components, self.__tags, self.__positions, self.__previous_positions, \
+            self.__rotations, self.__scales, self.__velocities, self.__rotation_velocities, self.__wrap_rects, \
+            self.__has_wrap, self.__frame_indices, self.__frame_counts, self.__frame_times, \
+            self.__frame_elapsed, self.__frame_loop, self.__frame_destroy, self.__time_to_live, \
+            self.__radii, self.__collision_groups, self.__layers = \
+            [numpy.resize(array, (capacity,) + array.shape[1:]) for array in self.__get_arrays()]
+
+    def __get_arrays(self):
+        return [self.__ids, self.__components, self.__tags, self.__positions, self.__previous_positions,
+                self.__rotations, self.__scales, self.__velocities, self.__rotation_velocities, self.__wrap_rects,
+                self.__has_wrap, self.__frame_indices, self.__frame_counts, self.__frame_times,
+                self.__frame_elapsed, self.__frame_loop, self.__frame_destroy, self.__time_to_live,
+                self.__radii, self.__collision_groups, self.__layers]
+
+
+class System(object):
+    """
+        Processes every entity in a world with a set of components, see World.update ()
+    """
+
+    def update(self, world, dt):
+        pass
+
+
+class KinematicsSystem(System):
+    """
+        Moves and rotates entities with kinematics and wraps them around their wrap rect (same rules as
+        PhysicsWorld for entities without acceleration or drag)
+    """
+
+    def update(self, world, dt):
+        rows = world.get_rows(COMPONENT_KINEMATICS)
+
+        if not rows.any():
+            return
+
+        positions = world.positions
+        positions[rows] += world.velocities[rows] * dt
+
+        rotations = world.rotations
+        rotations[rows] = (rotations[rows] + world.rotation_velocities[rows] * dt) % 360.0
+
+        has_wrap = rows & world.has_wrap
+
+        if has_wrap.any():
+            x = positions[:, 0]
+            y = positions[:, 1]
+
+            left, top, right, bottom = world.wrap_rects.T
+
+            x_under = has_wrap & (x < left)
+            x_over = has_wrap & ~x_under & (x > right)
+            y_under = has_wrap & (y < top)
+            y_over = has_wrap & ~y_under & (y > bottom)
+
+            x[x_under] = right[x_under] + (left[x_under] - x[x_under])
+            x[x_over] = left[x_over] + (x[x_over] - right[x_over])
+            y[y_under] = bottom[y_under] + (y[y_under] - top[y_under])
+            y[y_over] = top[y_over] + (y[y_over] - bottom[y_over])
+
+
+class AnimationSystem(System):
+    """
+        Batched LinearFrameAnimator: steps to the next frame each time the frame time passes, then loops,
+        stops or destroys the entity after the last frame
+    """
+
+    def __init__(self, frame_step=1):
+
+        """
+            :param frame_step:  (int) Frames to advance each time the frame time passes (1 shows every frame)
+        """
+
+        self.frame_step = frame_step
+
+    def update(self, world, dt):
+        rows = world.get_rows(COMPONENT_ANIMATION)
+
+        if not rows.any():
+            return
+
+        elapsed = world.frame_elapsed
+        elapsed[rows] += dt * 1000.0
+
+        advance = rows & (elapsed > world.frame_times)
+
+        if not advance.any():
+            return
+
+        frame_indices = world.frame_indices
+        has_next = advance & (frame_indices + 1 < world.frame_counts)
+
+        frame_indices[has_next] = numpy.minimum(frame_indices[has_next] + self.frame_step,
+                                                world.frame_counts[has_next] - 1)
+        frame_indices[advance & ~has_next & world.frame_loop] = 0
+        elapsed[advance] = 0.0
+
+        destroyed = advance & ~has_next & ~world.frame_loop & world.frame_destroy
+
+        if destroyed.any():
+            world.mark_destroyed(numpy.flatnonzero(destroyed))
+
+
+class TimeToLiveSystem(System):
+    """
+        Counts down time to live and destroys expired entities
+    """
+
+    def update(self, world, dt):
+        rows = world.get_rows(COMPONENT_TIME_TO_LIVE)
+
+        if not rows.any():
+            return
+
+        time_to_live = world.time_to_live
+        time_to_live[rows] -= dt
+
+        expired = rows & (time_to_live <= 0)
+
+        if expired.any():
+            world.mark_destroyed(numpy.flatnonzero(expired))
+
+
+class RenderSystem(object):
+    """
+        Draws renderable entities with a single Surface.blits () call per layer. Rotated or scaled frames
+        come from the shared FrameCache
+    """
+
+    def draw(self, world, surface, layer, alpha=None):
+        rows = numpy.flatnonzero(world.get_rows(COMPONENT_RENDERABLE) & (world.layers == layer))
+
+        if len(rows) == 0:
+            return
+
+        positions = world.positions[rows]
+
+        if alpha is not None:
+            previous = world.previous_positions[rows]
+            offsets = positions - previous
+
+            # Entities that wrapped this tick are drawn where they are rather than sliding across the screen
+            width, height = surface.get_size()
+            is_smooth = (numpy.abs(offsets[:, 0]) < width / 2) & (numpy.abs(offsets[:, 1]) < height / 2)
+
+            positions = numpy.where(is_smooth[:, None], previous + offsets * alpha, positions)
+
+        frame_cache = framecache.FrameCache.instance()
+        frames = world.frames
+
+        frame_indices = world.frame_indices[rows].tolist()
+        rotations = world.rotations[rows].tolist()
+        scales = world.scales[rows].tolist()
+        centers = positions.tolist()
+
+        blits = []
+
+        for index, row in enumerate(rows.tolist()):
+            image = frames[row][frame_indices[index]]
+            rotation = rotations[index]
+            scale = scales[index]
+
+            if rotation or scale != 1.0:
+                image = frame_cache.get(image, rotation, scale)
+
+            x, y = centers[index]
+            width, height = image.get_size()
+
+            blits.append((image, (x - width // 2, y - height // 2)))
+
+        surface.blits(blits, False)
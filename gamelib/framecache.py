@@ -0,0 +1,183 @@
+import collections
+import pygame
+import gamelib
+
+_DEBUG_FRAME_CACHE = gamelib.DEBUG_ASSETS and True
+
+
+class FrameCache(object):
+    """
+        FrameCache
+
+        Process wide LRU cache of rotated and scaled sprite frames. Frames are keyed by the source frame
+        (e.g a SpriteSheet tile), the rotation angle quantized to the cache's angle step and the scale, so
+        every sprite drawn from the same tile shares the same pre-rotated images.
+
+        Note: Cached frames are shared, callers must not draw onto the returned surfaces
+    """
+
+    DEFAULT_ANGLE_STEP = 2                          # Angle resolution in degrees
+    DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024        # Maximum size of all cached frames in bytes
+
+    _instance = None
+
+    def __init__(self, angle_step=DEFAULT_ANGLE_STEP, memory_budget=DEFAULT_MEMORY_BUDGET):
+
+        """
+            :param angle_step:      (float) Rotation angles are rounded to the nearest multiple of this value
+            :param memory_budget:   (int) Least recently used frames are evicted once this many bytes are cached
+        """
+
+        self.__frames = collections.OrderedDict()
+        self.__sizes = dict()
+        self.__angle_step = angle_step
+        self.__smooth = True
+        self.__memory_budget = memory_budget
+        self.__memory_used = 0
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = FrameCache()
+
+        return cls._instance
+
+    @property
+    def angle_step(self):
+        return self.__angle_step
+
+    @property
+    def smooth(self):
+        return self.__smooth
+
+    @property
+    def memory_budget(self):
+        return self.__memory_budget
+
+    @property
+    def memory_used(self):
+        return self.__memory_used
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    @property
+    def evictions(self):
+        return self.__evictions
+
+    def set_angle_step(self, angle_step):
+        assert angle_step > 0
+
+        if self.__angle_step != angle_step:
+            self.__angle_step = angle_step
+            self.clear()
+
+    def set_smooth(self, smooth):
+
+        """
+            :param smooth:  (bool) Filter transformed frames (rotozoom) or use the faster unfiltered rotate ()
+        """
+
+        if self.__smooth != smooth:
+            self.__smooth = smooth
+
+            self.__frames.clear()
+            self.__memory_used = 0
+
+    def set_memory_budget(self, memory_budget):
+        self.__memory_budget = memory_budget
+        self.__evict()
+
+    def quantize_angle(self, angle):
+        return (round(angle / self.__angle_step) * self.__angle_step) % 360
+
+    def get(self, frame, angle, scale):
+
+        """
+            Returns the frame rotated and scaled, rendering and caching it on the first request
+
+            :param frame:   (Surface) Source frame
+            :param angle:   (float) Rotation in degrees (clockwise, North=0)
+            :param scale:   (float) Scale factor
+            :return:        (Surface) Transformed frame
+        """
+
+        key = (frame, self.quantize_angle(angle), scale)
+        image = self.__frames.get(key)
+
+        if image is not None:
+            self.__frames.move_to_end(key)
+            self.__hits += 1
+        else:
+            image = self.__transform(frame, key[1], scale)
+
+            self.__frames[key] = image
+            self.__memory_used += FrameCache.__get_size(image)
+            self.__misses += 1
+
+            self.__evict()
+
+        return image
+
+    def get_size(self, frame, angle, scale):
+
+        """
+            Returns the size get () would return for a frame without rendering it, e.g to keep sprite
+            rects up to date while nothing is being drawn. Sizes only depend on the frame size and the
+            transform (see set_smooth ()) so they are shared by every frame of that size (and are never evicted)
+
+            :return:    (tuple) Width and height of the transformed frame
+        """
+
+        key = (frame.get_size(), self.quantize_angle(angle), scale, self.__smooth)
+        size = self.__sizes.get(key)
+
+        if size is None:
+            size = self.__transform(pygame.Surface(key[0]), key[1], scale).get_size()
+            self.__sizes[key] = size
+
+        return size
+
+    def clear(self):
+        self.__frames.clear()
+        self.__sizes.clear()
+        self.__memory_used = 0
+
+    def __transform(self, frame, angle, scale):
+        # Note: Pygames transform.rotate () method expects negative values to rotate clockwise, all of our
+        # math uses positive angles for clockwise rotation (e.g North=0, East=90, South= 180, West=270)
+        # so we multiple the angle by -1
+
+        if self.__smooth:
+            return pygame.transform.rotozoom(frame, angle * -1, scale)
+
+        return pygame.transform.rotate(frame if scale == 1.0 else pygame.transform.scale_by(frame, scale), angle * -1)
+
+    def __evict(self):
+        while self.__memory_used > self.__memory_budget and len(self.__frames) > 1:
+            key, image = self.__frames.popitem(last=False)
+            self.__memory_used -= FrameCache.__get_size(image)
+            self.__evictions += 1
+
+            if _DEBUG_FRAME_CACHE:
+                print('DBG: FrameCache::__evict (): Angle=', key[1], 'Scale=', key[2], 'Used=', self.__memory_used)
+
+    @staticmethod
+    def __get_size(image):
+        return image.get_pitch() * image.get_height()
+
+    def __len__(self):
+        return len(self.__frames)
+
+    def __repr__(self):
+        return 'frames={0}, memory_used={1}, hits={2}, misses={3}, evictions={4}' \
+            .format(len(self.__frames), self.__memory_used, self.__hits, self.__misses, self.__evictions)
@@ -1,70 +1,459 @@
-import os, sys, pygame
+import os, sys, random, time, pygame
 from gamelib import assets
+from gamelib import audio
+from gamelib import pacing
+from gamelib import replay
+from gamelib import rng
 
 
 class Game(object):
 
-    def __init__(self, width, height, title='', fps_lock=60):
+    DEFAULT_MAX_CATCH_UP_STEPS = 5
+
+    DEFAULT_AUDIO_BUFFER_SIZE = 1024
+
+    HEADLESS_ENVIRONMENT_VARIABLE = 'GAMELIB_HEADLESS'
+
+    def __init__(self, width, height, title='', fps_lock=60, tick_rate=None,
+                 max_catch_up_steps=DEFAULT_MAX_CATCH_UP_STEPS, headless=None, root_path=None,
+                 audio_buffer_size=DEFAULT_AUDIO_BUFFER_SIZE, audio_channels=audio.SoundManager.DEFAULT_CHANNELS,
+                 render_size=None, smooth_scaling=False, seed=None, clock=None, frame_pacing=None):
+
+        """
+            :param width:               (int) Window width
+            :param height:              (int) Window height
+            :param title:               (str) Window title
+            :param fps_lock:            (int) Maximum frames per second (rendering)
+            :param tick_rate:           (int) Fixed simulation updates per second or None to update once per frame
+            :param max_catch_up_steps:  (int) Maximum simulation updates per frame when running behind
+            :param headless:            (bool) Run without a window or audio output, None to read the
+                                        GAMELIB_HEADLESS environment variable
+            :param root_path:           (str) Directory containing the 'assets' directory, defaults to the
+                                        directory of the __main__ module
+            :param audio_buffer_size:   (int) Mixer buffer size in samples, small buffers lower latency but
+                                        underrun when the game loop is busy
+            :param audio_channels:      (int) Number of mixer channels used to play sound effects
+            :param render_size:         (tuple) Internal resolution the scene is rendered at and then scaled
+                                        to the window, None to render at the window size. The game is
+                                        designed for the window size, render_scale relates the two
+            :param smooth_scaling:      (bool) Use smoothscale (slower) when scaling to the window
+            :param seed:                (int) Seed for the random streams returned by random (), None
+                                        to choose one
+            :param clock:               Frame clock with the pygame.time.Clock tick () and get_fps ()
+                                        methods, None to use a FramePacer
+            :param frame_pacing:        (str) FramePacer mode used to wait for the next frame (FramePacer.MODE_*),
+                                        None for MODE_SLEEP. MODE_VSYNC creates the display with vsync and
+                                        falls back to MODE_HYBRID where SDL doesn't support it
+        """
+
+        if headless is None:
+            headless = os.environ.get(Game.HEADLESS_ENVIRONMENT_VARIABLE, '').lower() in ['1', 'true', 'yes']
+
+        self.__headless = headless
+        self.__render_enabled = not headless
+
+        # Note: SDL picks up the video and audio drivers when pygame is initialised so the dummy
+        # drivers must be selected first. The mixer still works so sounds can be loaded
+
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
 
         # pre_init (frequency=22050, size=-16, channels=2, buffersize=4096)
 
-        pygame.mixer.pre_init(22050, -16, 16, 128)
+        pygame.mixer.pre_init(22050, -16, 2, audio_buffer_size)
 
         pygame.init()
         # pygame.mixer.init ()
 
         flags = 0  # pygame.DOUBLEBUF|pygame.HWSURFACE
 
-        self.__root_path = os.path.dirname(sys.modules['__main__'].__file__)
-        self.__surface = pygame.display.set_mode((width, height), flags)
+        if root_path is None:
+            root_path = os.path.dirname(sys.modules['__main__'].__file__)
+
+        self.__root_path = root_path
+
+        if frame_pacing is None:
+            frame_pacing = pacing.FramePacer.MODE_SLEEP
+
+        self.__vsync = frame_pacing == pacing.FramePacer.MODE_VSYNC and not headless
+
+        if self.__vsync:
+            # Note: SDL only supports vsync with a renderer, the SCALED flag gives the window one
+            try:
+                self.__surface = pygame.display.set_mode((width, height), flags | pygame.SCALED, vsync=1)
+            except pygame.error as e:
+                print('Game: VSync is not available ({0}), using hybrid frame pacing'.format(e))
+
+                self.__vsync = False
+                frame_pacing = pacing.FramePacer.MODE_HYBRID
+
+        if not self.__vsync:
+            self.__surface = pygame.display.set_mode((width, height), flags)
+
+        # When rendering at a lower resolution the scene is drawn to an offscreen surface which is scaled to
+        # the window once per frame
+        if render_size is not None and tuple(render_size) != (width, height):
+            self.__render_surface = pygame.Surface(render_size).convert()
+            self.__render_scale = render_size[1] / height
+        else:
+            self.__render_surface = self.__surface
+            self.__render_scale = 1.0
+
+        self.__smooth_scaling = smooth_scaling
         self.__fps_lock = fps_lock
 
+        self.__tick_rate = None
+        self.__max_catch_up_steps = max_catch_up_steps
+        self.__accumulator = 0.0
+
         self.__is_running = False
-        self.__clock = None
+        self.__clock = clock or pacing.FramePacer(frame_pacing)
+        self.__tick_count = 0
+        self.__time = 0.0
+        self.__input_recorder = None
+        self.__input_source = None
         self.__active_scene = None
+        self.__profiler = None
+        self.__quality_governor = None
 
         self.__image_cache = assets.ImageCache()
+        self.__image_cache.set_scale(self.__render_scale)
         self.__audio_cache = assets.AudioCache()
+        self.__sound_manager = audio.SoundManager(audio_channels, enabled=not headless)
+
+        self.set_tick_rate(tick_rate, max_catch_up_steps)
+        self.set_seed(seed if seed is not None else random.randrange(1 << 32))
 
         pygame.display.set_caption(title)
 
-    def run(self):
+    def run(self, max_frames=None):
+
+        """
+            Runs the game loop until the game quits
+
+            :param max_frames:  (int) When given the loop returns after this many frames instead of
+                                shutting down pygame and exiting (e.g for headless simulation runs)
+            :return:            (int) Number of frames run
+        """
+
         self.__is_running = True
-        self.__clock = pygame.time.Clock()
+        frame_count = 0
 
-        while self.__is_running:
-            dt = self.__clock.tick(self.__fps_lock)
+        while self.__is_running and (max_frames is None or frame_count < max_frames):
+            self.step()
+            frame_count += 1
 
-            if self.__active_scene:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        self.__is_running = not self.on_quit()
-                    elif event.type == pygame.KEYDOWN:
-                        self.__active_scene.on_key_down(event.key, event)
-                    elif event.type == pygame.KEYUP:
-                        self.__active_scene.on_key_up(event.key, event)
-                    elif event.type == pygame.MOUSEBUTTONDOWN:
-                        self.__active_scene.on_mouse_down(event.pos, event)
-                    elif event.type == pygame.MOUSEBUTTONUP:
-                        self.__active_scene.on_mouse_up(event.pos, event)
-                    elif event.type == pygame.JOYBUTTONDOWN:
-                        self.__active_scene.on_joy_button_down(event)
-                    elif event.type == pygame.JOYBUTTONUP:
-                        self.__active_scene.on_joy_button_up(event)
-                    elif event.type == pygame.JOYAXISMOTION:
-                        self.__active_scene.on_joy_motion(event)
-
-                    # print ('Game::run (): event.type=', event.type, ', Event=', event)
-
-                self.__active_scene.update(dt / 1000.0)
-                self.__active_scene.draw(self.__surface)
-
-                pygame.display.flip()
+        if max_frames is not None:
+            return frame_count
+
+        if self.__input_recorder:
+            self.stop_recording()
 
         pygame.mixer.quit()
         pygame.quit()
         sys.exit(0)
 
+    def step(self):
+
+        """
+            Runs a single frame of the game loop (events, update and draw)
+
+            In headless mode the loop is not capped by fps_lock and each frame advances the simulation
+            by exactly one tick (or 1 / fps_lock without a fixed tick rate) regardless of wall clock time.
+            When an input source is set (e.g replaying an input log) its events replace the live events.
+            The scene is only drawn in headless mode if rendering has been enabled with set_render_enabled ()
+        """
+
+        if self.__headless:
+            self.__clock.tick()
+            dt = 1000.0 / (self.__tick_rate or self.__fps_lock)
+        else:
+            dt = self.__clock.tick(self.__fps_lock)
+
+        work_start = time.perf_counter()
+
+        if self.__active_scene:
+            profiler = self.__profiler
+
+            if profiler:
+                profiler.begin_frame()
+                profiler.begin('events')
+
+            events = pygame.event.get()
+
+            if self.__input_source:
+                events = self.__input_source.get_events(self.__tick_count)
+            elif self.__input_recorder:
+                for event in events:
+                    self.__input_recorder.record(self.__tick_count, event)
+
+            for event in events:
+                self.__dispatch_event(event)
+
+            if profiler:
+                profiler.end('events')
+                profiler.begin('update')
+
+            if self.__tick_rate and self.__headless:
+                # Exactly one tick per frame, accumulating the synthetic frame time could drift
+                alpha = 0.0
+                self.__update_scene(1.0 / self.__tick_rate)
+            elif self.__tick_rate:
+                alpha = self.__update_fixed(dt / 1000.0)
+            else:
+                alpha = None
+                self.__update_scene(dt / 1000.0)
+
+            if profiler:
+                profiler.end('update')
+
+            if self.__render_enabled:
+                if profiler:
+                    profiler.begin('draw')
+
+                dirty_rects = self.__active_scene.draw(self.__render_surface, alpha)
+
+                if profiler:
+                    profiler.end('draw')
+                    profiler.begin('flip')
+
+                # The whole window is updated when scaling an offscreen render surface
+                if self.__render_surface is not self.__surface:
+                    self.__scale_to_window()
+                    dirty_rects = None
+
+                # Nothing is presented in headless mode, scenes in dirty rectangle mode return the changed
+                # regions unless a full redraw was needed
+                if self.__headless:
+                    pass
+                elif dirty_rects is None:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty_rects)
+
+                if profiler:
+                    profiler.end('flip')
+
+            # Sounds triggered during the frame are started together so duplicates can be coalesced
+            self.__sound_manager.update()
+
+            if profiler:
+                profiler.end_frame()
+
+        # Headless frames aren't paced (or usually drawn) so their times say nothing about the quality
+        if self.__quality_governor is not None and not self.__headless:
+            self.__quality_governor.add_frame_time((time.perf_counter() - work_start) * 1000.0)
+
+    def __dispatch_event(self, event):
+        if event.type == pygame.QUIT:
+            # A quit is recorded at the start of a frame that can still run several catch up ticks, replays
+            # run one tick per frame so they ignore it and stop at the end of the log instead
+            if self.__input_source is None:
+                self.__is_running = not self.on_quit()
+        elif event.type == pygame.KEYDOWN:
+            self.__active_scene.on_key_down(event.key, event)
+        elif event.type == pygame.KEYUP:
+            self.__active_scene.on_key_up(event.key, event)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self.__active_scene.on_mouse_down(self.__get_render_position(event.pos), event)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            self.__active_scene.on_mouse_up(self.__get_render_position(event.pos), event)
+        elif event.type == pygame.JOYBUTTONDOWN:
+            self.__active_scene.on_joy_button_down(event)
+        elif event.type == pygame.JOYBUTTONUP:
+            self.__active_scene.on_joy_button_up(event)
+        elif event.type == pygame.JOYAXISMOTION:
+            self.__active_scene.on_joy_motion(event)
+
+        # print ('Game::run (): event.type=', event.type, ', Event=', event)
+
+    def __scale_to_window(self):
+        if self.__smooth_scaling:
+            pygame.transform.smoothscale(self.__render_surface, self.__surface.get_size(), self.__surface)
+        else:
+            pygame.transform.scale(self.__render_surface, self.__surface.get_size(), self.__surface)
+
+    def __get_render_position(self, position):
+        if self.__render_surface is self.__surface:
+            return position
+
+        return (int(position[0] * self.__render_surface.get_width() / self.__surface.get_width()),
+                int(position[1] * self.__render_surface.get_height() / self.__surface.get_height()))
+
+    def __update_scene(self, dt):
+        self.__active_scene.update(dt)
+
+        self.__tick_count += 1
+        self.__time += dt
+
+    def __update_fixed(self, frame_time):
+
+        """
+            Advances the active scene in fixed size steps for the time elapsed since the last frame
+
+            :param frame_time:  (float) Time since the last frame in seconds
+            :return:            (float) Fraction of a step left over, used to interpolate rendering
+        """
+
+        step = 1.0 / self.__tick_rate
+        steps = 0
+
+        self.__accumulator += frame_time
+
+        while self.__accumulator >= step and steps < self.__max_catch_up_steps:
+            self.__update_scene(step)
+            self.__accumulator -= step
+            steps += 1
+
+        # If the simulation can't keep up drop the backlog rather than spiralling further behind
+        if self.__accumulator >= step:
+            self.__accumulator %= step
+
+        return self.__accumulator / step
+
+    @property
+    def tick_rate(self):
+        return self.__tick_rate
+
+    @property
+    def tick_count(self):
+
+        """
+            :return:    (int) Number of scene updates (simulation ticks) run
+        """
+
+        return self.__tick_count
+
+    @property
+    def time(self):
+
+        """
+            :return:    (float) Simulated time in seconds (the sum of the update time steps), gameplay code
+                        should use this (or the update dt) rather than the wall clock
+        """
+
+        return self.__time
+
+    @property
+    def seed(self):
+        return rng.RandomStreams.instance().seed
+
+    def set_seed(self, seed):
+
+        """
+            Re-seeds every random stream, call before creating scenes to reproduce a session
+        """
+
+        rng.RandomStreams.instance().set_seed(seed)
+
+    def random(self, name):
+
+        """
+            :param name:    (str) Subsystem name (e.g 'asteroids')
+            :return:        (random.Random) Seeded random number generator for the subsystem
+        """
+
+        return rng.RandomStreams.instance().get(name)
+
+    @property
+    def input_source(self):
+        return self.__input_source
+
+    def set_input_source(self, input_source):
+
+        """
+            Replaces live input with generated events (e.g an automated input policy), None restores live
+            input. The source must have a get_events (tick) method returning the events (pygame.event.Event)
+            to handle before the given simulation tick
+        """
+
+        self.__input_source = input_source
+
+    @property
+    def is_recording(self):
+        return self.__input_recorder is not None
+
+    def start_recording(self, path):
+
+        """
+            Records the input events handled on each tick to a file until stop_recording (), the session
+            can then be re-run with replay (). Requires a fixed tick rate and should be started before the
+            first tick of a scene created after set_seed ()
+        """
+
+        if not self.__tick_rate:
+            raise ValueError('Recording input requires a fixed tick rate')
+
+        self.__input_recorder = replay.InputRecorder(path, self.seed, self.__tick_rate, self.rect.size)
+
+    def stop_recording(self):
+
+        """
+            Writes the recording with the final tick count and the active scenes state checksum
+
+            :return:    (InputLog) Recorded log
+        """
+
+        recorder = self.__input_recorder
+        self.__input_recorder = None
+
+        if recorder is None:
+            return None
+
+        return recorder.finish(self.__tick_count, self.__active_scene.get_state_checksum())
+
+    def replay(self, log):
+
+        """
+            Re-runs a recorded session as fast as possible, the game should be headless, seeded with the
+            logs seed and render resolution (see InputLog.load ()) and have a freshly created active scene
+
+            :param log:     (InputLog or str) Input log or path to one
+            :return:        (bool) True if the final state checksum matches the recording
+        """
+
+        if isinstance(log, str):
+            log = replay.InputLog.load(log)
+
+        if log.tick_rate != self.__tick_rate or not self.__headless:
+            raise ValueError('Replays must run headless at the recorded tick rate ({0})'.format(log.tick_rate))
+
+        # Speeds and sizes are scaled to the render resolution so the session only plays the same at the
+        # resolution it was recorded at
+        if log.render_size is not None and tuple(log.render_size) != self.rect.size:
+            raise ValueError('Replays must run at the recorded render resolution ({0}x{1}), not {2}x{3}'.format(
+                log.render_size[0], log.render_size[1], self.rect.width, self.rect.height))
+
+        replayer = replay.InputReplayer(log)
+        self.__input_source = replayer
+
+        try:
+            self.run(log.tick_count - self.__tick_count)
+        finally:
+            self.__input_source = None
+
+        # Events handled after the last tick (e.g in the frame the game quit) can still change the state
+        for event in replayer.get_events(log.tick_count):
+            self.__dispatch_event(event)
+
+        return self.__active_scene.get_state_checksum() == log.checksum
+
+    def set_tick_rate(self, tick_rate, max_catch_up_steps=DEFAULT_MAX_CATCH_UP_STEPS):
+
+        """
+            Switches between fixed timestep simulation (tick_rate updates per second with interpolated
+            rendering) and variable timestep simulation (tick_rate=None, one update per frame)
+        """
+
+        self.__tick_rate = tick_rate
+        self.__max_catch_up_steps = max_catch_up_steps
+        self.__accumulator = 0.0
+
+    @property
+    def active_scene(self):
+        return self.__active_scene
+
     def set_active_scene(self, scene):
 
         if scene:
@@ -78,10 +467,121 @@ class Game(object):
     def fps(self):
         return self.__clock.get_fps()
 
+    @property
+    def fps_lock(self):
+        return self.__fps_lock
+
+    def set_fps_lock(self, fps_lock):
+        self.__fps_lock = fps_lock
+
+    @property
+    def frame_pacer(self):
+
+        """
+            :return:    (FramePacer) Frame clock or None if a different clock was given to the constructor
+        """
+
+        return self.__clock if isinstance(self.__clock, pacing.FramePacer) else None
+
+    def set_frame_pacing(self, mode):
+
+        """
+            Changes how the game loop waits for the next frame, see FramePacer
+
+            :param mode:    (str) One of FramePacer.MODE_*, MODE_VSYNC needs a display created with vsync
+        """
+
+        if self.frame_pacer is None:
+            raise ValueError('Frame pacing needs the default FramePacer clock')
+
+        if mode == pacing.FramePacer.MODE_VSYNC and not self.__vsync:
+            raise ValueError('VSync frame pacing needs a display created with vsync (see frame_pacing)')
+
+        self.__clock.set_mode(mode)
+
+    def get_frame_pacing_stats(self):
+
+        """
+            :return:    (dict) Frame interval jitter and missed deadline statistics (see FramePacer.get_stats ())
+                        or None if a different clock was given to the constructor
+        """
+
+        frame_pacer = self.frame_pacer
+
+        return frame_pacer.get_stats() if frame_pacer is not None else None
+
+    @property
+    def headless(self):
+        return self.__headless
+
+    @property
+    def profiler(self):
+        return self.__profiler
+
+    def set_profiler(self, profiler):
+
+        """
+            Enables per phase frame timing with a FrameProfiler, None disables profiling
+        """
+
+        self.__profiler = profiler
+
+    @property
+    def quality_governor(self):
+        return self.__quality_governor
+
+    def set_quality_governor(self, quality_governor):
+
+        """
+            Adapts the rendering quality to the frame time with a QualityGovernor, None disables it (the
+            current quality is kept, call QualityGovernor.reset () first to restore full quality)
+        """
+
+        self.__quality_governor = quality_governor
+
+    @property
+    def render_enabled(self):
+        return self.__render_enabled
+
+    def set_render_enabled(self, render_enabled):
+        self.__render_enabled = render_enabled
+
+    @property
+    def sound_manager(self):
+        return self.__sound_manager
+
+    def play_sound(self, sound, priority=None):
+
+        """
+            Plays a sound effect through the sound manager (at the end of the frame), sounds are not played
+            when running headless
+        """
+
+        self.__sound_manager.play(sound, priority)
+
     @property
     def rect(self):
+
+        """
+            :return:    (Rect) Area the scene is rendered to (the internal render resolution)
+        """
+
+        return self.__render_surface.get_rect()
+
+    @property
+    def window_rect(self):
         return self.__surface.get_rect()
 
+    @property
+    def render_scale(self):
+
+        """
+            :return:    (float) Internal render resolution relative to the window, sizes, speeds and
+                        distances designed for the window size should be multiplied by this
+        """
+
+        return self.__render_scale
+
     @property
     def image_cache(self):
         return self.__image_cache
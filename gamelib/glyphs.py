@@ -0,0 +1,239 @@
+import abc
+import pygame
+import gamelib
+
+_DEBUG_GLYPHS = gamelib.DEBUG_ASSETS and True
+
+
+class GlyphAtlas(abc.ABC):
+    """
+        GlyphAtlas
+
+        Base class for text rendered from pre-rasterised glyphs. Strings are composed by blitting each
+        glyph with a single Surface.blits () call instead of rasterising the whole string.
+
+        Rendered strings returned by get_image () are shared (and must not be modified) so repeated
+        strings (e.g '+100' or an unchanged FPS counter) are only composed once, a burst of identical
+        labels costs a dictionary lookup each.
+    """
+
+    MAX_CACHED_IMAGES = 256
+
+    def __init__(self):
+        self.__glyphs = dict()
+        self.__images = dict()
+
+    @abc.abstractmethod
+    def get_height(self):
+        pass
+
+    @abc.abstractmethod
+    def _create_glyph(self, char):
+        """
+            Called the first time a character is used, sub classes must implement this method
+
+            :param char:    (str) Character
+            :return:        (Surface, int) Glyph image and advance or None if the character is not supported
+        """
+
+        pass
+
+    def size(self, text):
+        return sum(glyph[1] for glyph in self.__get_glyphs(text)), self.get_height()
+
+    def render(self, text):
+
+        """
+            Composes a string on to a new surface
+
+            :param text:        (str) Text to render
+            :return:            (Surface) Rendered text
+        """
+
+        glyphs = self.__get_glyphs(text)
+
+        # New surfaces are cleared to transparent, allocating is cheaper than filling an existing surface
+        surface = pygame.Surface((max(sum(glyph[1] for glyph in glyphs), 1), self.get_height()), pygame.SRCALPHA)
+
+        self.__blit_glyphs(surface, glyphs, 0, 0, pygame.BLEND_RGBA_MAX)
+
+        return surface
+
+    def get_image(self, text):
+
+        """
+            :return:    (Surface) Shared rendered string (must not be modified)
+        """
+
+        image = self.__images.get(text)
+
+        if image is None:
+            if len(self.__images) >= GlyphAtlas.MAX_CACHED_IMAGES:
+                self.__images.clear()
+
+            image = self.render(text)
+            self.__images[text] = image
+
+        return image
+
+    def draw(self, surface, text, x, y):
+
+        """
+            Draws a string directly on to a surface
+
+            :return:    (Rect) Area drawn
+        """
+
+        glyphs = self.__get_glyphs(text)
+
+        self.__blit_glyphs(surface, glyphs, x, y, 0)
+
+        return pygame.Rect(x, y, sum(glyph[1] for glyph in glyphs), self.get_height())
+
+    def __get_glyphs(self, text):
+        glyphs = []
+
+        for char in text:
+            glyph = self.__glyphs.get(char)
+
+            if glyph is None:
+                glyph = self._create_glyph(char)
+
+                if glyph is None:
+                    if _DEBUG_GLYPHS:
+                        print('DBG: GlyphAtlas::__get_glyphs (): Unsupported character', repr(char))
+
+                    glyph = (None, 0)
+
+                self.__glyphs[char] = glyph
+
+            glyphs.append(glyph)
+
+        return glyphs
+
+    @staticmethod
+    def __blit_glyphs(surface, glyphs, x, y, special_flags):
+        blits = []
+
+        for image, advance in glyphs:
+            if image is not None:
+                blits.append((image, (x, y), None, special_flags))
+
+            x += advance
+
+        surface.blits(blits, doreturn=False)
+
+
+class FontGlyphAtlas(GlyphAtlas):
+    """
+        FontGlyphAtlas
+
+        Glyphs of a pygame font in a single colour. The printable ASCII characters are rasterised on to
+        one atlas surface up front, any other character is rasterised when first used.
+
+        Use FontGlyphAtlas.get () to share atlases between users of the same font and colour
+    """
+
+    _ATLAS_CHARACTERS = ''.join(chr(code) for code in range(32, 127))
+
+    _atlases = {}
+
+    @classmethod
+    def get(cls, font, color):
+        key = (font, tuple(color))
+        atlas = cls._atlases.get(key)
+
+        if atlas is None:
+            atlas = FontGlyphAtlas(font, color)
+            cls._atlases[key] = atlas
+
+        return atlas
+
+    def __init__(self, font, color):
+
+        """
+            :param font:    (Font) Font to rasterise
+            :param color:   (tuple) Text colour
+        """
+
+        super().__init__()
+
+        self.__font = font
+        self.__color = color
+        self.__atlas_glyphs = self.__create_atlas(FontGlyphAtlas._ATLAS_CHARACTERS)
+
+    def get_height(self):
+        return self.__font.get_height()
+
+    def _create_glyph(self, char):
+        glyph = self.__atlas_glyphs.get(char)
+
+        if glyph is None:
+            metrics = self.__font.metrics(char)[0]
+
+            if metrics is None:
+                return None
+
+            glyph = (self.__font.render(char, True, self.__color), metrics[4])
+
+        return glyph
+
+    def __create_atlas(self, characters):
+        images = []
+
+        for char, metrics in zip(characters, self.__font.metrics(characters)):
+            if metrics is not None:
+                images.append((char, self.__font.render(char, True, self.__color), metrics[4]))
+
+        atlas = pygame.Surface((max(sum(image.get_width() for char, image, advance in images), 1),
+                                max([image.get_height() for char, image, advance in images] + [1])),
+                               pygame.SRCALPHA)
+        atlas.fill((0, 0, 0, 0))
+
+        glyphs = dict()
+        x = 0
+
+        for char, image, advance in images:
+            atlas.blit(image, (x, 0), None, pygame.BLEND_RGBA_MAX)
+            glyphs[char] = (atlas.subsurface((x, 0) + image.get_size()), advance)
+
+            x += image.get_width()
+
+        return glyphs
+
+
+class BitmapGlyphAtlas(GlyphAtlas):
+    """
+        BitmapGlyphAtlas
+
+        Glyphs taken from a strip of fixed width character cells, e.g the digits in numbers.png:
+
+            BitmapGlyphAtlas (image_cache.get ('numbers'), '0123456789x', 20)
+    """
+
+    def __init__(self, image, characters, cell_width, spacing=0):
+
+        """
+            :param image:           (Surface) Image containing one cell per character
+            :param characters:      (str) Characters in the order they appear in the image
+            :param cell_width:      (int) Width of each character cell
+            :param spacing:         (int) Additional space between characters
+        """
+
+        super().__init__()
+
+        self.__height = image.get_height()
+        self.__cells = dict()
+
+        for index, char in enumerate(characters):
+            self.__cells[char] = (image.subsurface((index * cell_width, 0, cell_width, self.__height)),
+                                  cell_width + spacing)
+
+        if ' ' not in self.__cells:
+            self.__cells[' '] = (None, cell_width + spacing)
+
+    def get_height(self):
+        return self.__height
+
+    def _create_glyph(self, char):
+        return self.__cells.get(char)
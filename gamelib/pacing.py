@@ -0,0 +1,192 @@
+import collections
+import math
+import time
+import pygame
+
+
+class FramePacer(object):
+    """
+        FramePacer
+
+        Frame clock (a drop in for pygame.time.Clock, see the Game clock option) with a choice of ways to
+        wait for the next frame, and statistics on how evenly frames are delivered:
+
+            sleep       pygame.time.Clock.tick (), sleeps for the rest of the frame. Uses no CPU but the
+                        sleep is only accurate to a millisecond or more so frames arrive unevenly
+            busy        pygame.time.Clock.tick_busy_loop (), spins for the rest of the frame. Accurate but
+                        keeps a core busy
+            hybrid      Sleeps until shortly before the deadline then spins for the last part, nearly as
+                        accurate as busy with a fraction of the CPU use. Deadlines are kept on a fixed
+                        schedule so the error of one frame isn't carried into the next
+            vsync       Doesn't wait, the display flip blocks until the next vertical blank (the display
+                        must be created with vsync, see Game)
+
+        Jitter is the standard deviation of the frame intervals. A frame misses its deadline when its
+        interval is more than half a frame longer than the target (it was shown a frame late).
+    """
+
+    MODE_SLEEP = 'sleep'
+    MODE_BUSY_LOOP = 'busy'
+    MODE_HYBRID = 'hybrid'
+    MODE_VSYNC = 'vsync'
+
+    MODES = [MODE_SLEEP, MODE_BUSY_LOOP, MODE_HYBRID, MODE_VSYNC]
+
+    DEFAULT_SPIN_TIME = 0.002           # Seconds spent spinning before each hybrid deadline
+    DEFAULT_HISTORY = 300               # Frame intervals kept for the statistics
+
+    def __init__(self, mode=MODE_SLEEP, spin_time=DEFAULT_SPIN_TIME, history=DEFAULT_HISTORY):
+
+        """
+            :param mode:        (str) One of MODE_*
+            :param spin_time:   (float) Seconds the hybrid mode spins for at the end of a frame, raise it if
+                                sleeps on the machine overshoot by more than this
+            :param history:     (int) Number of frame intervals kept for the statistics
+        """
+
+        if mode not in FramePacer.MODES:
+            raise ValueError('Unknown frame pacing mode {0}'.format(mode))
+
+        self.__mode = mode
+        self.__spin_time = spin_time
+        self.__clock = pygame.time.Clock()
+
+        self.__intervals = collections.deque(maxlen=history)
+        self.__last_time = None
+        self.__deadline = None
+        self.__target_ms = 0.0
+
+        self.__frame_count = 0
+        self.__missed_count = 0
+
+    @property
+    def mode(self):
+        return self.__mode
+
+    def set_mode(self, mode):
+        if mode not in FramePacer.MODES:
+            raise ValueError('Unknown frame pacing mode {0}'.format(mode))
+
+        self.__mode = mode
+        self.__deadline = None
+
+    def tick(self, framerate=0):
+
+        """
+            Waits for the next frame (see the class description for how)
+
+            :param framerate:   (int) Frames per second to pace to, 0 to return immediately
+            :return:            (float) Milliseconds since the previous call (not rounded to whole
+                                milliseconds like pygame.time.Clock)
+        """
+
+        if framerate and self.__mode == FramePacer.MODE_HYBRID:
+            self.__wait_hybrid(1.0 / framerate)
+        elif framerate and self.__mode == FramePacer.MODE_BUSY_LOOP:
+            self.__clock.tick_busy_loop(framerate)
+        elif framerate and self.__mode == FramePacer.MODE_SLEEP:
+            self.__clock.tick(framerate)
+
+        now = time.perf_counter()
+        last_time = self.__last_time
+
+        self.__last_time = now
+        self.__target_ms = 1000.0 / framerate if framerate else 0.0
+
+        if last_time is None:
+            return 0.0
+
+        interval = (now - last_time) * 1000.0
+
+        self.__intervals.append(interval)
+        self.__frame_count += 1
+
+        if framerate and interval > self.__target_ms * 1.5:
+            self.__missed_count += 1
+
+        return interval
+
+    def get_fps(self):
+        if not self.__intervals:
+            return 0.0
+
+        mean = sum(self.__intervals) / len(self.__intervals)
+
+        return 1000.0 / mean if mean else 0.0
+
+    def get_rawtime(self):
+        return self.__clock.get_rawtime()
+
+    @property
+    def frame_count(self):
+        return self.__frame_count
+
+    @property
+    def missed_count(self):
+
+        """
+            :return:    (int) Frames that missed their deadline since the pacer was created or reset
+        """
+
+        return self.__missed_count
+
+    def reset_stats(self):
+        self.__intervals.clear()
+        self.__frame_count = 0
+        self.__missed_count = 0
+
+    def get_stats(self):
+
+        """
+            :return:    (dict) Pacing mode, target and the mean, percentiles, jitter and maximum of the recent
+                        frame intervals in milliseconds, and the missed deadline count and ratio
+        """
+
+        intervals = sorted(self.__intervals)
+        count = len(intervals)
+
+        stats = {
+            'mode': self.__mode,
+            'target_ms': self.__target_ms,
+            'frames': self.__frame_count,
+            'missed_deadlines': self.__missed_count,
+            'missed_ratio': self.__missed_count / self.__frame_count if self.__frame_count else 0.0,
+        }
+
+        if count:
+            mean = sum(intervals) / count
+
+            stats.update({
+                'mean_ms': mean,
+                'p50_ms': intervals[int(0.50 * (count - 1))],
+                'p95_ms': intervals[int(0.95 * (count - 1))],
+                'p99_ms': intervals[int(0.99 * (count - 1))],
+                'max_ms': intervals[-1],
+                'jitter_ms': math.sqrt(sum((interval - mean) ** 2 for interval in intervals) / count),
+            })
+
+        return stats
+
+    def __wait_hybrid(self, period):
+        now = time.perf_counter()
+        deadline = self.__deadline
+
+        # Keep to a fixed schedule (a slightly late frame is made up over the next few), but start a new
+        # schedule after a stall instead of rushing frames out to catch up
+        if deadline is None:
+            deadline = now
+        else:
+            deadline += period
+
+            if now - deadline > period:
+                deadline = now
+
+        remaining = deadline - now - self.__spin_time
+
+        if remaining > 0:
+            time.sleep(remaining)
+
+        while time.perf_counter() < deadline:
+            pass
+
+        self.__deadline = deadline
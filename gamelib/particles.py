@@ -0,0 +1,378 @@
+import math
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_available():
+    return numpy is not None
+
+
+class ParticleClass(object):
+    """
+        ParticleClass
+
+        Look and behaviour shared by a class of particles (e.g sparks or smoke). Particles aren't drawn
+        individually, each class has a pre-rendered stamp for every step of its color ramp and a particle
+        is drawn with the stamp for how far through its life it is.
+    """
+
+    def __init__(self, stamps, drag=0.0, additive=False):
+
+        """
+            :param stamps:      (Surface[]) Images from the start to the end of a particles life
+            :param drag:        (float) Fraction of the velocity lost per second (0 - 1)
+            :param additive:    (bool) Add the stamps to the surface (glow) instead of blitting them over it
+        """
+
+        self._stamps = stamps
+        self._drag = drag
+        self._blend = pygame.BLEND_RGB_ADD if additive else 0
+
+    @classmethod
+    def create(cls, radius, colors, steps=8, drag=0.0, additive=False):
+
+        """
+            Creates a class of round particles that fade through a list of colors
+
+            :param radius:      (float) Radius of the particles in pixels
+            :param colors:      (tuple[]) Colors the particles fade through (at least one)
+            :param steps:       (int) Number of stamps in the color ramp
+            :param drag:        (float) Fraction of the velocity lost per second (0 - 1)
+            :param additive:    (bool) Add the stamps to the surface instead of blitting them over it
+            :return:            (ParticleClass) Particle class
+        """
+
+        size = max(1, int(math.ceil(radius * 2)))
+        stamps = []
+
+        for step in range(steps):
+            color = ParticleClass.__get_ramp_color(colors, step / max(1, steps - 1))
+
+            # Additive stamps are drawn on black (adding black changes nothing) so they don't need a
+            # colorkey or per pixel alpha, the fastest kind of blit
+            stamp = pygame.Surface((size, size))
+            stamp.fill((0, 0, 0))
+
+            if size > 2:
+                pygame.draw.circle(stamp, color, (size // 2, size // 2), max(1, int(radius)))
+            else:
+                stamp.fill(color)
+
+            if not additive:
+                stamp.set_colorkey((0, 0, 0))
+
+            stamps.append(stamp)
+
+        return cls(stamps, drag, additive)
+
+    @property
+    def stamps(self):
+        return self._stamps
+
+    @property
+    def drag(self):
+        return self._drag
+
+    @property
+    def blend(self):
+        return self._blend
+
+    @staticmethod
+    def __get_ramp_color(colors, t):
+        if len(colors) == 1:
+            return colors[0]
+
+        position = t * (len(colors) - 1)
+        index = min(int(position), len(colors) - 2)
+        t = position - index
+
+        return tuple(int(a + (b - a) * t) for a, b in zip(colors[index], colors[index + 1]))
+
+
+class ParticleSystem(object):
+    """
+        ParticleSystem
+
+        Thousands of short lived particles (debris, sparks, exhaust) without a scene node each. Position,
+        velocity, life, drag and class of every particle are stored in NumPy arrays, update () moves and
+        ages all of them in a single vectorised pass and draw () blits every live particle with one
+        Surface.blits () call per particle class.
+
+        Particles are purely visual, they don't collide and aren't part of the simulation state (they draw
+        from their own random generator and are left out of the scene checksum). A particle system is added
+        to a scene with Scene.add_world () and drawn in its scene layer.
+
+        Note: Requires NumPy, use is_available () to check before creating a particle system
+    """
+
+    DEFAULT_CAPACITY = 1024
+    DEFAULT_MAX_CAPACITY = 8192
+
+    def __init__(self, layer, capacity=DEFAULT_CAPACITY, max_capacity=DEFAULT_MAX_CAPACITY, seed=0):
+
+        """
+            :param layer:           (int) Scene layer the particles are drawn in
+            :param capacity:        (int) Initial number of particles, the arrays grow as required
+            :param max_capacity:    (int) Maximum number of live particles, further particles are not emitted
+            :param seed:            (int) Seed of the random generator used to scatter new particles
+        """
+
+        if numpy is None:
+            raise RuntimeError('ParticleSystem requires NumPy')
+
+        self.__layer = layer
+        self.__max_capacity = max_capacity
+        self.__count = 0
+        self.__enabled = True
+        self.__dt = 0.0
+        self.__classes = []
+        self.__random = numpy.random.default_rng(seed)
+
+        self.__positions = numpy.zeros((capacity, 2))
+        self.__velocities = numpy.zeros((capacity, 2))
+        self.__life = numpy.zeros(capacity)
+        self.__max_life = numpy.ones(capacity)
+        self.__drags = numpy.zeros(capacity)
+        self.__class_ids = numpy.zeros(capacity, dtype=numpy.int32)
+
+        self.__dropped = 0
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def dropped_count(self):
+
+        """
+            :return:    (int) Particles not emitted because the system was full
+        """
+
+        return self.__dropped
+
+    @property
+    def layers(self):
+        return numpy.full(1 if self.__count else 0, self.__layer, dtype=numpy.int32)
+
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    def set_enabled(self, enabled):
+
+        """
+            Disabled systems ignore emit () (e.g while nothing is being drawn), disabling removes all particles
+        """
+
+        self.__enabled = enabled
+
+        if not enabled:
+            self.clear()
+
+    def add_class(self, particle_class):
+
+        """
+            :param particle_class:  (ParticleClass) Class to add
+            :return:                (int) Class id used to emit particles
+        """
+
+        self.__classes.append(particle_class)
+
+        return len(self.__classes) - 1
+
+    def emit(self, class_id, count, x, y, speed=(0.0, 100.0), direction=None, spread=360.0, life=(0.5, 1.0),
+             velocity=(0.0, 0.0), radius=0.0):
+
+        """
+            Emits a burst of particles
+
+            :param class_id:    (int) Class id from add_class ()
+            :param count:       (int) Number of particles
+            :param x:           (float) Emitter position on the x-axis
+            :param y:           (float) Emitter position on the y-axis
+            :param speed:       (tuple) Minimum and maximum speed in pixels per second
+            :param direction:   (Vector2) Direction the particles are emitted in, None for any direction
+            :param spread:      (float) Angle in degrees around the direction the particles are scattered over
+            :param life:        (tuple) Minimum and maximum life in seconds
+            :param velocity:    (tuple) Velocity of the emitter added to every particle
+            :param radius:      (float) Radius of the circle the particles start in
+        """
+
+        if not self.__enabled:
+            return
+
+        requested = int(count)
+        count = min(requested, self.__max_capacity - self.__count)
+
+        self.__dropped += requested - max(0, count)
+
+        if count <= 0:
+            return
+
+        while self.__count + count > len(self.__life):
+            self.__grow()
+
+        start = self.__count
+        end = start + count
+        rng = self.__random
+
+        base_angle = 0.0 if direction is None else math.atan2(direction[1], direction[0])
+        spread = math.radians(360.0 if direction is None else spread)
+
+        angles = base_angle + rng.uniform(-spread / 2, spread / 2, count)
+        speeds = rng.uniform(speed[0], speed[1], count)
+
+        self.__velocities[start:end, 0] = numpy.cos(angles) * speeds + velocity[0]
+        self.__velocities[start:end, 1] = numpy.sin(angles) * speeds + velocity[1]
+
+        self.__positions[start:end, 0] = x
+        self.__positions[start:end, 1] = y
+
+        if radius:
+            offsets = rng.uniform(0.0, radius, count)
+            self.__positions[start:end, 0] += numpy.cos(angles) * offsets
+            self.__positions[start:end, 1] += numpy.sin(angles) * offsets
+
+        lives = rng.uniform(life[0], life[1], count)
+
+        self.__life[start:end] = lives
+        self.__max_life[start:end] = lives
+        self.__drags[start:end] = self.__classes[class_id].drag
+        self.__class_ids[start:end] = class_id
+
+        self.__count = end
+
+    def clear(self):
+        self.__count = 0
+
+    def update(self, dt):
+
+        """
+            Moves and ages every particle and removes the particles that have expired
+
+            :param dt:  (float) Time since last update in seconds
+        """
+
+        self.__dt = dt
+
+        if self.__count == 0:
+            return
+
+        count = self.__count
+
+        velocities = self.__velocities[:count]
+        velocities *= numpy.clip(1.0 - self.__drags[:count] * dt, 0.0, 1.0)[:, None]
+
+        self.__positions[:count] += velocities * dt
+
+        life = self.__life[:count]
+        life -= dt
+
+        alive = life > 0
+
+        if not alive.all():
+            # Keep the arrays packed, live particles keep their order
+            live = numpy.flatnonzero(alive)
+            self.__count = len(live)
+
+            for array in (self.__positions, self.__velocities, self.__life, self.__max_life, self.__drags,
+                          self.__class_ids):
+                array[:self.__count] = array[live]
+
+    def draw(self, surface, layer, alpha=None):
+
+        """
+            :param layer:   (int) Scene layer being drawn, particles are only drawn in their own layer
+            :param alpha:   (float) Interpolation between the previous and current update or None
+        """
+
+        if layer != self.__layer or self.__count == 0:
+            return
+
+        count = self.__count
+        positions = self.__positions[:count]
+
+        if alpha is not None:
+            # Particles move in straight lines over an update so step back along their velocity
+            positions = positions + self.__velocities[:count] * ((alpha - 1.0) * self.__dt)
+
+        progress = 1.0 - self.__life[:count] / self.__max_life[:count]
+        class_ids = self.__class_ids[:count]
+
+        for class_id, particle_class in enumerate(self.__classes):
+            rows = class_ids == class_id
+
+            if not rows.any():
+                continue
+
+            stamps = particle_class.stamps
+            half_size = stamps[0].get_width() / 2
+            steps = numpy.minimum((progress[rows] * len(stamps)).astype(numpy.int32), len(stamps) - 1)
+
+            blend = particle_class.blend
+            destinations = (positions[rows] - half_size).astype(numpy.int32).tolist()
+
+            surface.blits([(stamps[step], destination, None, blend)
+                           for step, destination in zip(steps.tolist(), destinations)], False)
+
+    def update_digest(self, digest):
+        # Particles are visual only and aren't part of the simulation state
+        pass
+
+    def __grow(self):
+        capacity = min(len(self.__life) * 2, self.__max_capacity)
+
+        self.__positions, self.__velocities, self.__life, self.__max_life, self.__drags, self.__class_ids = \
+            [numpy.resize(array, (capacity,) + array.shape[1:])
+             for array in (self.__positions, self.__velocities, self.__life, self.__max_life, self.__drags,
+                           self.__class_ids)]
+
+
+class Emitter(object):
+    """
+        Emits particles continuously at a fixed rate (e.g engine exhaust), fractions of a particle are
+        carried over to the next update so the rate doesn't depend on the frame rate
+    """
+
+    def __init__(self, system, class_id, rate, speed=(0.0, 100.0), spread=360.0, life=(0.5, 1.0)):
+
+        """
+            :param system:      (ParticleSystem) System to emit into
+            :param class_id:    (int) Class id of the particles
+            :param rate:        (float) Particles per second
+            :param speed:       (tuple) Minimum and maximum speed in pixels per second
+            :param spread:      (float) Angle in degrees the particles are scattered over
+            :param life:        (tuple) Minimum and maximum life in seconds
+        """
+
+        self._system = system
+        self._class_id = class_id
+        self._rate = rate
+        self._speed = speed
+        self._spread = spread
+        self._life = life
+        self._pending = 0.0
+
+    @property
+    def system(self):
+        return self._system
+
+    def emit(self, dt, x, y, direction=None, velocity=(0.0, 0.0)):
+
+        """
+            :param dt:          (float) Time since last update in seconds
+            :param direction:   (Vector2) Direction to emit the particles in or None for any direction
+            :param velocity:    (tuple) Velocity of the emitter added to every particle
+        """
+
+        self._pending += self._rate * dt
+        count = int(self._pending)
+
+        if count:
+            self._pending -= count
+            self._system.emit(self._class_id, count, x, y, self._speed, direction, self._spread, self._life,
+                              velocity)
@@ -0,0 +1,290 @@
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_available():
+    return numpy is not None
+
+
+class PhysicsWorld(pygame.sprite.AbstractGroup):
+    """
+        PhysicsWorld
+
+        Opt-in structure of arrays integrator for KinematicSprites. The kinematic state of every sprite
+        added to the world (position, velocity, acceleration, drag, max velocity, TTL and screen wrap) is
+        stored in NumPy arrays and integrated in a single batched step per frame, the sprites themselves
+        become thin views onto their slot in the arrays.
+
+        The world is a sprite group so killing a sprite releases its slot automatically.
+
+        Note: Requires NumPy, use is_available () to check before creating a world
+    """
+
+    DEFAULT_CAPACITY = 256
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+
+        """
+            :param capacity:    (int) Initial number of slots, the arrays grow as required
+        """
+
+        if numpy is None:
+            raise RuntimeError('PhysicsWorld requires NumPy')
+
+        super().__init__()
+
+        self.__count = 0
+        self.__sprites = []
+        self.__bodies = dict()
+
+        self.__positions = numpy.zeros((capacity, 2))
+        self.__velocities = numpy.zeros((capacity, 2))
+        self.__accelerations = numpy.zeros((capacity, 2))
+        self.__drags = numpy.zeros((capacity, 2))
+        self.__max_velocities = numpy.zeros((capacity, 2))
+
+        self.__time_to_live = numpy.zeros(capacity)
+        self.__has_time_to_live = numpy.zeros(capacity, dtype=bool)
+
+        self.__wrap_rects = numpy.zeros((capacity, 4))      # left, top, right, bottom
+        self.__has_wrap = numpy.zeros(capacity, dtype=bool)
+
+        # Step times set for the next step only, e.g by Scene for bodies of throttled sprites
+        self.__step_times = numpy.zeros(capacity)
+        self.__has_step_time = numpy.zeros(capacity, dtype=bool)
+        self.__step_time_count = 0
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def capacity(self):
+        return len(self.__positions)
+
+    @property
+    def bodies(self):
+
+        """
+            :return:    (list) Sprites in body order, i.e the sprite at index n owns row n of positions and
+                        velocities (the order changes as sprites are removed)
+        """
+
+        return self.__sprites
+
+    @property
+    def positions(self):
+
+        """
+            :return:    (ndarray) Read only (count, 2) view of the body positions
+        """
+
+        return self.__get_view(self.__positions)
+
+    @property
+    def velocities(self):
+
+        """
+            :return:    (ndarray) Read only (count, 2) view of the body velocities
+        """
+
+        return self.__get_view(self.__velocities)
+
+    def __get_view(self, array):
+        view = array[:self.__count]
+        view.flags.writeable = False
+
+        return view
+
+    def step(self, dt):
+
+        """
+            Integrates every body in the world and kills any sprite whose TTL has expired
+
+            :param dt:  (float) Time since last update in seconds
+        """
+
+        n = self.__count
+
+        if n == 0:
+            return
+
+        # Bodies with their own step time (see set_step_time ()) are stepped with a per body time, the
+        # arrays broadcast the same way as a single time
+        if self.__step_time_count:
+            has_step_time = self.__has_step_time[:n]
+
+            dt = numpy.where(has_step_time, self.__step_times[:n], dt)
+            step_times = dt[:, None]
+
+            has_step_time[:] = False
+            self.__step_time_count = 0
+        else:
+            step_times = dt
+
+        velocities = self.__velocities[:n]
+        accelerations = self.__accelerations[:n]
+        drags = self.__drags[:n] * step_times
+        max_velocities = self.__max_velocities[:n]
+
+        # Same rules as KinematicSprite: acceleration takes priority over drag, drag slows each axis
+        # towards zero without overshooting, then the result is clamped to the max velocity
+
+        is_accelerating = accelerations != 0
+        has_drag = ~is_accelerating & (drags != 0)
+
+        dragged = numpy.where(velocities - drags > 0, velocities - drags,
+                              numpy.where(velocities + drags < 0, velocities + drags, 0))
+
+        velocities += numpy.where(is_accelerating, accelerations * step_times, 0)
+        velocities[has_drag] = dragged[has_drag]
+
+        numpy.clip(velocities, -max_velocities, max_velocities, out=velocities)
+
+        positions = self.__positions[:n]
+        positions += velocities * step_times
+
+        if self.__has_wrap[:n].any():
+            self.__wrap(positions, self.__wrap_rects[:n], self.__has_wrap[:n])
+
+        has_time_to_live = self.__has_time_to_live[:n]
+
+        if has_time_to_live.any():
+            time_to_live = self.__time_to_live[:n]
+            time_to_live -= numpy.where(has_time_to_live, dt, 0)
+
+            expired = numpy.flatnonzero(has_time_to_live & (time_to_live <= 0))
+
+            # Collect the sprites before killing them as each kill moves the last body into the freed slot
+            for sprite in [self.__sprites[index] for index in expired]:
+                sprite.kill()
+
+    @staticmethod
+    def __wrap(positions, wrap_rects, has_wrap):
+        # Batched version of utils.clamp_point_to_rect ()
+
+        x = positions[:, 0]
+        y = positions[:, 1]
+
+        left, top, right, bottom = wrap_rects.T
+
+        x_under = has_wrap & (x < left)
+        x_over = has_wrap & ~x_under & (x > right)
+        y_under = has_wrap & (y < top)
+        y_over = has_wrap & ~y_under & (y > bottom)
+
+        x[x_under] = right[x_under] + (left[x_under] - x[x_under])
+        x[x_over] = left[x_over] + (x[x_over] - right[x_over])
+        y[y_under] = bottom[y_under] + (y[y_under] - top[y_under])
+        y[y_over] = top[y_over] + (y[y_over] - bottom[y_over])
+
+    def get_position(self, body):
+        return self.__positions[body, 0], self.__positions[body, 1]
+
+    def get_velocity(self, body):
+        return self.__velocities[body, 0], self.__velocities[body, 1]
+
+    def get_acceleration(self, body):
+        return self.__accelerations[body, 0], self.__accelerations[body, 1]
+
+    def get_drag(self, body):
+        return self.__drags[body, 0], self.__drags[body, 1]
+
+    def get_max_velocity(self, body):
+        return self.__max_velocities[body, 0], self.__max_velocities[body, 1]
+
+    def get_time_to_live(self, body):
+        return float(self.__time_to_live[body]) if self.__has_time_to_live[body] else None
+
+    def set_position(self, body, x, y):
+        self.__positions[body] = (x, y)
+
+    def set_velocity(self, body, x, y):
+        self.__velocities[body] = (x, y)
+
+    def set_acceleration(self, body, x, y):
+        self.__accelerations[body] = (x, y)
+
+    def set_drag(self, body, x, y):
+        self.__drags[body] = (x, y)
+
+    def set_max_velocity(self, body, x, y):
+        self.__max_velocities[body] = (x, y)
+
+    def set_time_to_live(self, body, time_to_live):
+        self.__has_time_to_live[body] = time_to_live is not None
+        self.__time_to_live[body] = time_to_live if time_to_live is not None else 0
+
+    def set_step_time(self, body, step_time):
+
+        """
+            Steps a body by step_time instead of the full time in the next step () only
+
+            :param step_time:   (float) Time in seconds, 0 to leave the body where it is
+        """
+
+        if not self.__has_step_time[body]:
+            self.__has_step_time[body] = True
+            self.__step_time_count += 1
+
+        self.__step_times[body] = step_time
+
+    def set_wrap(self, body, wrap_rect):
+        self.__has_wrap[body] = wrap_rect is not None
+
+        if wrap_rect is not None:
+            self.__wrap_rects[body] = (wrap_rect.left, wrap_rect.top, wrap_rect.right, wrap_rect.bottom)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+
+        if self.__count == self.capacity:
+            self.__grow()
+
+        body = self.__count
+
+        self.__sprites.append(sprite)
+        self.__bodies[sprite] = body
+        self.__has_step_time[body] = False
+        self.__count += 1
+
+        sprite._attach_physics_body(self, body)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+
+        sprite._detach_physics_body()
+
+        # Keep the arrays packed by moving the last body into the slot being freed
+        body = self.__bodies.pop(sprite)
+        last = self.__count - 1
+
+        if body != last:
+            for array in self.__get_arrays():
+                array[body] = array[last]
+
+            moved_sprite = self.__sprites[last]
+
+            self.__sprites[body] = moved_sprite
+            self.__bodies[moved_sprite] = body
+
+            moved_sprite._attach_physics_body(self, body)
+
+        self.__sprites.pop()
+        self.__count -= 1
+
+    def __grow(self):
+        capacity = self.capacity * 2
+
+        self.__positions, self.__velocities, self.__accelerations, self.__drags, self.__max_velocities, \
+            self.__time_to_live, self.__has_time_to_live, self.__wrap_rects, self.__has_wrap, self.__step_times, \
+            self.__has_step_time = [numpy.resize(array, (capacity,) + array.shape[1:]) for array in self.__get_arrays()]
+
+    def __get_arrays(self):
+        return [self.__positions, self.__velocities, self.__accelerations, self.__drags, self.__max_velocities,
+                self.__time_to_live, self.__has_time_to_live, self.__wrap_rects, self.__has_wrap, self.__step_times,
+                self.__has_step_time]
@@ -0,0 +1,90 @@
+import pygame
+
+
+class ObjectPool(pygame.sprite.AbstractGroup):
+    """
+        ObjectPool
+
+        Recycles short lived sprites (projectiles, explosions, floating text etc). Every sprite handed
+        out by the pool is a member of the pool group, so when the sprite is killed it is automatically
+        returned to the free list. Recycled sprites are re-initialised in place by calling their
+        reset () method with the same arguments the factory would be called with.
+    """
+
+    DEFAULT_MAX_SIZE = 256
+
+    _pools = []
+
+    def __init__(self, factory, name=None, max_size=DEFAULT_MAX_SIZE):
+
+        """
+            :param factory:     (callable) Creates a new sprite when the free list is empty
+            :param name:        (str) Name used when reporting statistics
+            :param max_size:    (int) Maximum number of free sprites kept for reuse
+        """
+
+        super().__init__()
+
+        self.__factory = factory
+        self.__name = name if name is not None else getattr(factory, '__name__', 'pool')
+        self.__max_size = max_size
+        self.__free = []
+
+        self.__created = 0
+        self.__reused = 0
+        self.__discarded = 0
+        self.__peak = 0
+
+        ObjectPool._pools.append(self)
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def stats(self):
+        return {
+            'live': len(self),
+            'free': len(self.__free),
+            'peak': self.__peak,
+            'created': self.__created,
+            'reused': self.__reused,
+            'discarded': self.__discarded,
+        }
+
+    @classmethod
+    def get_all_stats(cls):
+        return {pool.name: pool.stats for pool in cls._pools}
+
+    def acquire(self, *args, **kwargs):
+
+        """
+            Returns a recycled sprite reset with the given arguments or a new sprite if none are free
+        """
+
+        if self.__free:
+            sprite = self.__free.pop()
+            sprite.reset(*args, **kwargs)
+            self.__reused += 1
+        else:
+            sprite = self.__factory(*args, **kwargs)
+            self.__created += 1
+
+        self.add(sprite)
+        self.__peak = max(self.__peak, len(self))
+
+        return sprite
+
+    def clear_free(self):
+        self.__free.clear()
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+
+        if len(self.__free) < self.__max_size:
+            self.__free.append(sprite)
+        else:
+            self.__discarded += 1
+
+    def __repr__(self):
+        return 'name={0}, {1}'.format(self.__name, self.stats)
@@ -0,0 +1,231 @@
+import collections
+import json
+import time
+import pygame
+
+from gamelib import scene
+
+
+class FrameProfiler(object):
+    """
+        FrameProfiler
+
+        Records how long each phase of a frame takes (event pump, scene update per node class, collision
+        checks, scene draw per layer, display flip). The most recent frames are kept in a ring buffer which
+        can be shown with a ProfilerOverlay or exported as JSON lines or a Chrome trace
+        (chrome://tracing or https://ui.perfetto.dev)
+    """
+
+    DEFAULT_HISTORY = 300
+
+    def __init__(self, history=DEFAULT_HISTORY):
+
+        """
+            :param history:     (int) Number of frames kept in the ring buffer
+        """
+
+        self.__frames = collections.deque(maxlen=history)
+        self.__origin = time.perf_counter()
+        self.__frame_index = 0
+        self.__frame_start = None
+        self.__sections = None
+        self.__events = None
+        self.__open_sections = {}
+
+    @property
+    def frames(self):
+        return self.__frames
+
+    @property
+    def is_recording(self):
+        return self.__frame_start is not None
+
+    def begin_frame(self):
+        self.__frame_start = time.perf_counter()
+        self.__sections = collections.OrderedDict()
+        self.__events = []
+        self.__open_sections.clear()
+
+    def end_frame(self):
+        if self.__frame_start is None:
+            return
+
+        end = time.perf_counter()
+
+        self.__frames.append({
+            'frame': self.__frame_index,
+            'time_ms': (self.__frame_start - self.__origin) * 1000.0,
+            'duration_ms': (end - self.__frame_start) * 1000.0,
+            'sections': self.__sections,
+            'events': self.__events,
+        })
+
+        self.__frame_index += 1
+        self.__frame_start = None
+
+    def begin(self, name):
+        if self.__frame_start is not None:
+            self.__open_sections[name] = time.perf_counter()
+
+    def end(self, name):
+        start = self.__open_sections.pop(name, None)
+
+        if start is not None:
+            self.add(name, start, time.perf_counter())
+
+    def add(self, name, start, end):
+
+        """
+            Records a timed section, sections with the same name in a frame are accumulated
+
+            :param name:    (str) Section name (e.g 'update.Asteroid')
+            :param start:   (float) time.perf_counter () when the section started
+            :param end:     (float) time.perf_counter () when the section ended
+        """
+
+        if self.__frame_start is not None:
+            duration = (end - start) * 1000.0
+
+            self.__sections[name] = self.__sections.get(name, 0.0) + duration
+            self.__events.append((name, (start - self.__origin) * 1000.0, duration))
+
+    def accumulate(self, name, duration):
+
+        """
+            Adds to a sections total without recording a trace event, used for sections timed in many
+            small pieces (e.g per node updates)
+
+            :param name:        (str) Section name
+            :param duration:    (float) Duration in seconds
+        """
+
+        if self.__frame_start is not None:
+            self.__sections[name] = self.__sections.get(name, 0.0) + duration * 1000.0
+
+    def get_frame_times(self):
+        return [frame['duration_ms'] for frame in self.__frames]
+
+    def get_section_times(self, name):
+        return [frame['sections'].get(name, 0.0) for frame in self.__frames]
+
+    def export_json_lines(self, path):
+
+        """
+            Writes one JSON object per recorded frame with the accumulated time of each section
+        """
+
+        with open(path, 'w') as file:
+            for frame in self.__frames:
+                record = {key: value for key, value in frame.items() if key != 'events'}
+                file.write(json.dumps(record) + '\n')
+
+    def export_chrome_trace(self, path):
+
+        """
+            Writes the recorded frames in the Chrome trace event format, each frame and section is a
+            complete ('X') event so nested sections are shown under the phase that contains them
+        """
+
+        events = []
+
+        for frame in self.__frames:
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': frame['time_ms'] * 1000.0, 'dur': frame['duration_ms'] * 1000.0,
+                           'args': {'frame': frame['frame']}})
+
+            for name, start, duration in frame['events']:
+                events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                               'ts': start * 1000.0, 'dur': duration * 1000.0})
+
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+
+class ProfilerOverlay(scene.Scene.Node):
+    """
+        Scene node showing a graph of the profilers recent frame times. Each bar is one frame split into
+        the top level phases, the horizontal line marks the frame budget
+    """
+
+    DEFAULT_WIDTH = 600
+    DEFAULT_HEIGHT = 150
+
+    _BUDGET_COLOR = (200, 200, 200)
+    _BACKGROUND_COLOR = (0, 0, 0, 160)
+    _PHASE_COLORS = collections.OrderedDict([
+        ('events', (90, 90, 220)),
+        ('update', (60, 200, 60)),
+        ('collisions', (220, 160, 40)),
+        ('draw', (220, 60, 60)),
+        ('flip', (160, 60, 200)),
+    ])
+    _OTHER_COLOR = (120, 120, 120)
+
+    def __init__(self, x, y, profiler, budget_ms=1000.0 / 60, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+
+        """
+            :param x:           (int) Position of the overlays left edge
+            :param y:           (int) Position of the overlays top edge
+            :param profiler:    (FrameProfiler) Profiler to display
+            :param budget_ms:   (float) Frame budget in milliseconds, the graph is scaled to twice this
+        """
+
+        super().__init__()
+
+        self._profiler = profiler
+        self._budget_ms = budget_ms
+
+        self.__image = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.__rect = self.__image.get_rect()
+        self.__rect.topleft = (x, y)
+
+    def update(self, scene, dt):
+        image = self.__image
+        width, height = image.get_size()
+        scale = height / (self._budget_ms * 2)
+
+        image.fill(ProfilerOverlay._BACKGROUND_COLOR)
+
+        frames = list(self._profiler.frames)[-width // 2:]
+
+        for index, frame in enumerate(frames):
+            x = width - (len(frames) - index) * 2
+            bottom = height
+            total = 0.0
+
+            for phase, color in ProfilerOverlay._PHASE_COLORS.items():
+                duration = frame['sections'].get(phase, 0.0)
+
+                # Collisions are timed inside the update phase
+                if phase == 'update':
+                    duration -= frame['sections'].get('collisions', 0.0)
+
+                bottom = ProfilerOverlay.__draw_bar(image, x, bottom, duration * scale, color)
+                total += duration
+
+            ProfilerOverlay.__draw_bar(image, x, bottom, (frame['duration_ms'] - total) * scale,
+                                       ProfilerOverlay._OTHER_COLOR)
+
+        budget_y = height - int(self._budget_ms * scale)
+        pygame.draw.line(image, ProfilerOverlay._BUDGET_COLOR, (0, budget_y), (width, budget_y))
+
+        self.invalidate()
+
+        super().update(scene, dt)
+
+    @staticmethod
+    def __draw_bar(image, x, bottom, bar_height, color):
+        bar_height = int(bar_height)
+
+        if bar_height > 0:
+            image.fill(color, (x, bottom - bar_height, 2, bar_height))
+
+        return bottom - max(bar_height, 0)
+
+    @property
+    def image(self):
+        return self.__image
+
+    @property
+    def rect(self):
+        return self.__rect
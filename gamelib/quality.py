@@ -0,0 +1,173 @@
+import collections
+import time
+
+
+class QualityStep(object):
+    """
+        One way of trading visual quality for frame time (e.g drawing fewer background layers), see
+        QualityGovernor
+    """
+
+    def __init__(self, name, lower, restore):
+
+        """
+            :param name:    (str) Description used when logging changes
+            :param lower:   (callable) Called without arguments to lower the quality
+            :param restore: (callable) Called without arguments to restore the quality
+        """
+
+        self._name = name
+        self._lower = lower
+        self._restore = restore
+
+    @property
+    def name(self):
+        return self._name
+
+    def lower(self):
+        self._lower()
+
+    def restore(self):
+        self._restore()
+
+
+class QualityGovernor(object):
+    """
+        QualityGovernor
+
+        Keeps the frame time within a budget on machines that can't run at full quality. The governor
+        watches the rolling mean of the time the game loop spends working each frame (events, update, draw
+        and flip but not the frame cap wait). While it is over the budget the next quality step is applied;
+        once it is comfortably under the budget again the most recent step is restored. Every change waits
+        for a full window of new frame times so one step is judged before the next, and restoring needs more
+        headroom than lowering so the quality doesn't flip back and forth.
+
+        Steps are applied in the order they were added (cheapest visual loss first) and restored in reverse.
+        Changes are logged and kept in history. Install with Game.set_quality_governor ().
+    """
+
+    DEFAULT_WINDOW = 60                 # Frames averaged before deciding
+    DEFAULT_RESTORE_RATIO = 0.7         # Restore quality when the mean is below this fraction of the budget
+
+    def __init__(self, budget_ms, window=DEFAULT_WINDOW, restore_ratio=DEFAULT_RESTORE_RATIO, verbose=True):
+
+        """
+            :param budget_ms:       (float) Frame time budget in milliseconds (e.g 1000 / target fps)
+            :param window:          (int) Number of frames in the rolling mean
+            :param restore_ratio:   (float) Fraction of the budget the mean has to be under to restore quality
+            :param verbose:         (bool) Print every change
+        """
+
+        self.__budget_ms = budget_ms
+        self.__restore_ratio = restore_ratio
+        self.__verbose = verbose
+
+        self.__frame_times = collections.deque(maxlen=window)
+        self.__total = 0.0
+
+        self.__steps = []
+        self.__level = 0
+        self.__history = []
+
+    @property
+    def budget_ms(self):
+        return self.__budget_ms
+
+    def set_budget(self, budget_ms):
+        self.__budget_ms = budget_ms
+
+    @property
+    def steps(self):
+        return self.__steps
+
+    @property
+    def level(self):
+
+        """
+            :return:    (int) Number of quality steps currently applied (0 is full quality)
+        """
+
+        return self.__level
+
+    @property
+    def mean_frame_time(self):
+        return self.__total / len(self.__frame_times) if self.__frame_times else 0.0
+
+    @property
+    def history(self):
+
+        """
+            :return:    (dict[]) Every change made (time, action, step name, level and mean frame time)
+        """
+
+        return self.__history
+
+    def add_step(self, step):
+        self.__steps.append(step)
+
+    def add_steps(self, steps):
+        for step in steps:
+            self.add_step(step)
+
+    def add_frame_time(self, frame_time_ms):
+
+        """
+            :param frame_time_ms:   (float) Time the last frame took to process in milliseconds
+        """
+
+        frame_times = self.__frame_times
+
+        if len(frame_times) == frame_times.maxlen:
+            self.__total -= frame_times[0]
+
+        frame_times.append(frame_time_ms)
+        self.__total += frame_time_ms
+
+        if len(frame_times) < frame_times.maxlen:
+            return
+
+        mean = self.__total / len(frame_times)
+
+        if mean > self.__budget_ms and self.__level < len(self.__steps):
+            step = self.__steps[self.__level]
+            step.lower()
+
+            self.__level += 1
+            self.__on_changed('lowered', step, mean)
+        elif mean < self.__budget_ms * self.__restore_ratio and self.__level > 0:
+            self.__level -= 1
+
+            step = self.__steps[self.__level]
+            step.restore()
+
+            self.__on_changed('restored', step, mean)
+
+    def reset(self):
+
+        """
+            Restores every step (full quality)
+        """
+
+        while self.__level > 0:
+            self.__level -= 1
+            self.__steps[self.__level].restore()
+
+        self.__frame_times.clear()
+        self.__total = 0.0
+
+    def __on_changed(self, action, step, mean):
+        self.__history.append({
+            'time': time.time(),
+            'action': action,
+            'step': step.name,
+            'level': self.__level,
+            'mean_ms': mean,
+        })
+
+        if self.__verbose:
+            print('QualityGovernor: {0} {1} (level {2}/{3}, mean frame time {4:.1f}ms, budget {5:.1f}ms)'.format(
+                action.capitalize(), step.name, self.__level, len(self.__steps), mean, self.__budget_ms))
+
+        # The next decision is based only on frames run at the new quality
+        self.__frame_times.clear()
+        self.__total = 0.0
@@ -0,0 +1,160 @@
+import struct
+import pygame
+
+
+class InputLog(object):
+    """
+        InputLog
+
+        Input events recorded against the simulation tick they were handled on, plus everything needed to
+        re-run the session: the random seed, the tick rate, the render resolution (speeds and sizes are
+        scaled by it) and the final tick count and state checksum.
+
+        File layout (little endian): a header followed by one fixed size record per event. Version 1 logs
+        (without the render resolution) can still be loaded, their render_size is None
+    """
+
+    _MAGIC = b'SRIL'
+    _VERSION = 2
+    _HEADER = struct.Struct('<4sHQHIHH20s')     # magic, version, seed, tick rate, tick count, render size, checksum
+    _HEADER_V1 = struct.Struct('<4sHQHI20s')    # magic, version, seed, tick rate, tick count, checksum
+    _EVENT = struct.Struct('<IBiiif')           # tick, event code, three integer arguments, value
+
+    # Event types are stored as small codes, pygame's event type values are not guaranteed to be stable
+    _EVENT_CODES = {
+        pygame.QUIT: 0,
+        pygame.KEYDOWN: 1,
+        pygame.KEYUP: 2,
+        pygame.MOUSEBUTTONDOWN: 3,
+        pygame.MOUSEBUTTONUP: 4,
+        pygame.JOYBUTTONDOWN: 5,
+        pygame.JOYBUTTONUP: 6,
+        pygame.JOYAXISMOTION: 7,
+    }
+
+    _EVENT_TYPES = {code: event_type for event_type, code in _EVENT_CODES.items()}
+
+    def __init__(self, seed, tick_rate, render_size=None):
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.render_size = render_size  # (width, height) or None if unknown
+        self.tick_count = 0
+        self.checksum = bytes(20)
+        self.events = []                # (tick, event)
+
+    @staticmethod
+    def is_supported(event):
+        return event.type in InputLog._EVENT_CODES
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            width, height = self.render_size or (0, 0)
+
+            file.write(InputLog._HEADER.pack(InputLog._MAGIC, InputLog._VERSION, self.seed, self.tick_rate,
+                                             self.tick_count, width, height, self.checksum))
+
+            for tick, event in self.events:
+                file.write(InputLog._EVENT.pack(tick, InputLog._EVENT_CODES[event.type], *InputLog.__encode(event)))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        magic, version = struct.unpack_from('<4sH', data)
+
+        if magic != cls._MAGIC or version not in (1, cls._VERSION):
+            raise ValueError('Not an input log: {0}'.format(path))
+
+        if version == 1:
+            header = cls._HEADER_V1
+            _, _, seed, tick_rate, tick_count, checksum = header.unpack_from(data)
+            render_size = None
+        else:
+            header = cls._HEADER
+            _, _, seed, tick_rate, tick_count, width, height, checksum = header.unpack_from(data)
+            render_size = (width, height) if width and height else None
+
+        log = InputLog(seed, tick_rate, render_size)
+        log.tick_count = tick_count
+        log.checksum = checksum
+
+        for tick, code, a, b, c, value in cls._EVENT.iter_unpack(data[header.size:]):
+            log.events.append((tick, InputLog.__decode(cls._EVENT_TYPES[code], a, b, c, value)))
+
+        return log
+
+    @staticmethod
+    def __encode(event):
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            return event.key, getattr(event, 'mod', 0), 0, 0.0
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            return event.pos[0], event.pos[1], event.button, 0.0
+        elif event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+            return event.joy, event.button, 0, 0.0
+        elif event.type == pygame.JOYAXISMOTION:
+            return event.joy, event.axis, 0, event.value
+
+        return 0, 0, 0, 0.0
+
+    @staticmethod
+    def __decode(event_type, a, b, c, value):
+        if event_type in (pygame.KEYDOWN, pygame.KEYUP):
+            return pygame.event.Event(event_type, key=a, mod=b)
+        elif event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            return pygame.event.Event(event_type, pos=(a, b), button=c)
+        elif event_type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+            return pygame.event.Event(event_type, joy=a, instance_id=a, button=b)
+        elif event_type == pygame.JOYAXISMOTION:
+            return pygame.event.Event(event_type, joy=a, instance_id=a, axis=b, value=value)
+
+        return pygame.event.Event(event_type)
+
+
+class InputRecorder(object):
+    """
+        Records the input events handled by the game on each simulation tick, see Game.start_recording ()
+    """
+
+    def __init__(self, path, seed, tick_rate, render_size=None):
+        self.__path = path
+        self.__log = InputLog(seed, tick_rate, render_size)
+
+    @property
+    def log(self):
+        return self.__log
+
+    def record(self, tick, event):
+        if InputLog.is_supported(event):
+            self.__log.events.append((tick, event))
+
+    def finish(self, tick_count, checksum):
+        self.__log.tick_count = tick_count
+        self.__log.checksum = checksum
+        self.__log.save(self.__path)
+
+        return self.__log
+
+
+class InputReplayer(object):
+    """
+        Feeds the events of an InputLog back to the game on the ticks they were recorded on, see Game.replay ()
+    """
+
+    def __init__(self, log):
+        self.__log = log
+        self.__index = 0
+
+    @property
+    def log(self):
+        return self.__log
+
+    def get_events(self, tick):
+        events = []
+        log_events = self.__log.events
+
+        while self.__index < len(log_events) and log_events[self.__index][0] <= tick:
+            events.append(log_events[self.__index][1])
+            self.__index += 1
+
+        return events
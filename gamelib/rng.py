@@ -0,0 +1,83 @@
+import random
+import zlib
+
+
+class RandomStreams(object):
+    """
+        RandomStreams
+
+        Process wide set of named random number generators, one per subsystem (e.g 'asteroids', 'level').
+        Each stream is seeded from the master seed and a CRC of its name so the numbers drawn by one
+        subsystem don't depend on how many numbers another subsystem has drawn. Re-seeding resets the
+        existing streams in place so any references held by factories stay valid.
+    """
+
+    _SEED_MASK = 0xffffffffffffffff        # Seeds are unsigned 64 bit values (e.g so they fit in an InputLog)
+
+    _instance = None
+
+    def __init__(self, seed=0):
+        self.__seed = seed & RandomStreams._SEED_MASK
+        self.__streams = dict()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = RandomStreams()
+
+        return cls._instance
+
+    @property
+    def seed(self):
+        return self.__seed
+
+    def set_seed(self, seed):
+
+        """
+            :param seed:    (int) Master seed, any integer is wrapped to an unsigned 64 bit value (see seed)
+        """
+
+        self.__seed = seed & RandomStreams._SEED_MASK
+
+        for name, stream in self.__streams.items():
+            stream.seed(self.__get_stream_seed(name))
+
+    def get_state(self):
+
+        """
+            :return:    (dict) Internal state of every stream, e.g to run several independent simulations
+                        in one process by swapping their random state in and out
+        """
+
+        return {name: stream.getstate() for name, stream in self.__streams.items()}
+
+    def set_state(self, state):
+
+        """
+            Restores the streams to a state returned by get_state (), streams missing from the state are
+            re-seeded as if they had not been used yet
+        """
+
+        for name, stream in self.__streams.items():
+            if name in state:
+                stream.setstate(state[name])
+            else:
+                stream.seed(self.__get_stream_seed(name))
+
+    def get(self, name):
+
+        """
+            :param name:    (str) Subsystem name
+            :return:        (random.Random) Random number generator for the subsystem
+        """
+
+        stream = self.__streams.get(name)
+
+        if stream is None:
+            stream = random.Random(self.__get_stream_seed(name))
+            self.__streams[name] = stream
+
+        return stream
+
+    def __get_stream_seed(self, name):
+        return (self.__seed << 32) ^ zlib.crc32(name.encode('utf-8'))
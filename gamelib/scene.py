@@ -1,7 +1,13 @@
 import gamelib
+import hashlib
 import pygame
+import struct
+import time
 import abc
 
+from gamelib import glyphs
+from gamelib import utils
+
 _DEBUG_SPRITE_BOUNDS        = gamelib.DEBUG_SCENE and True
 _DEBUG_SPRITE_COLLISION     = gamelib.DEBUG_SCENE and True
 
@@ -11,10 +17,22 @@ class Scene (object):
 
     class Node (pygame.sprite.Sprite, abc.ABC):
 
+        # Reduced updates for nodes that are off-screen or idle, see set_update_throttle ()
+
+        UPDATE_FULL = 0             # update () at a lower rate
+        UPDATE_PHYSICS = 1          # update_physics () only, e.g keep moving but don't animate
+        UPDATE_ANIMATION = 2        # update_animation () only, e.g keep animating but don't move
+        UPDATE_NONE = 3             # Not updated at all
+
         def __init__ (self):
             super ().__init__ ()
             self.__scene = None
             self.__scene_layer = -1
+            self.__is_invalid = False
+
+            self.__update_throttle = None
+            self.__throttle_elapsed = 0.0
+            self.__throttle_ticks = 0
 
         @property
         def scene (self):
@@ -24,6 +42,42 @@ class Scene (object):
         def scene_layer (self):
             return self.__scene_layer
 
+        @property
+        def is_invalid (self):
+            return self.__is_invalid
+
+        def invalidate (self):
+
+            """
+                Flags the node for redrawing in dirty rectangle mode. Nodes only need to call this when
+                they draw onto their existing image, changes to the nodes rect or image are detected
+                automatically
+            """
+
+            self.__is_invalid = True
+
+        def validate (self):
+            self.__is_invalid = False
+
+        def begin_interpolation (self, alpha):
+
+            """
+                Called before drawing when the game runs a fixed timestep, nodes that move can position
+                themselves between their previous and current simulation state
+
+                :param alpha:   (float) Fraction of a simulation tick elapsed since the last update (0 - 1)
+            """
+
+            pass
+
+        def end_interpolation (self):
+
+            """
+                Called after drawing to restore the nodes simulation state
+            """
+
+            pass
+
         def update (self, scene, dt):
             super ().update (scene, dt)
 
@@ -35,6 +89,108 @@ class Scene (object):
                                     (self.rect.width // 2, self.rect.height // 2), self.radius, 1)
 
 
+        def update_physics (self, scene, dt):
+
+            """
+                Reduced update that only moves the node (see UPDATE_PHYSICS)
+            """
+
+            pass
+
+        def update_animation (self, scene, dt):
+
+            """
+                Reduced update that only animates the node (see UPDATE_ANIMATION)
+            """
+
+            pass
+
+        @property
+        def update_throttle (self):
+            return self.__update_throttle
+
+        @property
+        def is_idle (self):
+
+            """
+                :return:    (bool) True if the node has nothing to do (e.g it has stopped), throttled nodes
+                            get their reduced update while idle even when they are on-screen
+            """
+
+            return False
+
+        def set_update_throttle (self, mode, interval = 1):
+
+            """
+                Lets the scene update the node less while it is outside the scenes viewport or idle. The time
+                of skipped ticks is added to the next update so the node keeps to the simulation time. Throttles
+                only apply once the scene has a viewport (see Scene.set_viewport ())
+
+                :param mode:        (int) UPDATE_* update used while throttled or None to always fully update
+                :param interval:    (int) Ticks between reduced updates (1 to run one every tick)
+            """
+
+            self.__update_throttle = None if mode is None else (mode, max (1, interval))
+            self.__throttle_elapsed = 0.0
+            self.__throttle_ticks = 0
+
+            if self.__scene is not None:
+                self.__scene.update_node_throttle (self)
+
+        def update_throttled (self, scene, dt, is_throttled):
+
+            """
+                Called by the scene instead of update () for nodes with an update throttle
+
+                :param is_throttled:    (bool) True if the node is off-screen or idle
+            """
+
+            self.run_throttled_update (scene, *self.get_throttled_update (dt, is_throttled))
+
+        def get_throttled_update (self, dt, is_throttled):
+
+            """
+                Works out the update a node with an update throttle gets this tick, the scene asks every
+                throttled node before stepping its physics world so throttled bodies are stepped the same way
+
+                :param is_throttled:    (bool) True if the node is off-screen or idle
+                :return:                (tuple) UPDATE_* update to run (None to skip the tick) and the time
+                                        to update by (including the time of skipped ticks)
+            """
+
+            dt += self.__throttle_elapsed
+
+            if not is_throttled:
+                self.__throttle_elapsed = 0.0
+                self.__throttle_ticks = 0
+                return Scene.Node.UPDATE_FULL, dt
+
+            mode, interval = self.__update_throttle
+
+            self.__throttle_ticks += 1
+
+            if self.__throttle_ticks < interval:
+                self.__throttle_elapsed = dt
+                return None, dt
+
+            self.__throttle_elapsed = 0.0
+            self.__throttle_ticks = 0
+
+            return mode, dt
+
+        def run_throttled_update (self, scene, mode, dt):
+
+            """
+                Runs an update from get_throttled_update ()
+            """
+
+            if mode == Scene.Node.UPDATE_FULL:
+                self.update (scene, dt)
+            elif mode == Scene.Node.UPDATE_PHYSICS:
+                self.update_physics (scene, dt)
+            elif mode == Scene.Node.UPDATE_ANIMATION:
+                self.update_animation (scene, dt)
+
         def scene_add (self, scene, layer):
             self.__scene = scene
             self.__scene_layer = layer
@@ -51,9 +207,24 @@ class Scene (object):
 
     # --------------------------------------------------------------------------------------------------
 
+    DEFAULT_MAX_DIRTY_AREA = 0.5        # Fraction of the screen above which a full redraw is used
+
     def __init__ (self, game):
         self._game = game
         self._nodes = pygame.sprite.LayeredUpdates ()
+        self._physics_world = None
+        self._worlds = []
+
+        self._viewport = None
+        self._culling = True
+        self._culled_count = 0
+        self._throttled_nodes = pygame.sprite.Group ()
+        self._throttled_count = 0
+
+        self._dirty_rect_mode = False
+        self._max_dirty_area = Scene.DEFAULT_MAX_DIRTY_AREA
+        self._clear_color = (0, 0, 0)
+        self._drawn_nodes = dict ()
 
     @property
     def game (self):
@@ -65,7 +236,115 @@ class Scene (object):
 
     @property
     def object_count (self):
-        return len (self._nodes)
+        return len (self._nodes) + sum (world.count for world in self._worlds)
+
+    @property
+    def viewport (self):
+
+        """
+            :return:    (Rect) Visible region of the scene, nodes outside it aren't drawn and can be throttled
+        """
+
+        return self._viewport or self._game.rect
+
+    def set_viewport (self, viewport):
+
+        """
+            :param viewport:    (Rect) Visible region of the scene or None for the whole render surface (node
+                                update throttles only apply while a viewport is set)
+        """
+
+        self._viewport = None if viewport is None else pygame.Rect (viewport)
+
+    @property
+    def culling (self):
+        return self._culling
+
+    def set_culling (self, culling):
+
+        """
+            :param culling:     (bool) Only draw nodes whose rect intersects the viewport
+        """
+
+        self._culling = culling
+        self._culled_count = 0
+
+    @property
+    def culled_count (self):
+
+        """
+            :return:    (int) Nodes skipped by viewport culling in the last draw ()
+        """
+
+        return self._culled_count
+
+    @property
+    def throttled_count (self):
+
+        """
+            :return:    (int) Nodes that got a reduced update (or none) in the last update ()
+        """
+
+        return self._throttled_count
+
+    def update_node_throttle (self, node):
+
+        """
+            Called by nodes when their update throttle changes
+        """
+
+        if node.update_throttle is None:
+            self._throttled_nodes.remove (node)
+        elif node.alive ():
+            self._throttled_nodes.add (node)
+
+    @property
+    def physics_world (self):
+        return self._physics_world
+
+    def set_physics_world (self, physics_world):
+
+        """
+            Opt in to batched physics, all kinematic nodes in the scene (current and future) are added
+            to the world and integrated by a single PhysicsWorld.step () per update
+
+            :param physics_world:   (PhysicsWorld) World to use or None to use per sprite updates
+        """
+
+        if self._physics_world is not None:
+            self._physics_world.empty ()
+
+        self._physics_world = physics_world
+
+        if physics_world is not None:
+            for node in self._nodes:
+                if Scene.__is_kinematic (node):
+                    physics_world.add (node)
+
+    @property
+    def worlds (self):
+        return self._worlds
+
+    def add_world (self, world):
+
+        """
+            Adds an ECS world, its entities are updated after the nodes and drawn in their scene layer
+            alongside them so a scene can mix entities and nodes (e.g while moving node types over)
+
+            Note: World entities aren't tracked for dirty rectangles, a world can't be added while the scene
+            is in dirty rectangle mode (see set_dirty_rect_mode ())
+
+            :param world:   (ecs.World) World to add (or anything with the same update, draw, layers,
+                            count, clear and update_digest members, e.g a ParticleSystem)
+        """
+
+        if self._dirty_rect_mode:
+            raise ValueError ('Worlds can\'t be added to a scene in dirty rectangle mode')
+
+        self._worlds.append (world)
+
+    def remove_world (self, world):
+        self._worlds.remove (world)
 
     def add_node (self, node, scene_layer = -1):
         assert isinstance (node, Scene.Node)
@@ -73,15 +352,313 @@ class Scene (object):
         node.scene_add (self, scene_layer)
         self._nodes.add (node, layer=scene_layer)
 
+        if node.update_throttle is not None:
+            self._throttled_nodes.add (node)
+
+        if self._physics_world is not None and Scene.__is_kinematic (node):
+            self._physics_world.add (node)
+
     def add_nodes (self, nodes, scene_layer = -1):
         for node in nodes:
             self.add_node (node, scene_layer)
 
+    def clear (self):
+
+        """
+            Kills every node in the scene, call before discarding a scene so pooled nodes are recycled
+        """
+
+        for node in self._nodes.sprites ():
+            node.kill ()
+
+        for world in self._worlds:
+            world.clear ()
+
     def update (self, dt):
-        self._nodes.update (self, dt)
+        profiler = self._game.profiler
+
+        if profiler is not None and profiler.is_recording:
+            self.__update_profiled (dt, profiler)
+            return
+
+        throttled_updates = self.__get_throttled_updates (dt) if self.__is_throttling () else None
+
+        if self._physics_world is not None:
+            if throttled_updates:
+                Scene.__throttle_bodies (throttled_updates)
+
+            self._physics_world.step (dt)
+
+        if throttled_updates is None:
+            self._throttled_count = 0
+            self._nodes.update (self, dt)
+        else:
+            for node in self._nodes.sprites ():
+                throttled_update = throttled_updates.get (node)
+
+                if throttled_update is None:
+                    node.update (self, dt)
+                else:
+                    node.run_throttled_update (self, *throttled_update)
+
+        for world in self._worlds:
+            world.update (dt)
+
+    def __is_throttling (self):
+        # Throttles only apply once a viewport has been set, until then every node gets the plain update
+        # without paying for the throttle checks
+        return self._viewport is not None and len (self._throttled_nodes) > 0
+
+    def __get_throttled_updates (self, dt):
+
+        """
+            :return:    (dict) Update (see Node.get_throttled_update ()) of every node with an update throttle
+        """
+
+        viewport = self.viewport
+        throttled_updates = dict ()
+        throttled_count = 0
+
+        for node in self._throttled_nodes.sprites ():
+            is_throttled = node.is_idle or not viewport.colliderect (node.rect)
+            throttled_updates[node] = node.get_throttled_update (dt, is_throttled)
+
+            throttled_count += is_throttled
+
+        self._throttled_count = throttled_count
+
+        return throttled_updates
+
+    @staticmethod
+    def __throttle_bodies (throttled_updates):
+        # Physics world bodies move with the physics update, hold them still on the ticks their node
+        # doesn't move and step them by the time of any skipped ticks when it does
+
+        for node, (mode, dt) in throttled_updates.items ():
+            if Scene.__is_kinematic (node) and node.physics_world is not None:
+                is_moving = mode == Scene.Node.UPDATE_FULL or mode == Scene.Node.UPDATE_PHYSICS
+                node.set_physics_step_time (dt if is_moving else 0.0)
+
+    def __update_profiled (self, dt, profiler):
+        throttled_updates = self.__get_throttled_updates (dt) if self.__is_throttling () else dict ()
+
+        if not throttled_updates:
+            self._throttled_count = 0
+
+        if self._physics_world is not None:
+            start = time.perf_counter ()
+
+            Scene.__throttle_bodies (throttled_updates)
+            self._physics_world.step (dt)
+
+            profiler.add ('update.PhysicsWorld', start, time.perf_counter ())
+
+        for node in self._nodes.sprites ():
+            start = time.perf_counter ()
+            throttled_update = throttled_updates.get (node)
+
+            if throttled_update is None:
+                node.update (self, dt)
+            else:
+                node.run_throttled_update (self, *throttled_update)
+
+            profiler.accumulate ('update.' + node.__class__.__name__, time.perf_counter () - start)
+
+        for world in self._worlds:
+            start = time.perf_counter ()
+            world.update (dt)
+            profiler.accumulate ('update.World', time.perf_counter () - start)
+
+    @property
+    def dirty_rect_mode (self):
+        return self._dirty_rect_mode
+
+    def set_dirty_rect_mode (self, enabled, max_dirty_area = DEFAULT_MAX_DIRTY_AREA, clear_color = (0, 0, 0)):
+
+        """
+            Enables or disables dirty rectangle rendering. When enabled only the regions of the screen
+            that have changed since the last frame are redrawn and draw () returns the list of changed
+            rectangles to pass to pygame.display.update (). Only nodes are tracked so dirty rectangle mode
+            can't be enabled while the scene has worlds (see add_world ())
+
+            :param enabled:         (bool) True to enable dirty rectangle rendering
+            :param max_dirty_area:  (float) Fraction of the surface area above which a full redraw is used
+            :param clear_color:     (tuple) Color used to clear dirty regions before redrawing
+        """
+
+        if enabled and self._worlds:
+            raise ValueError ('Dirty rectangle mode isn\'t supported by scenes with worlds, remove them first')
+
+        self._dirty_rect_mode = enabled
+        self._max_dirty_area = max_dirty_area
+        self._clear_color = clear_color
+        self._drawn_nodes.clear ()
+
+    def draw (self, surface, alpha = None):
+
+        """
+            Draws all nodes onto the surface
+
+            :param alpha:   (float) Interpolation between the previous and current simulation tick or None
+            :return:        (Rect[]) Regions that changed when in dirty rectangle mode or None if the whole
+                            surface was redrawn and should be flipped
+        """
+
+        if alpha is not None:
+            for node in self._nodes:
+                node.begin_interpolation (alpha)
+
+        profiler = self._game.profiler
+
+        if self._dirty_rect_mode:
+            dirty_rects = self.__draw_dirty (surface)
+        elif self._worlds:
+            self.__draw_layers (surface, alpha, profiler if profiler is not None and profiler.is_recording else None)
+            dirty_rects = None
+        elif profiler is not None and profiler.is_recording:
+            self.__draw_profiled (surface, profiler)
+            dirty_rects = None
+        elif self._culling:
+            self.__draw_culled (surface)
+            dirty_rects = None
+        else:
+            self._nodes.draw (surface)
+            dirty_rects = None
+
+        if alpha is not None:
+            for node in self._nodes:
+                node.end_interpolation ()
+
+        return dirty_rects
+
+    def __draw_culled (self, surface):
+        self._culled_count = 0
+
+        surface.blits (self.__get_visible (self._nodes.sprites (), self._viewport or surface.get_rect ()), False)
+
+    def __draw_profiled (self, surface, profiler):
+        viewport = self._viewport or surface.get_rect ()
+        self._culled_count = 0
 
-    def draw (self, surface):
-        self._nodes.draw (surface)
+        for layer in self._nodes.layers ():
+            start = time.perf_counter ()
+            surface.blits (self.__get_visible (self._nodes.get_sprites_from_layer (layer), viewport), False)
+            profiler.add ('draw.layer_{0}'.format (layer), start, time.perf_counter ())
+
+    def __get_visible (self, nodes, viewport):
+
+        """
+            :return:    (list) Image and rect of the nodes to draw (those that intersect the viewport when culling)
+        """
+
+        rects = [node.rect for node in nodes]
+
+        if not self._culling:
+            return [(node.image, rect) for node, rect in zip (nodes, rects)]
+
+        visible = viewport.collidelistall (rects)
+        self._culled_count += len (nodes) - len (visible)
+
+        return [(nodes[index].image, rects[index]) for index in visible]
+
+    def __draw_layers (self, surface, alpha, profiler):
+        viewport = self._viewport or surface.get_rect ()
+        self._culled_count = 0
+
+        layers = set (self._nodes.layers ())
+
+        for world in self._worlds:
+            layers.update (world.layers.tolist ())
+
+        for layer in sorted (layers):
+            start = time.perf_counter ()
+            surface.blits (self.__get_visible (self._nodes.get_sprites_from_layer (layer), viewport), False)
+
+            for world in self._worlds:
+                world.draw (surface, layer, alpha)
+
+            if profiler is not None:
+                profiler.add ('draw.layer_{0}'.format (layer), start, time.perf_counter ())
+
+    def __draw_dirty (self, surface):
+        surface_rect = surface.get_rect ()
+        self._culled_count = 0
+        nodes = self._nodes.sprites ()
+        drawn_nodes = dict ()
+        dirty_rects = []
+
+        # A node is dirty if it is new, has moved, changed image or invalidated its image, both its old
+        # and new rect need redrawing. Nodes removed since the last frame leave their old rect behind
+
+        for node in nodes:
+            rect = node.rect.copy ()
+            image = node.image
+            drawn = self._drawn_nodes.pop (node, None)
+
+            if drawn is None:
+                dirty_rects.append (rect)
+            elif node.is_invalid or drawn[1] is not image or drawn[0] != rect:
+                dirty_rects.append (drawn[0])
+                dirty_rects.append (rect)
+
+            drawn_nodes[node] = (rect, image)
+            node.validate ()
+
+        dirty_rects.extend (rect for rect, image in self._drawn_nodes.values ())
+
+        self._drawn_nodes = drawn_nodes
+
+        dirty_rects = utils.merge_rects ([rect.clip (surface_rect) for rect in dirty_rects if rect.colliderect (surface_rect)])
+        dirty_area = sum (rect.width * rect.height for rect in dirty_rects)
+
+        if dirty_area > surface_rect.width * surface_rect.height * self._max_dirty_area:
+            self._nodes.draw (surface)
+            return None
+
+        for dirty_rect in dirty_rects:
+            surface.set_clip (dirty_rect)
+            surface.fill (self._clear_color, dirty_rect)
+
+            for node in nodes:
+                if node.rect.colliderect (dirty_rect):
+                    surface.blit (node.image, node.rect)
+
+        surface.set_clip (None)
+
+        return dirty_rects
+
+    def get_state_checksum (self):
+
+        """
+            Returns a digest of the simulation state (the position, velocity, rotation and frame of every
+            kinematic node in draw order and every ECS world entity), used to check that a replayed session matches its recording.
+            Sub classes can extend this with _get_state ()
+
+            :return:    (bytes) SHA1 digest
+        """
+
+        digest = hashlib.sha1 ()
+
+        for node in self._nodes:
+            if Scene.__is_kinematic (node):
+                digest.update (type (node).__name__.encode ('ascii'))
+                digest.update (struct.pack ('<5di', node.position.x, node.position.y, node.velocity.x,
+                                            node.velocity.y, node.rotation, node.frame_index))
+
+        for world in self._worlds:
+            world.update_digest (digest)
+
+        digest.update (repr (self._get_state ()).encode ('utf-8'))
+
+        return digest.digest ()
+
+    def _get_state (self):
+
+        """
+            :return:    Any additional state (e.g the score) included in the state checksum
+        """
+
+        return None
 
     def scene_activated (self):
         pass
@@ -110,27 +687,36 @@ class Scene (object):
     def on_joy_button_up (self, event):
         pass
 
+    @staticmethod
+    def __is_kinematic (node):
+        return hasattr (node, 'physics_world')
+
 
 class SceneText (Scene.Node):
 
     """
         Static scene node used to display a text string
 
+        Text is composed from a glyph atlas (see glyphs.py) so changing the text doesn't rasterise the
+        whole string. The font can be a pygame Font (glyphs are rasterised once per font and
+        colour) or a GlyphAtlas such as a BitmapGlyphAtlas (the colour is ignored)
+
     """
 
     def __init__ (self, x, y, text, font, color = (255, 255, 255)):
         super ().__init__ ()
 
-        self.__image = font.render (text, True, color)
+        self._text = text
+        self._font = font
+        self._color = color
+        self._glyphs = SceneText.__get_glyphs (font, color)
+
+        self.__image = self._glyphs.get_image (text)
         self.__rect =  self.__image.get_rect ()
 
         self.__rect.x = x
         self.__rect.y = y
 
-        self._text = text
-        self._font = font
-        self._color = color
-
         self._is_dirty = False
 
     def set_text (self, text):
@@ -141,11 +727,13 @@ class SceneText (Scene.Node):
     def set_color (self, color):
         if self._color != color:
             self._color = color
+            self._glyphs = SceneText.__get_glyphs (self._font, color)
             self._is_dirty = True
 
     def set_font (self, font):
         if self._font != font:
             self._font = font
+            self._glyphs = SceneText.__get_glyphs (font, self._color)
             self._is_dirty = True
 
     def update (self, scene, dt):
@@ -153,7 +741,8 @@ class SceneText (Scene.Node):
         if self._is_dirty:
             pos = self.__rect.topleft
 
-            self.__image = self._font.render (self._text, True, self._color)
+            # Rendered strings are shared so labels that cycle through the same values are only composed once
+            self.__image = self._glyphs.get_image (self._text)
             self.__rect = self.__image.get_rect ()
             self.__rect.topleft = pos
 
@@ -163,6 +752,13 @@ class SceneText (Scene.Node):
         # to be performed on the sprite before it is drawn to the screen
         super ().update (scene, dt)
 
+    @staticmethod
+    def __get_glyphs (font, color):
+        if isinstance (font, glyphs.GlyphAtlas):
+            return font
+
+        return glyphs.FontGlyphAtlas.get (font, color)
+
     @property
     def image (self):
         return self.__image
@@ -0,0 +1,240 @@
+import array
+import struct
+import sys
+import zlib
+
+
+class SpriteRecord(object):
+    """
+        One sprite in a Snapshot. The kind, subtype and flags are defined by the scene writing the snapshot,
+        state is the sprites get_snapshot_state () tuple (see SceneSprite and KinematicSprite) and can be
+        passed straight back to set_snapshot_state ()
+    """
+
+    __slots__ = ['kind', 'subtype', 'flags', 'layer', 'state', 'text', 'extra']
+
+    def __init__(self, kind, subtype, flags, layer, state, text=None, extra=0.0):
+        self.kind = kind
+        self.subtype = subtype
+        self.flags = flags
+        self.layer = layer
+        self.state = state
+        self.text = text
+        self.extra = extra
+
+
+class Snapshot(object):
+    """
+        Snapshot
+
+        Compact versioned binary save state of a scene: a list of fixed size sprite records, the texts
+        used by some of the sprites, a few scene values (e.g the score) and the state of the random streams.
+
+        File layout (little endian, everything after the header optionally zlib compressed):
+
+            header          magic, version, flags, record count, text count, value count, stream count
+            records         kind, subtype, flags, layer, frame index, text index + 16 doubles each
+            texts           length prefixed UTF-8 strings
+            values          doubles
+            streams         length prefixed name, version, gauss flag + value, 625 uint32 state words
+
+        The record layout holds everything get_snapshot_state () returns for a KinematicSprite plus one
+        scene defined extra value, sprites with less state (SceneSprite) leave the remaining values zero
+    """
+
+    _MAGIC = b'SRSS'
+    _VERSION = 1
+
+    _HEADER = struct.Struct('<4sHHIIII')
+    _RECORD = struct.Struct('<BBBBHH16d')
+    _STREAM = struct.Struct('<BBd')
+
+    _FLAG_COMPRESSED = 0x01
+
+    # Record flags 0x01 - 0x0f are used by the snapshot, the scene can use the remaining bits
+    FLAG_KINEMATIC = 0x01
+    FLAG_TIME_TO_LIVE = 0x02
+    FLAG_USER = 0x10
+
+    _NO_TEXT = 0xffff
+
+    _SPRITE_STATE_SIZE = 4              # Length of SceneSprite.get_snapshot_state ()
+    _KINEMATIC_STATE_SIZE = 16          # Length of KinematicSprite.get_snapshot_state ()
+
+    def __init__(self):
+        self.records = []
+        self.values = []
+        self.random_state = dict()
+
+    def add_sprite(self, kind, subtype, sprite, layer, flags=0, text=None, extra=0.0):
+
+        """
+            :param kind:        (int) Scene defined sprite kind (0 - 255)
+            :param subtype:     (int) Scene defined subtype (0 - 255)
+            :param sprite:      (SceneSprite) Sprite to store
+            :param layer:       (int) Scene layer
+            :param flags:       (int) Scene defined flags (multiples of FLAG_USER)
+            :param text:        (str) Optional text (e.g of floating text)
+            :param extra:       (float) Optional scene defined value
+        """
+
+        self.records.append(SpriteRecord(kind, subtype, flags, layer, sprite.get_snapshot_state(), text, extra))
+
+    def to_bytes(self, compress=False):
+
+        """
+            :param compress:    (bool) zlib compress everything after the header
+            :return:            (bytes) Encoded snapshot
+        """
+
+        texts = []
+        text_indices = dict()
+        body = bytearray()
+
+        for record in self.records:
+            text_index = Snapshot._NO_TEXT
+
+            if record.text is not None:
+                text_index = text_indices.get(record.text)
+
+                if text_index is None:
+                    text_index = len(texts)
+                    text_indices[record.text] = text_index
+                    texts.append(record.text)
+
+            body += Snapshot.__pack_record(record, text_index)
+
+        for text in texts:
+            encoded = text.encode('utf-8')
+            body += struct.pack('<H', len(encoded)) + encoded
+
+        body += array.array('d', self.values).tobytes() if sys.byteorder == 'little' else \
+            struct.pack('<{0}d'.format(len(self.values)), *self.values)
+
+        for name, state in self.random_state.items():
+            body += Snapshot.__pack_stream(name, state)
+
+        flags = 0
+
+        if compress:
+            body = zlib.compress(body, 1)
+            flags |= Snapshot._FLAG_COMPRESSED
+
+        header = Snapshot._HEADER.pack(Snapshot._MAGIC, Snapshot._VERSION, flags, len(self.records), len(texts),
+                                       len(self.values), len(self.random_state))
+
+        return header + bytes(body)
+
+    @classmethod
+    def from_bytes(cls, data):
+
+        """
+            :param data:    (bytes) Snapshot encoded by to_bytes ()
+            :return:        (Snapshot) Decoded snapshot
+        """
+
+        if len(data) < cls._HEADER.size:
+            raise ValueError('Not a snapshot')
+
+        magic, version, flags, record_count, text_count, value_count, stream_count = cls._HEADER.unpack_from(data)
+
+        if magic != cls._MAGIC or version != cls._VERSION:
+            raise ValueError('Not a snapshot or unsupported version ({0})'.format(version))
+
+        body = memoryview(data)[cls._HEADER.size:]
+
+        if flags & cls._FLAG_COMPRESSED:
+            body = memoryview(zlib.decompress(body))
+
+        snapshot = Snapshot()
+        records = []
+
+        for kind, subtype, record_flags, layer, frame_index, text_index, *values in \
+                cls._RECORD.iter_unpack(body[:record_count * cls._RECORD.size]):
+            records.append((kind, subtype, record_flags, layer, frame_index, text_index, values))
+
+        offset = record_count * cls._RECORD.size
+        texts = []
+
+        for index in range(text_count):
+            length, = struct.unpack_from('<H', body, offset)
+            texts.append(bytes(body[offset + 2:offset + 2 + length]).decode('utf-8'))
+            offset += 2 + length
+
+        snapshot.values = list(struct.unpack_from('<{0}d'.format(value_count), body, offset))
+        offset += value_count * 8
+
+        for index in range(stream_count):
+            name, state, offset = cls.__unpack_stream(body, offset)
+            snapshot.random_state[name] = state
+
+        for kind, subtype, record_flags, layer, frame_index, text_index, values in records:
+            x, y, animator_state = values[0:3]
+            state = (x, y, frame_index, animator_state)
+
+            if record_flags & cls.FLAG_KINEMATIC:
+                state += tuple(values[3:14]) + (values[14] if record_flags & cls.FLAG_TIME_TO_LIVE else None,)
+
+            snapshot.records.append(SpriteRecord(kind, subtype, record_flags, layer, state,
+                                                 texts[text_index] if text_index != cls._NO_TEXT else None,
+                                                 values[15]))
+
+        return snapshot
+
+    @staticmethod
+    def __pack_record(record, text_index):
+        state = record.state
+        flags = record.flags & ~(Snapshot.FLAG_KINEMATIC | Snapshot.FLAG_TIME_TO_LIVE)
+
+        # SceneSprites only have the position, frame and animator state, the kinematic values are left zero
+        if len(state) == Snapshot._KINEMATIC_STATE_SIZE:
+            flags |= Snapshot.FLAG_KINEMATIC
+        else:
+            state = tuple(state) + (0.0,) * (Snapshot._KINEMATIC_STATE_SIZE - Snapshot._SPRITE_STATE_SIZE - 1) + (None,)
+
+        x, y, frame_index, animator_state = state[0:4]
+        time_to_live = state[15]
+
+        if time_to_live is not None:
+            flags |= Snapshot.FLAG_TIME_TO_LIVE
+
+        return Snapshot._RECORD.pack(record.kind, record.subtype, flags, record.layer, frame_index, text_index,
+                                     x, y, animator_state, *state[4:15],
+                                     time_to_live if time_to_live is not None else 0.0, record.extra)
+
+    @staticmethod
+    def __pack_stream(name, state):
+        # random.Random.getstate () returns (version, 625 internal state words, gauss_next)
+        version, words, gauss_next = state
+        encoded_name = name.encode('utf-8')
+
+        words = array.array('I', words)
+
+        if sys.byteorder != 'little':
+            words.byteswap()
+
+        return struct.pack('<B', len(encoded_name)) + encoded_name + \
+            Snapshot._STREAM.pack(version, gauss_next is not None, gauss_next or 0.0) + \
+            struct.pack('<H', len(words)) + words.tobytes()
+
+    @staticmethod
+    def __unpack_stream(body, offset):
+        length, = struct.unpack_from('<B', body, offset)
+        name = bytes(body[offset + 1:offset + 1 + length]).decode('utf-8')
+        offset += 1 + length
+
+        version, has_gauss_next, gauss_next = Snapshot._STREAM.unpack_from(body, offset)
+        offset += Snapshot._STREAM.size
+
+        count, = struct.unpack_from('<H', body, offset)
+        offset += 2
+
+        words = array.array('I')
+        words.frombytes(body[offset:offset + count * 4])
+
+        if sys.byteorder != 'little':
+            words.byteswap()
+
+        offset += count * 4
+
+        return name, (version, tuple(words), gauss_next if has_gauss_next else None), offset
@@ -0,0 +1,152 @@
+import collections
+import math
+
+
+class SpatialHash(object):
+    """
+        SpatialHash
+
+        Uniform grid broad phase for circle collision checks. Nodes are bucketed into every cell their
+        bounding circle touches (using the node 'rect' center and 'radius', falling back to half the rect
+        diagonal like pygame.sprite.collide_circle) so queries only need to test nodes in nearby cells.
+    """
+
+    DEFAULT_CELL_SIZE = 128
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+
+        """
+            :param cell_size:   (int) Width and height of each grid cell in pixels
+        """
+
+        self.__cell_size = cell_size
+        self.__cells = collections.defaultdict(list)
+        self.__node_cells = dict()
+
+    @property
+    def cell_size(self):
+        return self.__cell_size
+
+    def clear(self):
+        self.__cells.clear()
+        self.__node_cells.clear()
+
+    def insert(self, node):
+        cells = self.__get_cells(*SpatialHash.__get_circle(node))
+
+        for cell in cells:
+            self.__cells[cell].append(node)
+
+        self.__node_cells[node] = cells
+
+    def insert_all(self, nodes):
+        for node in nodes:
+            self.insert(node)
+
+    def remove(self, node):
+        cells = self.__node_cells.pop(node, None)
+
+        if cells:
+            for cell in cells:
+                bucket = self.__cells[cell]
+                bucket.remove(node)
+
+                if not bucket:
+                    del self.__cells[cell]
+
+    def move(self, node):
+
+        """
+            Updates the cells occupied by a node that has already been inserted, nodes which have not
+            changed cells are left in place so the hash can be updated incrementally between frames
+        """
+
+        cells = self.__get_cells(*SpatialHash.__get_circle(node))
+
+        if self.__node_cells.get(node) != cells:
+            self.remove(node)
+
+            for cell in cells:
+                self.__cells[cell].append(node)
+
+            self.__node_cells[node] = cells
+
+    def rebuild(self, nodes):
+
+        """
+            Incrementally synchronises the hash with a collection of nodes, removing nodes no longer present
+            and moving or inserting the rest
+        """
+
+        # Nodes are moved in the order given (not set order) so query results are deterministic
+        nodes = list(nodes)
+        present = set(nodes)
+
+        for node in [node for node in self.__node_cells if node not in present]:
+            self.remove(node)
+
+        for node in nodes:
+            self.move(node)
+
+    def query(self, x, y, radius):
+
+        """
+            Returns all nodes whose bounding circle overlaps the given circle
+
+            :param x:       (float) Center of the circle on the x-axis
+            :param y:       (float) Center of the circle on the y-axis
+            :param radius:  (float) Radius of the circle
+            :return:        (list) Overlapping nodes
+        """
+
+        candidates = []
+        seen = set()
+
+        for cell in self.__get_cells(x, y, radius):
+            for node in self.__cells.get(cell, ()):
+                if node not in seen:
+                    seen.add(node)
+
+                    nx, ny, nr = SpatialHash.__get_circle(node)
+                    dx = nx - x
+                    dy = ny - y
+                    distance = nr + radius
+
+                    if dx * dx + dy * dy < distance * distance:
+                        candidates.append(node)
+
+        return candidates
+
+    def query_node(self, node):
+
+        """
+            Returns all nodes overlapping the given node, excluding the node itself
+        """
+
+        return [other for other in self.query(*SpatialHash.__get_circle(node)) if other is not node]
+
+    def __get_cells(self, x, y, radius):
+        cell_size = self.__cell_size
+
+        min_col = int((x - radius) // cell_size)
+        max_col = int((x + radius) // cell_size)
+        min_row = int((y - radius) // cell_size)
+        max_row = int((y + radius) // cell_size)
+
+        return [(col, row) for col in range(min_col, max_col + 1) for row in range(min_row, max_row + 1)]
+
+    @staticmethod
+    def __get_circle(node):
+        rect = node.rect
+        radius = getattr(node, 'radius', None)
+
+        if radius is None:
+            radius = math.hypot(rect.width, rect.height) / 2
+
+        return rect.centerx, rect.centery, radius
+
+    def __len__(self):
+        return len(self.__node_cells)
+
+    def __contains__(self, node):
+        return node in self.__node_cells
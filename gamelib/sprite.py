@@ -2,6 +2,7 @@ import pygame
 import math
 import abc
 
+from gamelib import framecache
 from gamelib import scene
 from gamelib import utils
 
@@ -34,6 +35,17 @@ class SceneSprite(scene.Scene.Node):
             """
             pass
 
+        def get_state(self):
+
+            """
+                :return:    (float) Progress of the animator (e.g time to the next frame) for snapshots
+            """
+
+            return 0.0
+
+        def set_state(self, state):
+            pass
+
     # --------------------------------------------------------------------------------------------------
 
     _FLAG_UPDATE_NONE = 0x00            # Sprite is up to date
@@ -52,16 +64,7 @@ class SceneSprite(scene.Scene.Node):
 
         super().__init__()
 
-        self.__frames = frames
-        self.__frame_index = frame_index
-        self.__frame_animator = None
-
-        self._rect = frames[frame_index].get_rect()
-
-        self._rect.centerx = x
-        self._rect.centery = y
-
-        self._update_flags = SceneSprite._FLAG_UPDATE_NONE
+        self._reset_sprite(x, y, frames, frame_index)
 
     @property
     def frame_index(self):
@@ -71,6 +74,10 @@ class SceneSprite(scene.Scene.Node):
     def frame_count(self):
         return len(self.__frames)
 
+    @property
+    def frames(self):
+        return self.__frames
+
     def set_frame_animator(self, frame_animator):
         self.__frame_animator = frame_animator
 
@@ -79,6 +86,24 @@ class SceneSprite(scene.Scene.Node):
             self._update_flags |= SceneSprite._FLAG_UPDATE_FRAME
             self.__frame_index = frame_index
 
+    def _reset_sprite(self, x, y, frames, frame_index=0):
+
+        """
+            Re-initialises the sprites frames, position and animator in place, used by the constructor
+            and when a pooled sprite is recycled
+        """
+
+        self.__frames = frames
+        self.__frame_index = frame_index
+        self.__frame_animator = None
+
+        self._rect = frames[frame_index].get_rect()
+
+        self._rect.centerx = x
+        self._rect.centery = y
+
+        self._update_flags = SceneSprite._FLAG_UPDATE_NONE
+
     def update(self, scene, dt):
         super().update(scene, dt)
 
@@ -87,6 +112,39 @@ class SceneSprite(scene.Scene.Node):
         if self.__frame_animator:
             self.__frame_animator.update(self, dt)
 
+    def update_animation(self, scene, dt):
+
+        """
+            Only advances the frame animator (e.g while the sprite is off-screen), see Scene.Node.set_update_throttle ()
+        """
+
+        if self.__frame_animator:
+            self.__frame_animator.update(self, dt)
+
+    def get_snapshot_state(self):
+
+        """
+            :return:    (tuple) Center x, center y, frame index and animator state, see set_snapshot_state ()
+        """
+
+        return (self._rect.centerx, self._rect.centery, self.__frame_index,
+                self.__frame_animator.get_state() if self.__frame_animator else 0.0)
+
+    def set_snapshot_state(self, x, y, frame_index, animator_state):
+
+        """
+            Restores the state returned by get_snapshot_state ()
+        """
+
+        self._rect.center = (x, y)
+
+        if 0 <= frame_index < len(self.__frames):
+            self.__frame_index = frame_index
+            self._update_flags |= SceneSprite._FLAG_UPDATE_FRAME
+
+        if self.__frame_animator:
+            self.__frame_animator.set_state(animator_state)
+
     @property
     def image(self):
         return self.__frames[self.__frame_index]
@@ -128,13 +186,29 @@ class KinematicSprite(SceneSprite):
 
         super().__init__(x, y, frames, frame_index)
 
+        self.__physics_world = None
+        self.__physics_body = -1
+
+        self._reset_kinematics(velocity, max_velocity)
+
+    def _reset_kinematics(self, velocity=None, max_velocity=None):
+
+        """
+            Re-initialises the sprites kinematic state in place, used by the constructor and when a
+            pooled sprite is recycled (the sprite must not be attached to a physics world)
+        """
+
+        assert self.__physics_world is None
+
         if velocity is None:
             velocity = pygame.math.Vector2()
 
         if max_velocity is None:
             max_velocity = pygame.math.Vector2(KinematicSprite._MAX_VELOCITY, KinematicSprite._MAX_VELOCITY)
 
-        self.__frame_image = frames[frame_index].copy()
+        # Note: The source frame is not copied, the image is replaced from the frame cache whenever
+        # the sprite is transformed or changes frame
+        self.__frame_image = super().image
 
         self.__velocity = velocity
         self.__max_velocity = max_velocity
@@ -146,45 +220,135 @@ class KinematicSprite(SceneSprite):
 
         self.__scale = 1.0
 
+        self.__time_to_live = None
+        self.__wrap_rect = None
+
+        self.__previous_center = None
+        self.__simulation_center = None
+
+        # Note: When attached to a PhysicsWorld the sprites kinematic state lives in the worlds arrays
+        # and the attributes above are only used to hold the state while the sprite is detached
+
     @property
     def position(self):
+        if self.__physics_world is not None:
+            return pygame.math.Vector2(self.__physics_world.get_position(self.__physics_body))
+
         return pygame.math.Vector2(self._rect.centerx, self._rect.centery)
 
     @property
     def velocity(self):
+        if self.__physics_world is not None:
+            return pygame.math.Vector2(self.__physics_world.get_velocity(self.__physics_body))
+
         return pygame.math.Vector2(self.__velocity)
 
+    @property
+    def max_velocity(self):
+        if self.__physics_world is not None:
+            return pygame.math.Vector2(self.__physics_world.get_max_velocity(self.__physics_body))
+
+        return pygame.math.Vector2(self.__max_velocity)
+
     @property
     def acceleration(self):
+        if self.__physics_world is not None:
+            return pygame.math.Vector2(self.__physics_world.get_acceleration(self.__physics_body))
+
         return pygame.math.Vector2(self.__acceleration)
 
     @property
     def drag(self):
+        if self.__physics_world is not None:
+            return pygame.math.Vector2(self.__physics_world.get_drag(self.__physics_body))
+
         return pygame.math.Vector2(self.__drag)
 
     @property
     def scale(self):
         return self.__scale
 
+    @property
+    def time_to_live(self):
+        if self.__physics_world is not None:
+            return self.__physics_world.get_time_to_live(self.__physics_body)
+
+        return self.__time_to_live
+
+    @property
+    def wrap_rect(self):
+        return self.__wrap_rect
+
+    @property
+    def physics_world(self):
+        return self.__physics_world
+
     def set_position(self, x, y):
         self._rect.x = x
         self._rect.y = y
 
+        if self.__physics_world is not None:
+            self.__physics_world.set_position(self.__physics_body, self._rect.centerx, self._rect.centery)
+
     def set_velocity(self, x, y):
-        self.__velocity.x = x
-        self.__velocity.y = y
+        if self.__physics_world is not None:
+            self.__physics_world.set_velocity(self.__physics_body, x, y)
+        else:
+            self.__velocity.x = x
+            self.__velocity.y = y
 
     def set_acceleration(self, x, y):
-        self.__acceleration.x = x
-        self.__acceleration.y = y
+        if self.__physics_world is not None:
+            self.__physics_world.set_acceleration(self.__physics_body, x, y)
+        else:
+            self.__acceleration.x = x
+            self.__acceleration.y = y
 
     def set_max_velocity(self, x, y):
-        self.__max_velocity.x = x
-        self.__max_velocity.y = y
+        if self.__physics_world is not None:
+            self.__physics_world.set_max_velocity(self.__physics_body, x, y)
+        else:
+            self.__max_velocity.x = x
+            self.__max_velocity.y = y
 
     def set_drag(self, x, y):
-        self.__drag.x = x
-        self.__drag.y = y
+        if self.__physics_world is not None:
+            self.__physics_world.set_drag(self.__physics_body, x, y)
+        else:
+            self.__drag.x = x
+            self.__drag.y = y
+
+    def set_time_to_live(self, time_to_live):
+
+        """
+            Sets the number of seconds before the sprite is killed, None disables the timer
+        """
+
+        if self.__physics_world is not None:
+            self.__physics_world.set_time_to_live(self.__physics_body, time_to_live)
+        else:
+            self.__time_to_live = time_to_live
+
+    def set_physics_step_time(self, step_time):
+
+        """
+            Time the sprites physics world body is stepped by in the worlds next step () instead of the full
+            step time (e.g 0 to hold a throttled sprite still), ignored without a physics world
+        """
+
+        if self.__physics_world is not None:
+            self.__physics_world.set_step_time(self.__physics_body, step_time)
+
+    def set_wrap_rect(self, wrap_rect):
+
+        """
+            Sets the rectangle the sprite warps around when it runs off an edge, None disables wrapping
+        """
+
+        self.__wrap_rect = wrap_rect
+
+        if self.__physics_world is not None:
+            self.__physics_world.set_wrap(self.__physics_body, wrap_rect)
 
     def set_scale(self, scale):
         if self.__scale != scale:
@@ -210,6 +374,47 @@ class KinematicSprite(SceneSprite):
         return pygame.math.Vector2(math.sin(angle), -math.cos(angle))
 
     def update(self, scene, dt):
+        self.__update_rotation(dt)
+
+        # Only update the sprites image if the rotation has changed or a new frame has been set
+        if self._update_flags & (SceneSprite._FLAG_UPDATE_TRANSFORM | SceneSprite._FLAG_UPDATE_FRAME):
+            if scene.game.render_enabled:
+                # Rotated frames are shared between all sprites using the same source frame, the rect only
+                # needs to be rebuilt when the cache hands back a different image
+                frame_image = framecache.FrameCache.instance().get(super().image, self.__rotation, self.__scale)
+
+                if frame_image is not self.__frame_image:
+                    self.__frame_image = frame_image
+                    self.__set_rect_size(frame_image.get_size())
+            else:
+                # Nothing is drawn (e.g headless simulation) so only the size of the transformed frame is
+                # needed to keep the rect identical, the image is transformed if it is requested
+                self.__frame_image = None
+                self.__set_rect_size(framecache.FrameCache.instance().get_size(super().image, self.__rotation,
+                                                                              self.__scale))
+
+        self.__update_motion(dt)
+
+        # Calling update () on the super class to allow any additional updates
+        # to be performed on the sprite before it is drawn to the screen
+        super().update(scene, dt)
+
+    def update_physics(self, scene, dt):
+
+        """
+            Moves and rotates the sprite without updating its image or animation, the image catches up on
+            the next full update ()
+        """
+
+        self.__update_rotation(dt)
+        self.__update_motion(dt)
+
+    def __update_rotation(self, dt):
+        self.__previous_center = self._rect.center
+
+        # Sprites attached to a physics world have already been moved by the worlds batched step
+        if self.__physics_world is not None:
+            self._rect.center = self.__physics_world.get_position(self.__physics_body)
 
         # Recalculate the sprites angle of rotation if required
         if self.__rotation_velocity:
@@ -217,35 +422,146 @@ class KinematicSprite(SceneSprite):
             self.__rotation = (self.__rotation + (self.__rotation_velocity * dt)) % 360
             self._update_flags |= SceneSprite._FLAG_UPDATE_TRANSFORM
 
-        # Only update the sprites image if the rotation has changed or a new frame has been set
-        if self._update_flags & (SceneSprite._FLAG_UPDATE_TRANSFORM | SceneSprite._FLAG_UPDATE_FRAME):
-            # Note: Pygames transform.rotate () method expects negative values to rotate clockwise, all of our
-            # math uses positive angles for clockwise rotation (e.g North=0, East=90, South= 180, West=270)
-            # so we multiple the angle by -1
+    def __update_motion(self, dt):
+        if self.__physics_world is None:
+            # Recalculate the sprites velocity
+            self.__velocity.x = KinematicSprite.__get_velocity(dt, self.__velocity.x, self.__acceleration.x, self.__drag.x, self.__max_velocity.x)
+            self.__velocity.y = KinematicSprite.__get_velocity(dt, self.__velocity.y, self.__acceleration.y, self.__drag.y, self.__max_velocity.y)
 
-            self.__frame_image = pygame.transform.rotozoom(super().image, self.__rotation * -1, self.__scale)
+            # Apply velocity changes to the sprite position
+            self._rect.x += self.__velocity.x * dt
+            self._rect.y += self.__velocity.y * dt
 
-            current_position = self._rect.center
+            # If the sprite runs off the edge of the wrap rect it should warp to the opposite side
+            if self.__wrap_rect is not None:
+                self._rect.center = utils.clamp_point_to_rect(self._rect.center, self.__wrap_rect)
 
-            self._rect = self.__frame_image.get_rect()
-            self._rect.center = current_position
+            if self.__time_to_live is not None:
+                self.__time_to_live -= dt
 
-        # Recalculate the sprites velocity
-        self.__velocity.x = KinematicSprite.__get_velocity(dt, self.__velocity.x, self.__acceleration.x, self.__drag.x, self.__max_velocity.x)
-        self.__velocity.y = KinematicSprite.__get_velocity(dt, self.__velocity.y, self.__acceleration.y, self.__drag.y, self.__max_velocity.y)
+                if self.__time_to_live <= 0:
+                    self.kill()
 
-        # Apply velocity changes to the sprite position
-        self._rect.x += self.__velocity.x * dt
-        self._rect.y += self.__velocity.y * dt
+    def get_snapshot_state(self):
 
-        # Calling update () on the super class to allow any additional updates
-        # to be performed on the sprite before it is drawn to the screen
-        super().update(scene, dt)
+        """
+            :return:    (tuple) The SceneSprite state followed by the velocity, acceleration, drag and max
+                        velocity (x and y of each), rotation, rotation velocity, scale and time to live
+                        (or None), see set_snapshot_state ()
+        """
+
+        position = self.position
+        velocity = self.velocity
+        acceleration = self.acceleration
+        drag = self.drag
+        max_velocity = self.max_velocity
+
+        return (position.x, position.y) + super().get_snapshot_state()[2:] + \
+            (velocity.x, velocity.y, acceleration.x, acceleration.y, drag.x, drag.y, max_velocity.x, max_velocity.y,
+             self.__rotation, self.__rotation_velocity, self.__scale, self.time_to_live)
+
+    def set_snapshot_state(self, x, y, frame_index, animator_state, vx=0.0, vy=0.0, ax=0.0, ay=0.0, drag_x=0.0,
+                           drag_y=0.0, max_vx=_MAX_VELOCITY, max_vy=_MAX_VELOCITY, rotation=0.0,
+                           rotation_velocity=0.0, scale=1.0, time_to_live=None):
+
+        """
+            Restores the state returned by get_snapshot_state (), positions are kept at full precision
+            when the sprite is attached to a physics world
+        """
+
+        super().set_snapshot_state(x, y, frame_index, animator_state)
+
+        if self.__physics_world is not None:
+            self.__physics_world.set_position(self.__physics_body, x, y)
+
+        self.set_velocity(vx, vy)
+        self.set_acceleration(ax, ay)
+        self.set_drag(drag_x, drag_y)
+        self.set_max_velocity(max_vx, max_vy)
+        self.set_time_to_live(time_to_live)
+
+        self.__rotation = rotation
+        self.__rotation_velocity = rotation_velocity
+        self.__scale = scale
+
+        self._update_flags |= SceneSprite._FLAG_UPDATE_TRANSFORM
+        self.__previous_center = None
+
+        # Bring the rect up to date now so a restored scene matches the saved scene before its next update
+        self.__frame_image = None
+        self.__set_rect_size(framecache.FrameCache.instance().get_size(super().image, self.__rotation,
+                                                                      self.__scale))
+
+    def __set_rect_size(self, size):
+        if self._rect.size != size:
+            current_position = self._rect.center
+
+            self._rect = pygame.Rect((0, 0), size)
+            self._rect.center = current_position
 
     @property
     def image(self):
+        if self.__frame_image is None:
+            self.__frame_image = framecache.FrameCache.instance().get(super().image, self.__rotation, self.__scale)
+
         return self.__frame_image
 
+    def begin_interpolation(self, alpha):
+        if self.__previous_center is not None:
+            x, y = self.__previous_center
+            dx = self._rect.centerx - x
+            dy = self._rect.centery - y
+
+            # Don't interpolate across the screen when the sprite has just wrapped to the opposite side
+            if self.__wrap_rect is not None and (abs(dx) > self.__wrap_rect.width // 2 or
+                                                 abs(dy) > self.__wrap_rect.height // 2):
+                return
+
+            self.__simulation_center = self._rect.center
+            self._rect.center = (x + dx * alpha, y + dy * alpha)
+
+    def end_interpolation(self):
+        if self.__simulation_center is not None:
+            self._rect.center = self.__simulation_center
+            self.__simulation_center = None
+
+    def _attach_physics_body(self, physics_world, physics_body):
+
+        """
+            Called by the PhysicsWorld when the sprite is added to the world or its body is moved to a
+            new slot, the first attach copies the sprites current state into the world
+        """
+
+        if self.__physics_world is None:
+            physics_world.set_position(physics_body, self._rect.centerx, self._rect.centery)
+            physics_world.set_velocity(physics_body, self.__velocity.x, self.__velocity.y)
+            physics_world.set_acceleration(physics_body, self.__acceleration.x, self.__acceleration.y)
+            physics_world.set_drag(physics_body, self.__drag.x, self.__drag.y)
+            physics_world.set_max_velocity(physics_body, self.__max_velocity.x, self.__max_velocity.y)
+            physics_world.set_time_to_live(physics_body, self.__time_to_live)
+            physics_world.set_wrap(physics_body, self.__wrap_rect)
+
+        self.__physics_world = physics_world
+        self.__physics_body = physics_body
+
+    def _detach_physics_body(self):
+
+        """
+            Called by the PhysicsWorld when the sprite is removed from the world, the sprites state is
+            copied back from the world so it continues to work standalone
+        """
+
+        if self.__physics_world is not None:
+            self.__velocity = self.velocity
+            self.__acceleration = self.acceleration
+            self.__drag = self.drag
+            self.__max_velocity = self.max_velocity
+            self.__time_to_live = self.time_to_live
+            self._rect.center = self.__physics_world.get_position(self.__physics_body)
+
+            self.__physics_world = None
+            self.__physics_body = -1
+
     @staticmethod
     def __get_velocity(dt, velocity, acceleration, drag, max_velocity):
 
@@ -265,34 +581,74 @@ class KinematicSprite(SceneSprite):
 
     def __repr__(self):
         return 'rect={0}, velocity={1}, acceleration={2}, rotation={3}, rotation_velocity={4}, scale={5}' \
-            .format(self._rect, self.__velocity, self.__acceleration, self.__rotation,
+            .format(self._rect, self.velocity, self.acceleration, self.__rotation,
                     self.__rotation_velocity, self.__scale)
 
 
 class LinearFrameAnimator(SceneSprite.Animator):
     """
         Frame animator to cycle through each frame of a sprite at fixed intervals
+
+        Time is accumulated from the update time steps (not the wall clock) so animations are
+        deterministic and follow the simulation speed. The frame step (shared by every animator) can skip
+        frames to cut the number of distinct images drawn, the last frame is always shown
     """
 
+    _frame_step = 1
+
+    @classmethod
+    def set_frame_step(cls, frame_step):
+
+        """
+            :param frame_step:  (int) Frames to advance each time the frame speed elapses (1 shows every frame)
+        """
+
+        assert frame_step >= 1
+
+        cls._frame_step = frame_step
+
+    @classmethod
+    def get_frame_step(cls):
+        return cls._frame_step
+
     def __init__(self, frame_speed, frame_loop=False, kill_sprite=False):
 
+        """
+            :param frame_speed:     (float) Time between frames in milliseconds
+            :param frame_loop:      (bool) Restart from the first frame after the last frame
+            :param kill_sprite:     (bool) Kill the sprite after the last frame (when not looping)
+        """
+
         self._frame_speed = frame_speed
         self._frame_loop = frame_loop
         self._kill_sprite = kill_sprite
 
-        self._last_update = pygame.time.get_ticks()
+        self._elapsed = 0.0
+
+    def reset(self, frame_speed=None):
+        if frame_speed is not None:
+            self._frame_speed = frame_speed
+
+        self._elapsed = 0.0
 
     def update(self, sprite, dt):
-        now = pygame.time.get_ticks()
+        self._elapsed += dt * 1000.0
 
-        if now - self._last_update > self._frame_speed:
+        if self._elapsed > self._frame_speed:
             current_frame_index = sprite.frame_index
 
             if current_frame_index + 1 < sprite.frame_count:
-                sprite.set_frame_index(current_frame_index + 1)
+                sprite.set_frame_index(min(current_frame_index + LinearFrameAnimator._frame_step,
+                                           sprite.frame_count - 1))
             elif self._frame_loop:
                 sprite.set_frame_index(0)
             elif self._kill_sprite:
                 sprite.kill()
 
-            self._last_update = now
+            self._elapsed = 0.0
+
+    def get_state(self):
+        return self._elapsed
+
+    def set_state(self, state):
+        self._elapsed = state
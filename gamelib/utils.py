@@ -17,3 +17,27 @@ def clamp_point_to_rect(pt, rect):
 
 def clamp(n, min_value, max_value):
     return min(max(n, min_value), max_value)
+
+
+def merge_rects(rects):
+    """
+        Merges overlapping rectangles into their union until no two rectangles overlap
+
+        :param rects:   (Rect[]) Rectangles to merge
+        :return:        (Rect[]) Merged rectangles
+    """
+
+    merged = []
+
+    for rect in rects:
+        rect = rect.copy()
+        index = rect.collidelist(merged)
+
+        # Each union can grow the rectangle into others already merged so keep going until it is clear
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+
+        merged.append(rect)
+
+    return merged
@@ -0,0 +1,642 @@
+"""
+    Game client
+
+    NetworkClient joins a GameServer, sends the local input state and rebuilds the replicated entities from
+    the server's delta compressed snapshots. Entities are shown interpolation_delay behind the server's
+    clock so there are normally two snapshots either side of the time being shown, when snapshots are late
+    the entities are extrapolated from their velocities for a short time.
+
+    RemoteScene displays the entities of a client in a game window:
+
+        python -m network.client --host 127.0.0.1 --port 7777
+"""
+
+import argparse
+import asyncio
+import collections
+import struct
+import sys
+import time
+
+import pygame
+
+from entities import asteroid
+from entities import explosion
+from entities import powerup
+from gamelib import scene
+from network import protocol
+from player import ship
+from player import weapons
+from scenes import background
+from scenes import level
+
+
+class EntityState(collections.namedtuple('EntityState', ['entity_id', 'kind', 'subtype', 'scale', 'x', 'y',
+                                                         'rotation', 'frame'])):
+    """
+        Interpolated state of a replicated entity
+    """
+
+    __slots__ = ()
+
+
+class ClientMetrics(object):
+    """
+        Bandwidth, snapshot and interpolation statistics of a client
+    """
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.snapshots = 0                  # Snapshots with every chunk received and applied
+        self.dropped_snapshots = 0          # Snapshots missing a chunk when a newer one completed
+        self.missing_baselines = 0          # Snapshots relative to a baseline the client no longer has
+        self.interpolated_frames = 0
+        self.extrapolated_frames = 0
+        self.start_time = time.perf_counter()
+
+    def get_report(self):
+
+        """
+            :return:    (dict) Metrics summary (bandwidth in kilobits per second)
+        """
+
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        frames = self.interpolated_frames + self.extrapolated_frames
+
+        return {
+            'elapsed': elapsed,
+            'snapshots': self.snapshots,
+            'dropped_snapshots': self.dropped_snapshots,
+            'missing_baselines': self.missing_baselines,
+            'packets_sent': self.packets_sent,
+            'packets_received': self.packets_received,
+            'kbps_sent': self.bytes_sent * 8 / elapsed / 1000.0,
+            'kbps_received': self.bytes_received * 8 / elapsed / 1000.0,
+            'extrapolated_fraction': self.extrapolated_frames / frames if frames else 0.0,
+        }
+
+
+class NetworkClient(asyncio.DatagramProtocol):
+    """
+        NetworkClient
+
+        Client side of the protocol, create one with connect ()
+    """
+
+    DEFAULT_INTERPOLATION_DELAY = 0.1       # Seconds, two snapshot intervals at the default snapshot rate
+    DEFAULT_INPUT_RATE = 30                 # Inputs sent per second
+
+    _HELLO_INTERVAL = 0.25
+    _HISTORY_SIZE = 32                      # Snapshots kept as delta baselines
+    _BUFFER_SIZE = 16                       # Snapshots kept for interpolation
+    _MAX_EXTRAPOLATION = 0.25               # Seconds entities are extrapolated before they stop
+    _CLOCK_SMOOTHING = 0.05
+
+    def __init__(self, interpolation_delay=DEFAULT_INTERPOLATION_DELAY, input_rate=DEFAULT_INPUT_RATE, link=None):
+
+        """
+            :param interpolation_delay:     (float) Seconds behind the server the entities are shown
+            :param input_rate:              (int) Inputs sent per second by run ()
+            :param link:                    (callable) Optional wrapper for the transport, e.g a
+                                            loopback.SimulatedLink
+        """
+
+        self._interpolation_delay = interpolation_delay
+        self._input_rate = input_rate
+        self._link = link
+
+        self._transport = None
+        self._welcome = None
+        self._is_running = False
+
+        self._client_id = None
+        self._ship_id = None
+        self._tick_rate = None
+        self._scene_size = None
+
+        self._sequence = 0
+        self._buttons = 0
+        self._primary_presses = 0
+        self._secondary_presses = 0
+
+        self._latest_tick = None
+        self._score = 0
+        self._pending = dict()                              # Tick -> (baseline tick, chunk count, {index: data})
+        self._states = collections.OrderedDict()            # Tick -> {entity id: quantised state}
+        self._buffer = collections.deque(maxlen=NetworkClient._BUFFER_SIZE)   # (tick, {entity id: dequantised})
+
+        self._clock_offset = None           # Server time (ticks / tick rate) minus local time
+
+        self._metrics = ClientMetrics()
+
+    @property
+    def is_connected(self):
+        return self._client_id is not None
+
+    @property
+    def client_id(self):
+        return self._client_id
+
+    @property
+    def ship_id(self):
+        return self._ship_id
+
+    @property
+    def tick_rate(self):
+        return self._tick_rate
+
+    @property
+    def latest_tick(self):
+        return self._latest_tick
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    def get_report(self):
+        report = self._metrics.get_report()
+        report['client_id'] = self._client_id
+
+        return report
+
+    def connection_made(self, transport):
+        self._transport = self._link(transport) if self._link else transport
+        self._welcome = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, address):
+        self._metrics.bytes_received += len(data)
+        self._metrics.packets_received += 1
+
+        packet_type = protocol.get_packet_type(data)
+
+        try:
+            if packet_type == protocol.PACKET_WELCOME:
+                self.__on_welcome(data)
+            elif packet_type == protocol.PACKET_SNAPSHOT and self.is_connected:
+                self.__on_snapshot(data)
+        except (struct.error, KeyError) as e:
+            print('NetworkClient::datagram_received (): Bad packet', e)
+
+    async def join(self, timeout=5.0):
+
+        """
+            Sends HELLO until the server welcomes the client
+
+            :param timeout:     (float) Seconds to wait for the server
+        """
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while not self._welcome.done():
+            if loop.time() > deadline:
+                raise TimeoutError('No response from server')
+
+            self.__send(protocol.pack_hello())
+
+            try:
+                await asyncio.wait_for(asyncio.shield(self._welcome), NetworkClient._HELLO_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def __on_welcome(self, data):
+        if self.is_connected:
+            return
+
+        self._client_id, self._ship_id, self._tick_rate, snapshot_rate, width, height = protocol.unpack_welcome(data)
+        self._scene_size = (width, height)
+
+        if not self._welcome.done():
+            self._welcome.set_result(True)
+
+    def __on_snapshot(self, data):
+        tick, baseline_tick, chunk_index, chunk_count, score, record_count = protocol.unpack_snapshot_header(data)
+
+        if self._latest_tick is not None and tick <= self._latest_tick:
+            return
+
+        pending = self._pending.get(tick)
+
+        if pending is None:
+            pending = (baseline_tick, chunk_count, dict())
+            self._pending[tick] = pending
+
+        chunks = pending[2]
+        chunks[chunk_index] = data
+
+        if len(chunks) < chunk_count:
+            return
+
+        # Every chunk of the snapshot has arrived, anything older still incomplete never will be
+        for pending_tick in [t for t in self._pending if t <= tick]:
+            if pending_tick != tick:
+                self._metrics.dropped_snapshots += 1
+
+            del self._pending[pending_tick]
+
+        if baseline_tick == protocol.NO_TICK:
+            baseline = {}
+        else:
+            baseline = self._states.get(baseline_tick)
+
+            if baseline is None:
+                self._metrics.missing_baselines += 1
+                return
+
+        entities = dict(baseline)
+
+        for index in range(chunk_count):
+            protocol.apply_snapshot_chunk(chunks[index], entities, baseline)
+
+        self._states[tick] = entities
+
+        while len(self._states) > NetworkClient._HISTORY_SIZE:
+            self._states.popitem(last=False)
+
+        self._latest_tick = tick
+        self._score = score
+        self._buffer.append((tick, {entity_id: protocol.dequantise(state) for entity_id, state in entities.items()}))
+        self._metrics.snapshots += 1
+
+        self.__update_clock(tick)
+
+        # Acknowledge straight away so the next snapshot can be relative to this one
+        self.send_input()
+
+    def __update_clock(self, tick):
+        offset = tick / self._tick_rate - time.monotonic()
+
+        # Snapshots that arrive early (less queuing) pull the clock forward faster than late ones hold it back
+        if self._clock_offset is None or offset - self._clock_offset > 0.25:
+            self._clock_offset = offset
+        elif offset > self._clock_offset:
+            self._clock_offset += (offset - self._clock_offset) * NetworkClient._CLOCK_SMOOTHING * 4
+        else:
+            self._clock_offset += (offset - self._clock_offset) * NetworkClient._CLOCK_SMOOTHING
+
+    def set_buttons(self, buttons):
+
+        """
+            :param buttons:     (int) protocol.BUTTON_* flags held down
+        """
+
+        self._buttons = buttons
+
+    def set_button(self, button, is_down):
+        self._buttons = (self._buttons | button) if is_down else (self._buttons & ~button)
+
+    def fire(self, weapon):
+
+        """
+            :param weapon:  (int) PlayerShip.PRIMARY_WEAPON or PlayerShip.SECONDARY_WEAPON
+        """
+
+        if weapon == ship.PlayerShip.PRIMARY_WEAPON:
+            self._primary_presses += 1
+        else:
+            self._secondary_presses += 1
+
+        self.send_input()
+
+    def send_input(self):
+        if not self.is_connected:
+            return
+
+        self._sequence += 1
+
+        ack_tick = self._latest_tick if self._latest_tick is not None else protocol.NO_TICK
+
+        self.__send(protocol.pack_input(self._sequence, ack_tick, self._buttons, self._primary_presses,
+                                        self._secondary_presses))
+
+    def __send(self, data):
+        self._transport.sendto(data)
+
+        self._metrics.bytes_sent += len(data)
+        self._metrics.packets_sent += 1
+
+    async def run(self, duration=None):
+
+        """
+            Sends the input state at the input rate until stop () is called or the duration has passed
+        """
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        self._is_running = True
+
+        while self._is_running and (duration is None or loop.time() - start_time < duration):
+            self.send_input()
+            await asyncio.sleep(1.0 / self._input_rate)
+
+    def stop(self):
+        self._is_running = False
+
+    def close(self):
+        self.stop()
+
+        if self._transport:
+            if self.is_connected:
+                self.__send(protocol.pack_bye())
+
+            self._transport.close()
+            self._transport = None
+
+    def get_render_tick(self, now=None):
+
+        """
+            :param now:     (float) time.monotonic () time or None for the current time
+            :return:        (float) Server tick being shown (fractional) or None before the first snapshot
+        """
+
+        if self._clock_offset is None:
+            return None
+
+        if now is None:
+            now = time.monotonic()
+
+        return (now + self._clock_offset - self._interpolation_delay) * self._tick_rate
+
+    def get_entities(self, now=None):
+
+        """
+            :param now:     (float) time.monotonic () time or None for the current time
+            :return:        (list) EntityState of every entity at the render time
+        """
+
+        render_tick = self.get_render_tick(now)
+
+        if render_tick is None:
+            return []
+
+        buffer = self._buffer
+        previous = None
+        following = None
+
+        for snapshot in buffer:
+            if snapshot[0] <= render_tick:
+                previous = snapshot
+            else:
+                following = snapshot
+                break
+
+        if previous is None:
+            # The render time is older than the buffer, show the oldest snapshot
+            self._metrics.interpolated_frames += 1
+            return self.__get_states(buffer[0][1], buffer[0][1], 0.0)
+
+        if following is None:
+            # No newer snapshot yet, extrapolate a little way along the velocities
+            self._metrics.extrapolated_frames += 1
+
+            elapsed = min((render_tick - previous[0]) / self._tick_rate, NetworkClient._MAX_EXTRAPOLATION)
+
+            return self.__get_states(previous[1], None, elapsed)
+
+        self._metrics.interpolated_frames += 1
+
+        alpha = (render_tick - previous[0]) / (following[0] - previous[0])
+
+        return self.__get_states(previous[1], following[1], alpha)
+
+    def __get_states(self, entities, next_entities, alpha):
+        states = []
+        width, height = self._scene_size
+
+        for entity_id, state in entities.items():
+            kind, subtype, scale, x, y, vx, vy, rotation, frame = state
+
+            if next_entities is None:
+                # Extrapolating, alpha is the time since the snapshot
+                x += vx * alpha
+                y += vy * alpha
+            else:
+                next_state = next_entities.get(entity_id)
+
+                if next_state is None:
+                    continue
+
+                dx = next_state[3] - x
+                dy = next_state[4] - y
+
+                # Entities that wrapped around the scene jump instead of sliding across it
+                if abs(dx) < width / 2 and abs(dy) < height / 2:
+                    x += dx * alpha
+                    y += dy * alpha
+
+                    rotation += ((next_state[7] - rotation + 180.0) % 360.0 - 180.0) * alpha
+                else:
+                    x, y = next_state[3:5]
+
+                frame = frame if alpha < 0.5 else next_state[8]
+
+            states.append(EntityState(entity_id, kind, subtype, scale, x, y, rotation % 360.0, frame))
+
+        # Entities only in the newer snapshot appear once the render time reaches it, entities only in
+        # the older snapshot have already gone
+        return states
+
+
+async def connect(host, port, timeout=5.0, **kwargs):
+
+    """
+        :param host:    (str) Server address
+        :param port:    (int) Server UDP port
+        :param timeout: (float) Seconds to wait for the server
+        :param kwargs:  Options passed to NetworkClient
+        :return:        (NetworkClient) Client that has joined the server
+    """
+
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(lambda: NetworkClient(**kwargs), remote_addr=(host, port))
+
+    try:
+        await client.join(timeout)
+    except TimeoutError:
+        client.close()
+        raise
+
+    return client
+
+
+class RemoteScene(scene.Scene):
+    """
+        Shows the entities of a NetworkClient. The sprites are created by the same factories as the
+        GameScene but are only moved by the interpolated snapshots. The client's asyncio loop is run for
+        one iteration per update so the game loop drives the network
+    """
+
+    _SCENE_LAYER_BACKGROUND = 0
+    _SCENE_LAYER_ENTITY = 1
+    _SCENE_LAYER_HUD = 5
+
+    def __init__(self, game, client, loop):
+
+        """
+            :param game:    (Game) Game showing the scene
+            :param client:  (NetworkClient) Connected client
+            :param loop:    (AbstractEventLoop) Event loop the client runs in
+        """
+
+        super().__init__(game)
+
+        self._client = client
+        self._loop = loop
+        self._nodes_by_id = dict()          # Entity id -> (kind, subtype, node)
+
+        asteroid.Factory.init(game)
+        explosion.Factory.init(game)
+        powerup.Factory.init(game)
+
+        self._factories = {
+            level.GameScene.ENTITY_SHIP: lambda subtype, scale: ship.Factory.create(subtype, 0, 0, game),
+            level.GameScene.ENTITY_ASTEROID: lambda subtype, scale: asteroid.Factory.create(0, 0, subtype),
+            level.GameScene.ENTITY_POWERUP: lambda subtype, scale: powerup.Factory.create(0, 0, subtype),
+            level.GameScene.ENTITY_PHOTON: lambda subtype, scale: weapons.Photon.create(
+                0, 0, weapons.Photon.get_tileset(game).get_tile(subtype), scale, pygame.math.Vector2(), 0),
+            level.GameScene.ENTITY_EXPLOSION: lambda subtype, scale: explosion.Factory.create(0, 0, subtype),
+        }
+
+        image_cache = game.image_cache
+
+        self._background = background.ParallaxScroller(0, 0, game.rect.width, game.rect.height)
+
+        for tag, speed, has_alpha in [('tiled_background_01', 0.4, False), ('parallax_layer_02', 0.6, True),
+                                      ('parallax_layer_01', 0.8, True)]:
+            self._background.add_layer(image_cache.get_scaled(tag), speed, has_alpha, image_cache.disk_cache,
+                                       image_cache.get_path(tag))
+
+        self.add_node(self._background, RemoteScene._SCENE_LAYER_BACKGROUND)
+
+        scale = game.render_scale
+
+        self._score_label = scene.SceneText(game.rect.right - int(380 * scale), int(5 * scale), 'SCORE: 00000000',
+                                            game.load_font('kenvector_future.ttf', int(32 * scale)), (200, 200, 0))
+
+        self.add_node(self._score_label, RemoteScene._SCENE_LAYER_HUD)
+
+        self._previous_ship_position = None
+
+    def update(self, dt):
+        # Run the network callbacks that are ready (received snapshots, input timer)
+        self._loop.call_soon(self._loop.stop)
+        self._loop.run_forever()
+
+        super().update(dt)
+
+        # The interpolated state is applied after the node updates so it is what gets drawn
+        self.__apply_entities(self._client.get_entities(), dt)
+
+        self._score_label.set_text('SCORE: {0:08d}'.format(self._client.score))
+
+    def __apply_entities(self, entities, dt):
+        nodes_by_id = dict()
+
+        for entity in entities:
+            kind, subtype, node = self._nodes_by_id.pop(entity.entity_id, (None, None, None))
+
+            if node is None or not node.alive() or kind != entity.kind or subtype != entity.subtype:
+                if node is not None:
+                    node.kill()
+
+                node = self.__create_node(entity)
+
+                if node is None:
+                    continue
+
+            if hasattr(node, 'physics_world'):
+                node.set_snapshot_state(entity.x, entity.y, entity.frame, 0.0, rotation=entity.rotation,
+                                        scale=entity.scale)
+            else:
+                node.set_snapshot_state(entity.x, entity.y, entity.frame, 0.0)
+
+            nodes_by_id[entity.entity_id] = (entity.kind, entity.subtype, node)
+
+            if entity.entity_id == self._client.ship_id:
+                self.__scroll_background(entity, dt)
+
+        for kind, subtype, node in self._nodes_by_id.values():
+            node.kill()
+
+        self._nodes_by_id = nodes_by_id
+
+    def __create_node(self, entity):
+        factory = self._factories.get(entity.kind)
+
+        if factory is None:
+            return None
+
+        node = factory(entity.subtype, entity.scale)
+
+        # Remote entities are placed by the snapshots, they must not animate, expire or move themselves
+        node.set_frame_animator(None)
+
+        self.add_node(node, RemoteScene._SCENE_LAYER_ENTITY)
+
+        return node
+
+    def __scroll_background(self, entity, dt):
+        position = pygame.math.Vector2(entity.x, entity.y)
+
+        if self._previous_ship_position is not None and dt > 0:
+            velocity = (position - self._previous_ship_position) / dt
+
+            if velocity.length() < self.rect.width:
+                self._background.set_velocity(velocity * -1)
+
+        self._previous_ship_position = position
+
+    def on_key_down(self, key, event):
+        self.__on_key(key, True)
+
+    def on_key_up(self, key, event):
+        self.__on_key(key, False)
+
+        if key == pygame.K_SPACE:
+            self._client.fire(ship.PlayerShip.PRIMARY_WEAPON)
+        elif key == pygame.K_x:
+            self._client.fire(ship.PlayerShip.SECONDARY_WEAPON)
+        elif key == pygame.K_q:
+            self.game.quit()
+
+    def __on_key(self, key, is_down):
+        if key == pygame.K_UP:
+            self._client.set_button(protocol.BUTTON_THRUST, is_down)
+        elif key == pygame.K_LEFT:
+            self._client.set_button(protocol.BUTTON_LEFT, is_down)
+        elif key == pygame.K_RIGHT:
+            self._client.set_button(protocol.BUTTON_RIGHT, is_down)
+
+
+def main(argv=None):
+    import spacerocks
+
+    parser = argparse.ArgumentParser(description='Space Rocks network client')
+    parser.add_argument('--host', default='127.0.0.1', help='Server address')
+    parser.add_argument('--port', type=int, default=7777, help='Server UDP port')
+    parser.add_argument('--delay', type=float, default=NetworkClient.DEFAULT_INTERPOLATION_DELAY,
+                        help='Interpolation delay in seconds')
+
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    client = loop.run_until_complete(connect(args.host, args.port, interpolation_delay=args.delay))
+    loop.create_task(client.run())
+
+    app = spacerocks.Spacerocks()
+    app.set_active_scene(RemoteScene(app, client, loop))
+    app.run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+    Loopback test harness
+
+    Runs a GameServer and several bot clients in one process over 127.0.0.1, every datagram in both
+    directions goes through a SimulatedLink that adds latency, jitter (which also reorders datagrams) and
+    random loss. The bots press random buttons and sample their interpolated entities at the frame rate a
+    window would, the server and client metrics are printed as JSON:
+
+        python -m network.loopback --clients 4 --duration 10 --latency 80 --jitter 10 --loss 5 --asteroids 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from network import client as network_client
+from network import protocol
+from network import server as network_server
+from player import ship
+
+
+class SimulatedLink(object):
+    """
+        Transport wrapper that delays and drops datagrams, see GameServer and NetworkClient link option
+    """
+
+    def __init__(self, transport, latency=0.05, jitter=0.0, loss=0.0, seed=0):
+
+        """
+            :param transport:   (DatagramTransport) Transport to send through
+            :param latency:     (float) One way delay in seconds
+            :param jitter:      (float) Maximum random variation of the delay in seconds
+            :param loss:        (float) Fraction of datagrams dropped (0 - 1)
+            :param seed:        (int) Seed of the loss and jitter random numbers
+        """
+
+        self._transport = transport
+        self._latency = latency
+        self._jitter = jitter
+        self._loss = loss
+        self._random = random.Random(seed)
+        self._loop = asyncio.get_running_loop()
+
+        self.sent = 0
+        self.dropped = 0
+
+    @classmethod
+    def factory(cls, latency=0.05, jitter=0.0, loss=0.0, seed=0):
+
+        """
+            :return:    (callable) Link option for GameServer or NetworkClient
+        """
+
+        return lambda transport: cls(transport, latency, jitter, loss, seed)
+
+    def sendto(self, data, address=None):
+        self.sent += 1
+
+        if self._random.random() < self._loss:
+            self.dropped += 1
+            return
+
+        delay = max(0.0, self._latency + self._random.uniform(-self._jitter, self._jitter))
+
+        self._loop.call_later(delay, self.__deliver, data, address)
+
+    def __deliver(self, data, address):
+        if self._transport is None or self._transport.is_closing():
+            return
+
+        if address is None:
+            self._transport.sendto(data)
+        else:
+            self._transport.sendto(data, address)
+
+    def get_extra_info(self, name, default=None):
+        return self._transport.get_extra_info(name, default)
+
+    def is_closing(self):
+        return self._transport.is_closing()
+
+    def close(self):
+        self._transport.close()
+
+
+async def _run_bot(client, duration, frame_rate, seed):
+    # Changes buttons every half second or so and fires now and then, like a (not very good) player
+
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + duration
+
+    while loop.time() < end_time:
+        if rng.random() < 2.0 / frame_rate:
+            client.set_buttons(rng.choice([0, protocol.BUTTON_THRUST]) |
+                               rng.choice([0, protocol.BUTTON_LEFT, protocol.BUTTON_RIGHT]))
+
+        if rng.random() < 3.0 / frame_rate:
+            client.fire(ship.PlayerShip.PRIMARY_WEAPON)
+
+        client.get_entities()
+
+        await asyncio.sleep(1.0 / frame_rate)
+
+
+async def run_loopback(clients=4, duration=10.0, latency=0.05, jitter=0.01, loss=0.05, snapshot_rate=None,
+                       asteroids=0, frame_rate=60, seed=0):
+
+    """
+        :param clients:         (int) Number of bot clients
+        :param duration:        (float) Seconds to run for
+        :param latency:         (float) One way latency in seconds
+        :param jitter:          (float) Latency variation in seconds
+        :param loss:            (float) Fraction of datagrams dropped in each direction
+        :param snapshot_rate:   (int) Snapshots per second or None for the server default
+        :param asteroids:       (int) Extra asteroids to add to the scene
+        :param frame_rate:      (int) Rate the bots sample their interpolated entities
+        :param seed:            (int) Random seed of the game, links and bots
+        :return:                (dict) Server, client and link metrics
+    """
+
+    server_links = []
+    client_links = []
+
+    def create_link(links, link_seed):
+        def create(transport):
+            link = SimulatedLink(transport, latency, jitter, loss, link_seed)
+            links.append(link)
+
+            return link
+
+        return create
+
+    options = {} if snapshot_rate is None else {'snapshot_rate': snapshot_rate}
+
+    server = await network_server.serve(network_server.create_game(seed), '127.0.0.1', 0,
+                                        link=create_link(server_links, seed), **options)
+
+    if asteroids:
+        server.scene.spawn_asteroids(asteroids)
+
+    host, port = server.address[0:2]
+    server_task = asyncio.ensure_future(server.run(duration + 1.0))
+
+    bots = []
+
+    try:
+        for index in range(clients):
+            bot = await network_client.connect(host, port, link=create_link(client_links, seed + index + 1))
+            bots.append(bot)
+
+        await asyncio.gather(*([bot.run(duration) for bot in bots] +
+                               [_run_bot(bot, duration, frame_rate, seed + index) for index, bot in enumerate(bots)]))
+    finally:
+        for bot in bots:
+            bot.close()
+
+        server.stop()
+        await server_task
+
+    report = {
+        'settings': {
+            'clients': clients,
+            'duration': duration,
+            'latency_ms': latency * 1000.0,
+            'jitter_ms': jitter * 1000.0,
+            'loss': loss,
+            'asteroids': server.scene.asteroid_count,
+        },
+        'server': server.get_report(),
+        'clients': [bot.get_report() for bot in bots],
+        'links': {
+            'server_sent': sum(link.sent for link in server_links),
+            'server_dropped': sum(link.dropped for link in server_links),
+            'client_sent': sum(link.sent for link in client_links),
+            'client_dropped': sum(link.dropped for link in client_links),
+        }
+    }
+
+    server.close()
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a server and bot clients over a simulated network')
+    parser.add_argument('--clients', type=int, default=4, help='Number of bot clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run for')
+    parser.add_argument('--latency', type=float, default=50.0, help='One way latency in milliseconds')
+    parser.add_argument('--jitter', type=float, default=10.0, help='Latency variation in milliseconds')
+    parser.add_argument('--loss', type=float, default=5.0, help='Percentage of datagrams dropped')
+    parser.add_argument('--snapshot-rate', type=int, help='Snapshots per second')
+    parser.add_argument('--asteroids', type=int, default=0, help='Extra asteroids to add to the scene')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--output', help='Write the report to a JSON file')
+
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_loopback(args.clients, args.duration, args.latency / 1000.0, args.jitter / 1000.0,
+                                      args.loss / 100.0, args.snapshot_rate, args.asteroids, seed=args.seed))
+
+    text = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text)
+
+    print(text)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+    Datagram formats shared by the server and clients
+
+    Every datagram starts with a packet type byte. Clients send HELLO until they receive a WELCOME, then send
+    their current INPUT state at a fixed rate (the state is absolute so a lost input is simply superseded
+    by the next one). The server sends SNAPSHOTs of the replicated entities, split into chunks that fit in
+    a datagram.
+
+    Entity state is quantised (quarter pixel positions, whole pixel per second velocities, 16 bit angles)
+    and delta compressed against the last snapshot the client acknowledged: entities that haven't changed
+    are left out and changed entities only carry the fields that differ. Each entity record is:
+
+        id (uint16), field mask (uint8), then the fields in the mask (in the FIELD_* order)
+
+    A record with an empty mask removes the entity.
+"""
+
+import struct
+
+
+PROTOCOL_VERSION = 1
+
+PACKET_HELLO = 1
+PACKET_WELCOME = 2
+PACKET_INPUT = 3
+PACKET_SNAPSHOT = 4
+PACKET_BYE = 5
+
+NO_TICK = 0xffffffff
+
+MAX_DATAGRAM_SIZE = 1200            # Payload that fits in a single unfragmented packet on most paths
+
+# Input buttons
+
+BUTTON_THRUST = 0x01
+BUTTON_LEFT = 0x02
+BUTTON_RIGHT = 0x04
+
+# Entity fields
+
+FIELD_TYPE = 0x01                   # kind, subtype, scale (only sent for new entities)
+FIELD_POSITION = 0x02               # x, y
+FIELD_POSITION_DELTA = 0x04         # x, y relative to the baseline when the change is small
+FIELD_VELOCITY = 0x08               # vx, vy
+FIELD_ROTATION = 0x10
+FIELD_FRAME = 0x20
+
+POSITION_SCALE = 4.0                # Quantisation steps per pixel
+ROTATION_SCALE = 65536.0 / 360.0
+SCALE_SCALE = 64.0
+
+# Quantised entity state (see quantise ())
+
+STATE_KIND = 0
+STATE_SUBTYPE = 1
+STATE_SCALE = 2
+STATE_X = 3
+STATE_Y = 4
+STATE_VX = 5
+STATE_VY = 6
+STATE_ROTATION = 7
+STATE_FRAME = 8
+
+_HEADER = struct.Struct('<B')
+_HELLO = struct.Struct('<BH')
+_WELCOME = struct.Struct('<BBHHHHH')
+_INPUT = struct.Struct('<BIIBBB')
+_SNAPSHOT = struct.Struct('<BIIBBIH')
+
+_RECORD = struct.Struct('<HB')
+_TYPE = struct.Struct('<BBB')
+_POSITION = struct.Struct('<hh')
+_POSITION_DELTA = struct.Struct('<bb')
+_VELOCITY = struct.Struct('<hh')
+_ROTATION = struct.Struct('<H')
+_FRAME = struct.Struct('<B')
+
+_FULL_RECORD_SIZE = _RECORD.size + _TYPE.size + _POSITION.size + _VELOCITY.size + _ROTATION.size + _FRAME.size
+
+
+def get_packet_type(data):
+    return data[0] if data else None
+
+
+def pack_hello():
+    return _HELLO.pack(PACKET_HELLO, PROTOCOL_VERSION)
+
+
+def unpack_hello(data):
+
+    """
+        :return:    (int) Protocol version of the client
+    """
+
+    return _HELLO.unpack_from(data)[1]
+
+
+def pack_welcome(client_id, ship_id, tick_rate, snapshot_rate, width, height):
+    return _WELCOME.pack(PACKET_WELCOME, client_id, ship_id, tick_rate, snapshot_rate, width, height)
+
+
+def unpack_welcome(data):
+
+    """
+        :return:    (tuple) client id, ship entity id, tick rate, snapshot rate, scene width, scene height
+    """
+
+    return _WELCOME.unpack_from(data)[1:]
+
+
+def pack_input(sequence, ack_tick, buttons, primary_presses, secondary_presses):
+
+    """
+        :param sequence:            (int) Increases with every input sent, older inputs are ignored
+        :param ack_tick:            (int) Tick of the last complete snapshot received or NO_TICK
+        :param buttons:             (int) BUTTON_* flags held down
+        :param primary_presses:     (int) Number of times the primary weapon has been fired (wraps at 256)
+        :param secondary_presses:   (int) Number of times the secondary weapon has been fired (wraps at 256)
+    """
+
+    return _INPUT.pack(PACKET_INPUT, sequence, ack_tick, buttons, primary_presses & 0xff, secondary_presses & 0xff)
+
+
+def unpack_input(data):
+
+    """
+        :return:    (tuple) sequence, ack tick, buttons, primary presses, secondary presses
+    """
+
+    return _INPUT.unpack_from(data)[1:]
+
+
+def pack_bye():
+    return _HEADER.pack(PACKET_BYE)
+
+
+def quantise(kind, subtype, sprite):
+
+    """
+        :param kind:    (int) Entity kind (GameScene.ENTITY_*)
+        :param subtype: (int) Entity subtype
+        :param sprite:  (SceneSprite) Sprite to quantise
+        :return:        (tuple) Quantised state, see STATE_*
+    """
+
+    if hasattr(sprite, 'physics_world'):
+        position = sprite.position
+        velocity = sprite.velocity
+
+        return (kind, subtype, _clamp(int(sprite.scale * SCALE_SCALE), 0, 255),
+                _clamp_short(position.x * POSITION_SCALE), _clamp_short(position.y * POSITION_SCALE),
+                _clamp_short(velocity.x), _clamp_short(velocity.y),
+                int((sprite.rotation % 360.0) * ROTATION_SCALE) & 0xffff, sprite.frame_index & 0xff)
+
+    rect = sprite.rect
+
+    return (kind, subtype, int(SCALE_SCALE), _clamp_short(rect.centerx * POSITION_SCALE),
+            _clamp_short(rect.centery * POSITION_SCALE), 0, 0, 0, sprite.frame_index & 0xff)
+
+
+def dequantise(state):
+
+    """
+        :return:    (tuple) kind, subtype, scale, x, y, vx, vy, rotation, frame in scene units
+    """
+
+    return (state[STATE_KIND], state[STATE_SUBTYPE], state[STATE_SCALE] / SCALE_SCALE,
+            state[STATE_X] / POSITION_SCALE, state[STATE_Y] / POSITION_SCALE, float(state[STATE_VX]),
+            float(state[STATE_VY]), state[STATE_ROTATION] / ROTATION_SCALE, state[STATE_FRAME])
+
+
+def encode_entities(entities, baseline):
+
+    """
+        Delta encodes the current entity states against a baseline
+
+        :param entities:    (dict) Entity id -> quantised state
+        :param baseline:    (dict) Entity id -> quantised state the client has or None to send everything
+        :return:            (list) Encoded entity records (bytes)
+    """
+
+    records = []
+
+    if baseline is None:
+        baseline = {}
+
+    for entity_id, state in entities.items():
+        base = baseline.get(entity_id)
+        mask = 0
+        fields = []
+
+        if base is None or base[STATE_KIND] != state[STATE_KIND] or base[STATE_SUBTYPE] != state[STATE_SUBTYPE]:
+            base = None
+            mask |= FIELD_TYPE
+            fields.append(_TYPE.pack(state[STATE_KIND], state[STATE_SUBTYPE], state[STATE_SCALE]))
+
+        if base is None:
+            mask |= FIELD_POSITION
+            fields.append(_POSITION.pack(state[STATE_X], state[STATE_Y]))
+        elif base[STATE_X] != state[STATE_X] or base[STATE_Y] != state[STATE_Y]:
+            dx = state[STATE_X] - base[STATE_X]
+            dy = state[STATE_Y] - base[STATE_Y]
+
+            if -128 <= dx <= 127 and -128 <= dy <= 127:
+                mask |= FIELD_POSITION_DELTA
+                fields.append(_POSITION_DELTA.pack(dx, dy))
+            else:
+                mask |= FIELD_POSITION
+                fields.append(_POSITION.pack(state[STATE_X], state[STATE_Y]))
+
+        if base is None or base[STATE_VX] != state[STATE_VX] or base[STATE_VY] != state[STATE_VY]:
+            mask |= FIELD_VELOCITY
+            fields.append(_VELOCITY.pack(state[STATE_VX], state[STATE_VY]))
+
+        if base is None or base[STATE_ROTATION] != state[STATE_ROTATION]:
+            mask |= FIELD_ROTATION
+            fields.append(_ROTATION.pack(state[STATE_ROTATION]))
+
+        if base is None or base[STATE_FRAME] != state[STATE_FRAME]:
+            mask |= FIELD_FRAME
+            fields.append(_FRAME.pack(state[STATE_FRAME]))
+
+        if mask:
+            records.append(_RECORD.pack(entity_id, mask) + b''.join(fields))
+
+    for entity_id in baseline:
+        if entity_id not in entities:
+            records.append(_RECORD.pack(entity_id, 0))
+
+    return records
+
+
+def get_full_size(entities):
+
+    """
+        :return:    (int) Size of the entity records without delta compression, used for bandwidth metrics
+    """
+
+    return len(entities) * _FULL_RECORD_SIZE
+
+
+def pack_snapshot(tick, baseline_tick, score, records, max_size=MAX_DATAGRAM_SIZE):
+
+    """
+        :param tick:            (int) Server tick of the snapshot
+        :param baseline_tick:   (int) Tick the records are relative to or NO_TICK
+        :param score:           (int) Scene score
+        :param records:         (list) Records from encode_entities ()
+        :param max_size:        (int) Maximum datagram size
+        :return:                (list) Datagrams (at least one), every chunk is needed to apply the snapshot
+    """
+
+    chunks = []
+    chunk = []
+    size = _SNAPSHOT.size
+
+    for record in records:
+        if chunk and size + len(record) > max_size:
+            chunks.append(chunk)
+            chunk = []
+            size = _SNAPSHOT.size
+
+        chunk.append(record)
+        size += len(record)
+
+    chunks.append(chunk)
+
+    if len(chunks) > 255:
+        raise ValueError('Snapshot too large ({0} chunks)'.format(len(chunks)))
+
+    return [_SNAPSHOT.pack(PACKET_SNAPSHOT, tick, baseline_tick, index, len(chunks), score, len(chunk)) +
+            b''.join(chunk) for index, chunk in enumerate(chunks)]
+
+
+def unpack_snapshot_header(data):
+
+    """
+        :return:    (tuple) tick, baseline tick, chunk index, chunk count, score, record count
+    """
+
+    return _SNAPSHOT.unpack_from(data)[1:]
+
+
+def apply_snapshot_chunk(data, entities, baseline):
+
+    """
+        Applies the records in a snapshot chunk
+
+        :param data:        (bytes) Snapshot datagram
+        :param entities:    (dict) Entity id -> quantised state, updated in place
+        :param baseline:    (dict) Entity id -> quantised state the chunk is relative to
+    """
+
+    record_count = _SNAPSHOT.unpack_from(data)[6]
+    offset = _SNAPSHOT.size
+
+    for index in range(record_count):
+        entity_id, mask = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+
+        if mask == 0:
+            entities.pop(entity_id, None)
+            continue
+
+        if mask & FIELD_TYPE:
+            kind, subtype, scale = _TYPE.unpack_from(data, offset)
+            offset += _TYPE.size
+
+            state = [kind, subtype, scale, 0, 0, 0, 0, 0, 0]
+        else:
+            state = list(baseline[entity_id])
+
+        if mask & FIELD_POSITION:
+            state[STATE_X], state[STATE_Y] = _POSITION.unpack_from(data, offset)
+            offset += _POSITION.size
+        elif mask & FIELD_POSITION_DELTA:
+            dx, dy = _POSITION_DELTA.unpack_from(data, offset)
+            state[STATE_X] += dx
+            state[STATE_Y] += dy
+            offset += _POSITION_DELTA.size
+
+        if mask & FIELD_VELOCITY:
+            state[STATE_VX], state[STATE_VY] = _VELOCITY.unpack_from(data, offset)
+            offset += _VELOCITY.size
+
+        if mask & FIELD_ROTATION:
+            state[STATE_ROTATION], = _ROTATION.unpack_from(data, offset)
+            offset += _ROTATION.size
+
+        if mask & FIELD_FRAME:
+            state[STATE_FRAME], = _FRAME.unpack_from(data, offset)
+            offset += _FRAME.size
+
+        entities[entity_id] = tuple(state)
+
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+def _clamp_short(value):
+    return _clamp(int(round(value)), -32768, 32767)
@@ -0,0 +1,497 @@
+"""
+    Authoritative game server
+
+    The server owns the only simulation of a GameScene. Each client that joins is given a player ship (the
+    first client the scene's own ship, later clients remote ships) and sends its input state over UDP, the
+    server applies the latest input before every tick and broadcasts delta compressed snapshots of the
+    scene at the snapshot rate (see protocol.py).
+
+        python -m network.server --port 7777 --seed 1234
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import sys
+import time
+
+import spacerocks
+
+from gamelib import physics
+from network import protocol
+from player import ship
+from scenes import level
+
+
+class ServerClient(object):
+    """
+        Connection state of a client
+    """
+
+    def __init__(self, client_id, address, player_ship, ship_id, now):
+        self.client_id = client_id
+        self.address = address
+        self.player_ship = player_ship
+        self.ship_id = ship_id
+
+        self.sequence = -1
+        self.ack_tick = protocol.NO_TICK
+        self.buttons = 0
+        self.primary_presses = None
+        self.secondary_presses = None
+
+        self.last_seen = now
+
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.full_snapshots = 0
+        self.delta_snapshots = 0
+
+
+class ServerMetrics(object):
+    """
+        Tick time and bandwidth statistics of a server
+    """
+
+    _TICK_WINDOW = 600              # Tick times kept for the percentiles
+
+    def __init__(self):
+        self.ticks = 0
+        self.late_ticks = 0
+        self.snapshots = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.uncompressed_bytes = 0         # Size the snapshots would have been without delta compression
+        self.start_time = time.perf_counter()
+
+        self.__tick_times = collections.deque(maxlen=ServerMetrics._TICK_WINDOW)
+
+    def add_tick(self, tick_time, is_late):
+        self.ticks += 1
+        self.late_ticks += int(is_late)
+        self.__tick_times.append(tick_time)
+
+    def get_report(self, clients=()):
+
+        """
+            :param clients:     (list) ServerClients to include per client bandwidth for
+            :return:            (dict) Metrics summary (times in milliseconds, bandwidth in kilobits per second)
+        """
+
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        tick_times = sorted(self.__tick_times)
+
+        def percentile(fraction):
+            return tick_times[min(int(len(tick_times) * fraction), len(tick_times) - 1)] * 1000.0 if tick_times else 0.0
+
+        report = {
+            'elapsed': elapsed,
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'tick_ms_mean': sum(tick_times) / len(tick_times) * 1000.0 if tick_times else 0.0,
+            'tick_ms_p50': percentile(0.5),
+            'tick_ms_p99': percentile(0.99),
+            'tick_ms_max': tick_times[-1] * 1000.0 if tick_times else 0.0,
+            'snapshots': self.snapshots,
+            'packets_sent': self.packets_sent,
+            'packets_received': self.packets_received,
+            'kbps_sent': self.bytes_sent * 8 / elapsed / 1000.0,
+            'kbps_received': self.bytes_received * 8 / elapsed / 1000.0,
+            'compression_ratio': self.uncompressed_bytes / self.bytes_sent if self.bytes_sent else 0.0,
+            'clients': [{
+                'client_id': client.client_id,
+                'kbps_sent': client.bytes_sent * 8 / elapsed / 1000.0,
+                'kbps_received': client.bytes_received * 8 / elapsed / 1000.0,
+                'full_snapshots': client.full_snapshots,
+                'delta_snapshots': client.delta_snapshots,
+            } for client in clients]
+        }
+
+        return report
+
+
+class GameServer(asyncio.DatagramProtocol):
+    """
+        GameServer
+
+        Runs a GameScene at the game tick rate and replicates it to up to max_clients clients, call run ()
+        once the server is bound to a socket (see serve ())
+    """
+
+    DEFAULT_PORT = 7777
+    DEFAULT_SNAPSHOT_RATE = 20
+    DEFAULT_MAX_CLIENTS = 8
+    DEFAULT_TIMEOUT = 5.0
+
+    _MAX_PRESSES_PER_TICK = 4       # Caps the shots fired for a burst of presses arriving together
+    _HISTORY_SIZE = 32              # Snapshots kept as delta baselines
+
+    def __init__(self, game, snapshot_rate=DEFAULT_SNAPSHOT_RATE, max_clients=DEFAULT_MAX_CLIENTS,
+                 timeout=DEFAULT_TIMEOUT, link=None):
+
+        """
+            :param game:            (Game) Headless game to run the scene in
+            :param snapshot_rate:   (int) Snapshots sent per second (at most the tick rate)
+            :param max_clients:     (int) Maximum number of connected clients
+            :param timeout:         (float) Seconds without input before a client is dropped
+            :param link:            (callable) Optional wrapper for the transport, e.g a loopback.SimulatedLink
+        """
+
+        self._game = game
+        self._tick_rate = game.tick_rate or spacerocks.Spacerocks.TICK_RATE
+        self._snapshot_interval = max(1, int(round(self._tick_rate / snapshot_rate)))
+        self._max_clients = max_clients
+        self._timeout = timeout
+        self._link = link
+
+        self._scene = level.GameScene(game, use_physics_world=physics.is_available())
+        self._transport = None
+        self._tick = 0
+        self._is_running = False
+
+        self._clients = dict()                  # Address -> ServerClient
+        self._entity_ids = dict()               # Node -> entity id
+        self._next_entity_id = 1
+        self._history = collections.OrderedDict()      # Tick -> {entity id: quantised state}
+
+        self._metrics = ServerMetrics()
+
+    @property
+    def scene(self):
+        return self._scene
+
+    @property
+    def tick(self):
+        return self._tick
+
+    @property
+    def tick_rate(self):
+        return self._tick_rate
+
+    @property
+    def clients(self):
+        return list(self._clients.values())
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def address(self):
+        return self._transport.get_extra_info('sockname') if self._transport else None
+
+    def get_report(self):
+        return self._metrics.get_report(self.clients)
+
+    def connection_made(self, transport):
+        self._transport = self._link(transport) if self._link else transport
+
+    def datagram_received(self, data, address):
+        self._metrics.bytes_received += len(data)
+        self._metrics.packets_received += 1
+
+        packet_type = protocol.get_packet_type(data)
+        client = self._clients.get(address)
+
+        try:
+            if packet_type == protocol.PACKET_HELLO:
+                self.__on_hello(data, address, client)
+            elif client is None:
+                return
+            elif packet_type == protocol.PACKET_INPUT:
+                self.__on_input(data, client)
+            elif packet_type == protocol.PACKET_BYE:
+                self.__remove_client(client)
+        except Exception as e:
+            print('GameServer::datagram_received (): Bad packet from', address, e)
+
+        if client is not None:
+            client.bytes_received += len(data)
+            client.packets_received += 1
+
+    def __on_hello(self, data, address, client):
+        if protocol.unpack_hello(data) != protocol.PROTOCOL_VERSION:
+            return
+
+        if client is None:
+            if len(self._clients) >= self._max_clients:
+                return
+
+            client_ids = set(c.client_id for c in self._clients.values())
+            client_id = next(n for n in range(self._max_clients) if n not in client_ids)
+
+            # The scene's own ship goes to the first client, everyone else gets a remote ship
+            if any(c.player_ship is self._scene.player_ship for c in self._clients.values()):
+                ship_type = ship.Factory.TYPE_YELLOW_HAWK if client_id % 2 else ship.Factory.TYPE_RED_VIPER
+                player_ship = self._scene.add_remote_ship(ship_type)
+            else:
+                player_ship = self._scene.player_ship
+
+            client = ServerClient(client_id, address, player_ship, self.__get_entity_id(player_ship), time.monotonic())
+            self._clients[address] = client
+
+            print('GameServer: Client', client_id, 'joined from', address)
+
+        # Hello is repeated until the client sees the welcome, it may have been lost
+        rect = self._game.rect
+
+        self.__send(client, protocol.pack_welcome(client.client_id, client.ship_id, self._tick_rate,
+                                                  self._tick_rate // self._snapshot_interval, rect.width, rect.height))
+
+    def __on_input(self, data, client):
+        sequence, ack_tick, buttons, primary_presses, secondary_presses = protocol.unpack_input(data)
+
+        client.last_seen = time.monotonic()
+
+        # Datagrams can arrive out of order, only the newest input counts
+        if sequence <= client.sequence:
+            return
+
+        client.sequence = sequence
+
+        if ack_tick != protocol.NO_TICK and (client.ack_tick == protocol.NO_TICK or ack_tick > client.ack_tick):
+            client.ack_tick = ack_tick
+
+        client.buttons = buttons
+
+        player_ship = client.player_ship
+        player_ship.set_thrust(bool(buttons & protocol.BUTTON_THRUST))
+
+        if buttons & protocol.BUTTON_LEFT:
+            player_ship.rotate(ship.PlayerShip.ROTATE_LEFT)
+        elif buttons & protocol.BUTTON_RIGHT:
+            player_ship.rotate(ship.PlayerShip.ROTATE_RIGHT)
+        else:
+            player_ship.rotate(ship.PlayerShip.ROTATE_STOP)
+
+        # Presses are counters so a lost input doesn't lose a shot, the first input only sets the count
+        client.primary_presses = self.__fire(player_ship, ship.PlayerShip.PRIMARY_WEAPON, client.primary_presses,
+                                             primary_presses)
+        client.secondary_presses = self.__fire(player_ship, ship.PlayerShip.SECONDARY_WEAPON,
+                                               client.secondary_presses, secondary_presses)
+
+    @staticmethod
+    def __fire(player_ship, weapon, presses, new_presses):
+        if presses is not None and player_ship.alive():
+            for n in range(min((new_presses - presses) & 0xff, GameServer._MAX_PRESSES_PER_TICK)):
+                player_ship.fire_weapon(weapon)
+
+        return new_presses
+
+    def __remove_client(self, client):
+        print('GameServer: Client', client.client_id, 'left')
+
+        del self._clients[client.address]
+
+        if client.player_ship is self._scene.player_ship:
+            client.player_ship.set_thrust(False)
+            client.player_ship.rotate(ship.PlayerShip.ROTATE_STOP)
+        else:
+            self._scene.remove_remote_ship(client.player_ship)
+
+    def __send(self, client, data):
+        self._transport.sendto(data, client.address)
+
+        client.bytes_sent += len(data)
+        client.packets_sent += 1
+
+        self._metrics.bytes_sent += len(data)
+        self._metrics.packets_sent += 1
+
+    async def run(self, duration=None):
+
+        """
+            Runs the simulation in real time until stop () is called or the duration has passed
+
+            :param duration:    (float) Seconds to run for or None to run until stopped
+        """
+
+        loop = asyncio.get_running_loop()
+        dt = 1.0 / self._tick_rate
+
+        start_time = loop.time()
+        next_tick = start_time
+
+        self._is_running = True
+
+        while self._is_running and (duration is None or loop.time() - start_time < duration):
+            tick_start = time.perf_counter()
+
+            self.step(dt)
+
+            tick_time = time.perf_counter() - tick_start
+            next_tick += dt
+
+            # Ticks are not made up once the server falls behind, the schedule restarts from now
+            is_late = loop.time() > next_tick
+
+            if is_late:
+                next_tick = loop.time()
+
+            self._metrics.add_tick(tick_time, is_late)
+
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def stop(self):
+        self._is_running = False
+
+    def close(self):
+        self.stop()
+
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+
+        self._scene.clear()
+
+    def step(self, dt):
+
+        """
+            Runs a single simulation tick and sends snapshots when one is due
+        """
+
+        self._scene.update(dt)
+        self._tick += 1
+
+        now = time.monotonic()
+
+        for client in [c for c in self._clients.values() if now - c.last_seen > self._timeout]:
+            self.__remove_client(client)
+
+        if self._tick % self._snapshot_interval == 0:
+            self.__broadcast()
+
+    def __broadcast(self):
+        entities = self.__get_entity_states()
+
+        self._history[self._tick] = entities
+
+        while len(self._history) > GameServer._HISTORY_SIZE:
+            self._history.popitem(last=False)
+
+        score = self._scene.score
+        full_size = protocol.get_full_size(entities)
+
+        # Records are encoded once per baseline, clients that acknowledged the same tick share them
+        encoded = dict()
+
+        for client in self._clients.values():
+            baseline_tick = client.ack_tick if client.ack_tick in self._history else protocol.NO_TICK
+
+            datagrams = encoded.get(baseline_tick)
+
+            if datagrams is None:
+                records = protocol.encode_entities(entities, self._history.get(baseline_tick))
+                datagrams = protocol.pack_snapshot(self._tick, baseline_tick, score, records)
+                encoded[baseline_tick] = datagrams
+
+            for datagram in datagrams:
+                self.__send(client, datagram)
+
+            if baseline_tick == protocol.NO_TICK:
+                client.full_snapshots += 1
+            else:
+                client.delta_snapshots += 1
+
+            self._metrics.uncompressed_bytes += full_size
+
+        self._metrics.snapshots += 1
+
+    def __get_entity_states(self):
+        entity_ids = dict()
+        entities = dict()
+
+        # Floating text isn't replicated, clients can show their own
+        for kind, subtype, node in self._scene.get_entities():
+            if kind != level.GameScene.ENTITY_FLOATING_TEXT:
+                entity_id = self.__get_entity_id(node)
+
+                entity_ids[node] = entity_id
+                entities[entity_id] = protocol.quantise(kind, subtype, node)
+
+        # Nodes that have left the scene lose their id, a pooled node that comes back gets a new one
+        self._entity_ids = entity_ids
+
+        return entities
+
+    def __get_entity_id(self, node):
+        entity_id = self._entity_ids.get(node)
+
+        if entity_id is None:
+            entity_id = self._next_entity_id
+            self._entity_ids[node] = entity_id
+
+            # Ids are 16 bit, zero is never used
+            self._next_entity_id = self._next_entity_id % 0xffff + 1
+
+        return entity_id
+
+
+async def serve(game, host='0.0.0.0', port=GameServer.DEFAULT_PORT, **kwargs):
+
+    """
+        :param game:    (Game) Headless game to run the scene in
+        :param host:    (str) Address to bind to
+        :param port:    (int) UDP port, 0 to choose a free port
+        :param kwargs:  Options passed to GameServer
+        :return:        (GameServer) Server bound to the socket, call run () to start the simulation
+    """
+
+    loop = asyncio.get_running_loop()
+    transport, server = await loop.create_datagram_endpoint(lambda: GameServer(game, **kwargs), local_addr=(host, port))
+
+    return server
+
+
+def create_game(seed=None):
+
+    """
+        :return:    (Spacerocks) Headless game with rendering disabled for the server to simulate in
+    """
+
+    game = spacerocks.Spacerocks(headless=True, seed=seed)
+    game.set_render_enabled(False)
+
+    return game
+
+
+async def _run_server(args):
+    server = await serve(create_game(args.seed), args.host, args.port, snapshot_rate=args.snapshot_rate,
+                         max_clients=args.max_clients)
+
+    print('GameServer: Listening on', server.address)
+
+    try:
+        await server.run(args.duration)
+    finally:
+        print(json.dumps(server.get_report(), indent=2))
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Space Rocks authoritative server')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to bind to')
+    parser.add_argument('--port', type=int, default=GameServer.DEFAULT_PORT, help='UDP port')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('--snapshot-rate', type=int, default=GameServer.DEFAULT_SNAPSHOT_RATE,
+                        help='Snapshots per second')
+    parser.add_argument('--max-clients', type=int, default=GameServer.DEFAULT_MAX_CLIENTS, help='Maximum clients')
+    parser.add_argument('--duration', type=float, help='Seconds to run for (default: until interrupted)')
+
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_run_server(args))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,6 @@
 import pygame
 
-from gamelib import spritesheet
 from gamelib import sprite
-from gamelib import utils
 
 from player import weapons
 
@@ -48,14 +46,21 @@ class PlayerShip(sprite.KinematicSprite):
         self.set_scale(scale)
 
         self._thrust = False
+        self._thrust_emitter = None
         self._has_drag = False
         self._has_shield = False
 
-        self._thrust_velocity = PlayerShip._THRUST_VELOCITY
-        self._thrust_friction = PlayerShip._SHIP_DRAG
+        # Speeds and sizes are designed for the window resolution and scaled to the render resolution
+        self._render_scale = game.render_scale
+
+        self._thrust_velocity = PlayerShip._THRUST_VELOCITY * self._render_scale
+        self._thrust_friction = PlayerShip._SHIP_DRAG * self._render_scale
 
         self._screen_rect = game.rect
 
+        # If the ship runs off the edge of the screen it should warp to the opposite side
+        self.set_wrap_rect(self._screen_rect)
+
         self._projectiles = pygame.sprite.Group()
 
         self._primary_weapon = weapons.SingleShot(game, self)
@@ -66,7 +71,7 @@ class PlayerShip(sprite.KinematicSprite):
 
     @property
     def radius(self):
-        return int(PlayerShip._COLLISION_RADIUS * self.scale)
+        return int(PlayerShip._COLLISION_RADIUS * self.scale * self._render_scale)
 
     def rotate(self, type):
         self.set_rotation_velocity(PlayerShip._ROTATE_VELOCITY * type)
@@ -86,10 +91,18 @@ class PlayerShip(sprite.KinematicSprite):
     def set_thrust(self, thrust):
         self._thrust = thrust
 
+    def set_thrust_emitter(self, emitter):
+
+        """
+            :param emitter:     (Emitter) Particle emitter for the engine exhaust or None
+        """
+
+        self._thrust_emitter = emitter
+
     def toggle_drag(self):
 
         if not self._has_drag:
-            self.set_drag(PlayerShip._SHIP_DRAG, PlayerShip._SHIP_DRAG)
+            self.set_drag(self._thrust_friction, self._thrust_friction)
         else:
             self.set_drag(0, 0)
 
@@ -98,10 +111,47 @@ class PlayerShip(sprite.KinematicSprite):
     def toggle_shield(self):
         self._has_shield = not self._has_shield
 
+    def set_drag_enabled(self, has_drag):
+        if self._has_drag != has_drag:
+            self.toggle_drag()
+
+    def set_shield(self, has_shield):
+        self._has_shield = has_shield
+
+    @property
+    def thrust(self):
+        return self._thrust
+
+    @property
+    def has_drag(self):
+        return self._has_drag
+
+    @property
+    def has_shield(self):
+        return self._has_shield
+
     @property
     def projectiles(self):
         return self._projectiles
 
+    @property
+    def primary_weapon(self):
+        return self._primary_weapon
+
+    @property
+    def secondary_weapon(self):
+        return self._secondary_weapon
+
+    def set_primary_weapon(self, weapon):
+        self._primary_weapon = weapon
+
+    def set_secondary_weapon(self, weapon):
+        self._secondary_weapon = weapon
+
+    @property
+    def render_scale(self):
+        return self._render_scale
+
     @property
     def screen_rect(self):
         return self._screen_rect
@@ -114,6 +164,13 @@ class PlayerShip(sprite.KinematicSprite):
         if self._thrust:
             forward = self.get_forward_vector() * self._thrust_velocity
             self.set_acceleration(forward.x, forward.y)
+
+            if self._thrust_emitter is not None:
+                # Exhaust leaves the back of the ship, carried along with the ship
+                backward = self.get_forward_vector() * -1
+                x, y = self.position + backward * (self.rect.height * 0.3)
+
+                self._thrust_emitter.emit(dt, x, y, backward, self.velocity)
         elif self.acceleration:
             self.set_acceleration(0, 0)
 
@@ -122,9 +179,6 @@ class PlayerShip(sprite.KinematicSprite):
         frame = frame if self._has_shield is False else frame + 2
         self.set_frame_index(frame)
 
-        # If the ship runs off the edge of the screen it should warp to the opposite side
-        self._rect.center = utils.clamp_point_to_rect(self._rect.center, self._screen_rect)
-
         # if self._primary_weapon.can_fire ():
         #     self.fire_weapon (PlayerShip.PRIMARY_WEAPON)
 
@@ -133,7 +187,7 @@ class PlayerShip(sprite.KinematicSprite):
 
     @staticmethod
     def _get_tileset(image_cache, name, width, height):
-        return spritesheet.SpriteSheet(image_cache.get(name), width, height)
+        return image_cache.get_sheet(name, width, height)
 
 
 class RedViper(PlayerShip):
@@ -147,6 +201,10 @@ class RedViper(PlayerShip):
         super().__init__(x, y, RedViper._TILE_SET_NAME, RedViper._TILE_WIDTH,
                          RedViper._TILE_HEIGHT, RedViper._TILE_SCALE, game)
 
+    @property
+    def ship_type(self):
+        return Factory.TYPE_RED_VIPER
+
 
 class YellowHawk(PlayerShip):
     _TILE_WIDTH = 186
@@ -158,3 +216,7 @@ class YellowHawk(PlayerShip):
     def __init__(self, x, y, game):
         super().__init__(x, y, YellowHawk._TILE_SET_NAME, YellowHawk._TILE_WIDTH,
                          YellowHawk._TILE_HEIGHT, YellowHawk._TILE_SCALE, game)
+
+    @property
+    def ship_type(self):
+        return Factory.TYPE_YELLOW_HAWK
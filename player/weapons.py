@@ -1,14 +1,17 @@
 import math
 import pygame
 
+from gamelib import audio
+from gamelib import pool
 from gamelib import sprite
-from gamelib import spritesheet
 
 from abc import ABC, abstractmethod
 
 
 class PlayerWeapon(ABC):
 
+    SOUND_MAX_INSTANCES = 2
+
     def __init__(self, game, ship):
         self.__game = game
         self.__ship = ship
@@ -47,17 +50,9 @@ class Missile(sprite.KinematicSprite):
     def __init__(self, x, y, image, velocity, angle, time_to_live=DEFAULT_TIME_TO_LIVE):
         super().__init__(x, y, [image], 0, velocity)
 
-        self._time_to_live = time_to_live
         self.set_rotation(angle)
         self.set_max_velocity(5000, 5000)
-
-    def update(self, scene, dt):
-        super().update(scene, dt)
-
-        self._time_to_live -= dt
-
-        if self._time_to_live <= 0:
-            self.kill()
+        self.set_time_to_live(time_to_live)
 
 
 class Photon(sprite.KinematicSprite):
@@ -74,32 +69,67 @@ class Photon(sprite.KinematicSprite):
 
     _COLLISION_RADIUS = 35
 
+    _tileset = None
+    _photon_pool = None
+    _render_scale = 1.0
+
     def __init__(self, x, y, image, scale, velocity, angle, time_to_live=TIME_TO_LIVE):
         super().__init__(x, y, [image], 0, velocity)
 
-        self._time_to_live = time_to_live
+        self.set_scale(scale)
+        self.set_rotation(angle)
+        self.set_max_velocity(Photon.VELOCITY * Photon._render_scale, Photon.VELOCITY * Photon._render_scale)
+        self.set_time_to_live(time_to_live)
+
+    @classmethod
+    def create(cls, x, y, image, scale, velocity, angle, time_to_live=TIME_TO_LIVE):
+
+        """
+            Returns a photon from the shared pool, photons are recycled once they are killed
+        """
+
+        if cls._photon_pool is None:
+            cls._photon_pool = pool.ObjectPool(Photon, 'photon')
+
+        return cls._photon_pool.acquire(x, y, image, scale, velocity, angle, time_to_live)
+
+    def reset(self, x, y, image, scale, velocity, angle, time_to_live=TIME_TO_LIVE):
+        self._reset_sprite(x, y, [image], 0)
+        self._reset_kinematics(velocity)
 
         self.set_scale(scale)
         self.set_rotation(angle)
-        self.set_max_velocity(Photon.VELOCITY, Photon.VELOCITY)
+        self.set_max_velocity(Photon.VELOCITY * Photon._render_scale, Photon.VELOCITY * Photon._render_scale)
+        self.set_time_to_live(time_to_live)
 
     @property
     def radius(self):
-        return int(Photon._COLLISION_RADIUS * self.scale)
+        return int(Photon._COLLISION_RADIUS * self.scale * Photon._render_scale)
 
     def update(self, scene, dt):
         super().update(scene, dt)
 
-        # TODO: At some point might need to think about pooling projectiles for performance
+        if scene.rect.colliderect(self.rect) == False:
+            self.kill()
 
-        self._time_to_live -= dt
+    @classmethod
+    def get_tileset(cls, game):
+        # All weapons share a single tile set so rotated photon frames are shared in the frame cache
+        if cls._tileset is None:
+            cls._tileset = game.image_cache.get_sheet('photon_set_01', Photon.WIDTH, Photon.HEIGHT)
+            cls._render_scale = game.render_scale
 
-        if self._time_to_live <= 0 or scene.rect.colliderect(self.rect) == False:
-            self.kill()
+        return cls._tileset
 
     @classmethod
-    def get_tileset(cls, image_cache):
-        return spritesheet.SpriteSheet(image_cache.get('photon_set_01'), Photon.WIDTH, Photon.HEIGHT)
+    def get_color(cls, image):
+
+        """
+            :param image:   (Surface) Photon tile from get_tileset ()
+            :return:        (int) One of COLOR_*
+        """
+
+        return next((color for color in range(len(cls._tileset)) if cls._tileset[color] is image), Photon.COLOR_GREEN)
 
 
 class SingleShot(PlayerWeapon):
@@ -116,12 +146,15 @@ class SingleShot(PlayerWeapon):
     def __init__(self, game, ship):
         super().__init__(game, ship)
 
-        self._tiles = Photon.get_tileset(game.image_cache)
-        self._last_update = pygame.time.get_ticks()
+        self._tiles = Photon.get_tileset(game)
+        self._cool_down = 0.0
         self._can_fire = True
 
         self._sound = game.audio_cache.get('sfx_laser1')
 
+        # Lasers fire constantly so they are limited and the first sounds to lose their channel
+        game.sound_manager.configure(self._sound, PlayerWeapon.SOUND_MAX_INSTANCES, audio.SoundManager.PRIORITY_LOW)
+
     def can_fire(self):
         return self._can_fire
 
@@ -131,19 +164,20 @@ class SingleShot(PlayerWeapon):
         x = player_ship.rect.centerx
         y = player_ship.rect.centery
 
-        velocity = player_ship.velocity + (player_ship.get_forward_vector() * Photon.VELOCITY)
-        missile = Photon(x, y, self._tiles.get_tile(Photon.COLOR_GREEN), player_ship.scale,
+        velocity = player_ship.velocity + (player_ship.get_forward_vector() * Photon.VELOCITY * player_ship.render_scale)
+        missile = Photon.create(x, y, self._tiles.get_tile(Photon.COLOR_GREEN), player_ship.scale,
                          velocity, player_ship.rotation)
 
-        self._sound.play()
+        self.game.play_sound(self._sound)
 
         return [missile]
 
     def update(self, scene, dt):
-        now = pygame.time.get_ticks()
+        # Cool down time is accumulated from the update time steps so firing is deterministic
+        self._cool_down += dt * 1000.0
 
-        if now - self._last_update >= SingleShot._COOL_DOWN_TIMER:
-            self._last_update = now
+        if self._cool_down >= SingleShot._COOL_DOWN_TIMER:
+            self._cool_down = 0.0
             self._can_fire = True
         else:
             self._can_fire = False
@@ -154,35 +188,37 @@ class DoubleShot(PlayerWeapon):
     def __init__(self, game, ship):
         super().__init__(game, ship)
 
-        self._tiles = Photon.get_tileset(game.image_cache)
+        self._tiles = Photon.get_tileset(game)
         self._sound = game.audio_cache.get('sfx_laser2')
 
+        game.sound_manager.configure(self._sound, PlayerWeapon.SOUND_MAX_INSTANCES, audio.SoundManager.PRIORITY_LOW)
+
     def fire(self):
         player_ship = self.ship
-        velocity = player_ship.velocity + (player_ship.get_forward_vector() * Photon.VELOCITY)
+        velocity = player_ship.velocity + (player_ship.get_forward_vector() * Photon.VELOCITY * player_ship.render_scale)
 
         # FIXME: Don't hardcode the gun positions, since we will have different ships it would be better
         # FIXME: to ask the ship (e.g ship.get_cannon_position (x) )
 
-        mp1 = pygame.math.Vector2(-35, 0)
+        mp1 = pygame.math.Vector2(-35 * player_ship.render_scale, 0)
         mp1.rotate_ip(player_ship.rotation)
 
         mp1.x += player_ship.position.x
         mp1.y += player_ship.position.y
 
-        missile1 = Photon(mp1.x, mp1.y, self._tiles.get_tile(Photon.COLOR_RED), player_ship.scale,
+        missile1 = Photon.create(mp1.x, mp1.y, self._tiles.get_tile(Photon.COLOR_RED), player_ship.scale,
                           velocity, player_ship.rotation)
 
-        mp2 = pygame.math.Vector2(35, 0)
+        mp2 = pygame.math.Vector2(35 * player_ship.render_scale, 0)
         mp2.rotate_ip(player_ship.rotation)
 
         mp2.x += player_ship.position.x
         mp2.y += player_ship.position.y
 
-        missile2 = Photon(mp2.x, mp2.y, self._tiles.get_tile(Photon.COLOR_RED), player_ship.scale,
+        missile2 = Photon.create(mp2.x, mp2.y, self._tiles.get_tile(Photon.COLOR_RED), player_ship.scale,
                           velocity, player_ship.rotation)
 
-        self._sound.play()
+        self.game.play_sound(self._sound)
 
         return [missile1, missile2]
 
@@ -201,7 +237,7 @@ class RadialShot(PlayerWeapon):
     def __init__(self, game, ship):
         super().__init__(game, ship)
 
-        self._tiles = Photon.get_tileset(game.image_cache)
+        self._tiles = Photon.get_tileset(game)
 
         # self._tiles = spritesheet.SpriteSheet (game.image_cache.get ('missile_set'),
         #                                        Missile.MISSILE_WIDTH, Missile.MISSILE_HEIGHT)
@@ -214,12 +250,12 @@ class RadialShot(PlayerWeapon):
             radians = math.radians(angle)
             forward = pygame.math.Vector2(math.cos(radians), -math.sin(radians))
 
-            missile_velocity = player_ship.velocity + (forward * RadialShot.DEFAULT_VELOCITY)
+            missile_velocity = player_ship.velocity + (forward * RadialShot.DEFAULT_VELOCITY * player_ship.render_scale)
 
             x = player_ship.rect.centerx + (forward.x * player_ship.rect.width / 2)
             y = player_ship.rect.centery + (forward.y * player_ship.rect.width / 2)
 
-            missile = Photon(x, y, self._tiles.get_tile(Photon.COLOR_YELLOW), player_ship.scale,
+            missile = Photon.create(x, y, self._tiles.get_tile(Photon.COLOR_YELLOW), player_ship.scale,
                              missile_velocity, angle)
 
             # missiles.append (Missile (x, y, self._tiles.get_tile (0),
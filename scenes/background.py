@@ -9,13 +9,34 @@ _DEBUG_BACKGROUND = False
 class ParallaxScroller(sprite.StaticSprite):
     class Layer(object):
 
-        def __init__(self, tile, speed, width, height, has_alpha):
+        def __init__(self, tile, speed, width, height, has_alpha, disk_cache=None, source_path=None):
 
             self._speed = speed
             self._x_offset = 0
             self._y_offset = 0
             self._velocity = pygame.math.Vector2()
-            self._surface = self._create_layer_surface(tile, width, height, has_alpha)
+            self._has_alpha = has_alpha
+
+            # The tiled layer surface only depends on the source image and screen size so it can be
+            # baked to the disk cache and reused on the next launch
+            if disk_cache is not None and source_path is not None:
+                self._surface = disk_cache.get_or_build(source_path,
+                                                        lambda: self._create_layer_surface(tile, width, height, has_alpha),
+                                                        has_alpha, 'parallax_layer', width, height, tile.get_size())
+            else:
+                self._surface = self._create_layer_surface(tile, width, height, has_alpha)
+
+        @property
+        def has_alpha(self):
+            return self._has_alpha
+
+        @property
+        def offset(self):
+            return self._x_offset, self._y_offset
+
+        def set_offset(self, x_offset, y_offset):
+            self._x_offset = x_offset
+            self._y_offset = y_offset
 
         def set_velocity(self, velocity):
             self._velocity.x = velocity.x * self._speed
@@ -25,9 +46,14 @@ class ParallaxScroller(sprite.StaticSprite):
             background_width = self._surface.get_width()
             background_height = self._surface.get_height()
 
+            x_offset = self._x_offset
+            y_offset = self._y_offset
+
             self._x_offset = (self._x_offset + (self._velocity.x * dt)) % background_width
             self._y_offset = (self._y_offset + (self._velocity.y * dt)) % background_height
 
+            return self._x_offset != x_offset or self._y_offset != y_offset
+
         def draw(self, target_surface):
             background_width = self._surface.get_width()
             background_height = self._surface.get_height()
@@ -81,19 +107,80 @@ class ParallaxScroller(sprite.StaticSprite):
         super().__init__(x, y, pygame.Surface((width, height), pygame.HWSURFACE))
 
         self._layers = []
+        self._active_layer_count = None
+        self._is_drawn = False
 
     def set_velocity(self, velocity):
         for layer in self._layers:
             layer.set_velocity(velocity)
 
-    def add_layer(self, tile, speed, has_alpha=True):
-        self._layers.append(ParallaxScroller.Layer(tile, speed, self.rect.width, self.rect.height, has_alpha))
+    def add_layer(self, tile, speed, has_alpha=True, disk_cache=None, source_path=None):
+
+        """
+            :param tile:            (Surface) Image tiled to fill the layer
+            :param speed:           (float) Scroll speed relative to the scroller velocity
+            :param has_alpha:       (bool) True if the layer is drawn with per pixel alpha
+            :param disk_cache:      (SurfaceDiskCache) Optional cache for the tiled layer surface
+            :param source_path:     (str) Path of the tile image, required when using the disk cache
+        """
+
+        self._layers.append(ParallaxScroller.Layer(tile, speed, self.rect.width, self.rect.height, has_alpha,
+                                                   disk_cache, source_path))
+        self._is_drawn = False
+
+    @property
+    def layer_count(self):
+        return len(self._layers)
+
+    @property
+    def active_layer_count(self):
+        return len(self._layers) if self._active_layer_count is None else self._active_layer_count
+
+    def set_active_layer_count(self, layer_count):
+
+        """
+            Limits drawing to the first layer_count layers (back to front), None draws all layers. With no
+            active layers the background is left black
+        """
+
+        if self._active_layer_count != layer_count:
+            self._active_layer_count = layer_count
+            self._is_drawn = False
+
+    def get_layer_offsets(self):
+
+        """
+            :return:    (list) Scroll offset (x, y) of every layer, e.g to save the background in a snapshot
+        """
+
+        return [layer.offset for layer in self._layers]
+
+    def set_layer_offsets(self, offsets):
+        for layer, offset in zip(self._layers, offsets):
+            layer.set_offset(*offset)
+
+        self._is_drawn = False
 
     def update(self, scene, dt):
+        layers = self._layers[:self.active_layer_count]
+        is_moving = False
 
-        for layer in self._layers:
-            layer.update(scene, dt)
-            layer.draw(self.image)
+        for layer in layers:
+            is_moving |= layer.update(scene, dt)
+
+        # Only redraw the layers when they have scrolled, a stationary background can be left as is. Nothing
+        # is drawn while rendering is disabled (e.g headless replays)
+        if not scene.game.render_enabled:
+            self._is_drawn = False
+        elif is_moving or not self._is_drawn:
+            if not layers or layers[0].has_alpha:
+                self.image.fill((0, 0, 0))
+
+            for layer in layers:
+                layer.draw(self.image)
+
+            self._is_drawn = True
+            self.invalidate()
 
 
 class ScrollingBackground(sprite.StaticSprite):
@@ -124,10 +211,13 @@ class ScrollingBackground(sprite.StaticSprite):
         self.image.blit(self._background, (self._x_offset, self._y_offset - background_height))
         self.image.blit(self._background, (self._x_offset - background_width, self._y_offset - background_height))
 
+        self.invalidate()
+
         super().update(scene, dt)
 
     def set_background(self, tile):
         self._background = self._get_background_surface(tile, self.rect.width, self.rect.height)
+        self.invalidate()
 
     def _get_background_surface(self, tile, width, height):
         rows = int(math.ceil(height / tile.get_height()))
@@ -1,10 +1,22 @@
-import random
+import collections
+import os
 import pygame
 
+from gamelib import ecs
+from gamelib import framecache
+from gamelib import particles
+from gamelib import physics
+from gamelib import profiler
+from gamelib import quality
+from gamelib import rng
 from gamelib import scene
+from gamelib import snapshot
+from gamelib import spatial
 
 from player import ship
+from player import weapons
 from entities import asteroid
+from entities import effects
 from entities import explosion
 from entities import powerup
 from entities import floatingtext
@@ -27,35 +39,96 @@ class GameScene(scene.Scene):
     _SCENE_LAYER_EXPLOSION = 4
     _SCENE_LAYER_HUD = 5
 
-    def __init__(self, game):
+    _COLLISION_CELL_SIZE = 128
+
+    # Entity kinds used by snapshots and network replication, see get_entities ()
+    ENTITY_SHIP = 0
+    ENTITY_ASTEROID = 1
+    ENTITY_POWERUP = 2
+    ENTITY_PHOTON = 3
+    ENTITY_EXPLOSION = 4
+    ENTITY_FLOATING_TEXT = 5
+
+    _SNAPSHOT_FLAG_THRUST = snapshot.Snapshot.FLAG_USER
+    _SNAPSHOT_FLAG_DRAG = snapshot.Snapshot.FLAG_USER << 1
+    _SNAPSHOT_FLAG_SHIELD = snapshot.Snapshot.FLAG_USER << 2
+
+    def __init__(self, game, use_physics_world=False, use_ecs=False, use_particles=True):
         super().__init__(game)
 
+        self._random = game.random('level')
+
+        # Batch all kinematic sprites through a single NumPy integrator instead of per sprite updates
+        if use_physics_world:
+            self.set_physics_world(physics.PhysicsWorld())
+
+        # Explosions and floating text are short lived and plentiful so they can be ECS entities instead
+        # of nodes. The effects world isn't part of snapshots or network replication
+        self._effects_world = None
+
+        if use_ecs:
+            self._effects_world = ecs.World()
+            self.add_world(self._effects_world)
+
+        # Debris, sparks and engine exhaust are particles rather than nodes (they are only emitted while
+        # the scene is being drawn and aren't drawn at all in dirty rectangle mode)
+        self._particles = None
+        self._particle_system = None
+
+        if use_particles and particles.is_available():
+            effects.Factory.init(game)
+
+            self._particle_system = effects.Factory.create_system(GameScene._SCENE_LAYER_EXPLOSION)
+            self._particles = self._particle_system
+            self.add_world(self._particles)
+
+        # Optional caps on the number of explosions and floating texts, the oldest are removed first (see
+        # set_effect_limits ())
+        self._max_explosions = None
+        self._max_floating_texts = None
+        self._explosions = collections.deque()
+        self._floating_texts = collections.deque()
+
+        # Pooled nodes are recycled so the same node can be spawned again while an entry for its previous
+        # life is still queued, every spawn gets a serial and only the entry with the latest serial counts
+        self._effect_serial = 0
+        self._effect_serials = dict()
+
         asteroid.Factory.init(game)
         explosion.Factory.init(game)
         powerup.Factory.init(game)
         floatingtext.Factory.init(game)
 
-        self._score_font = game.load_font('kenvector_future.ttf', 32)
+        # The HUD is laid out for the window resolution and scaled to the render resolution
+        scale = game.render_scale
+
+        self._score_font = game.load_font('kenvector_future.ttf', int(32 * scale))
 
         # self._background = background.ScrollingBackground (0, 0, game.rect.width, game.rect.height,
         #                                                    self.game.image_cache.get ('tiled_background_01'))
 
         self._background = background.ParallaxScroller(0, 0, game.rect.width, game.rect.height)
-        self._background.add_layer(game.image_cache.get('tiled_background_01'), 0.4, False)
-        self._background.add_layer(game.image_cache.get('parallax_layer_02'), 0.6)
-        self._background.add_layer(game.image_cache.get('parallax_layer_01'), 0.8)
+        self.add_background_layer('tiled_background_01', 0.4, False)
+        self.add_background_layer('parallax_layer_02', 0.6)
+        self.add_background_layer('parallax_layer_01', 0.8)
 
         self.add_node(self._background, GameScene._SCENE_LAYER_BACKGROUND)
 
         self._playerShip = ship.Factory.create(ship.Factory.TYPE_RED_VIPER, game.rect.centerx, game.rect.centery, game)
         self.add_node(self._playerShip, GameScene._SCENE_LAYER_PLAYER_SHIP)
 
+        # Additional ships controlled by remote players (see network.server)
+        self._remote_ships = []
+
         self._asteroids = pygame.sprite.Group()
         self._powerups = pygame.sprite.Group()
 
+        self._asteroid_hash = spatial.SpatialHash(int(GameScene._COLLISION_CELL_SIZE * scale))
+        self._powerup_hash = spatial.SpatialHash(int(GameScene._COLLISION_CELL_SIZE * scale))
+
         self._score = 0
 
-        self._score_label = scene.SceneText(game.rect.right - 380, 5, 'SCORE: 00000000',
+        self._score_label = scene.SceneText(game.rect.right - int(380 * scale), int(5 * scale), 'SCORE: 00000000',
                                             self._score_font, (200, 200, 0))
 
         self.add_node(self._score_label, GameScene._SCENE_LAYER_HUD)
@@ -71,31 +144,476 @@ class GameScene(scene.Scene):
 
         # DEBUG - Testing SceneText node
 
-        self._fps_label = scene.SceneText(game.rect.right - 180, game.rect.bottom - 26, 'FPS: 000 OBJ: 0000',
-                                          pygame.font.SysFont('', 26), (100, 100, 100))
+        self._fps_label = scene.SceneText(game.rect.right - int(180 * scale), game.rect.bottom - int(26 * scale), 'FPS: 000 OBJ: 0000',
+                                          game.load_font(None, int(26 * scale)), (100, 100, 100))
 
         self.add_node(self._fps_label, GameScene._SCENE_LAYER_HUD)
 
-        self._stat_label = scene.SceneText(5, game.rect.bottom - 26, '(D)rag: ?, (S)hield: ?',
-                                           pygame.font.SysFont('', 26), (100, 100, 100))
+        self._stat_label = scene.SceneText(int(5 * scale), game.rect.bottom - int(26 * scale), '(D)rag: ?, (S)hield: ?',
+                                           game.load_font(None, int(26 * scale)), (100, 100, 100))
 
         self.add_node(self._stat_label, GameScene._SCENE_LAYER_HUD)
 
+        self._profiler_overlay = None
+
         # DEBUG
 
     def update(self, dt):
+        if self._particles is not None and self._particles.enabled != self.game.render_enabled:
+            self._particles.set_enabled(self.game.render_enabled)
+
         super().update(dt)
 
         # Set the background scroll velocity based on the ships velocity
         self._background.set_velocity(self._playerShip.velocity * -1)
 
+        frame_profiler = self.game.profiler
+
+        if frame_profiler:
+            frame_profiler.begin('collisions')
+
         self.check_collisions(dt)
 
+        if frame_profiler:
+            frame_profiler.end('collisions')
+
         self._score_label.set_text('SCORE: {0:08d}'.format(self._score))
         self._fps_label.set_text('FPS: {0:03d} OBJ: {1:04d}'.format(int(self.game.fps), self.object_count))
         self._stat_label.set_text('(D)rag={0}, (S)hield={1}'.format(self._playerShip._has_drag, self._playerShip._has_shield))
 
+    def add_background_layer(self, tag, speed, has_alpha=True):
+        image_cache = self.game.image_cache
+
+        self._background.add_layer(image_cache.get_scaled(tag), speed, has_alpha,
+                                   image_cache.disk_cache, image_cache.get_path(tag))
+
+    def _get_state(self):
+        return self._score, len(self._asteroids), len(self._powerups)
+
+    @property
+    def player_ship(self):
+        return self._playerShip
+
+    @property
+    def player_ships(self):
+        return [self._playerShip] + self._remote_ships
+
+    def add_remote_ship(self, ship_type=ship.Factory.TYPE_RED_VIPER):
+
+        """
+            Adds another player ship to the scene, its projectiles hit asteroids like the player ships
+
+            :param ship_type:   (int) One of ship.Factory.TYPE_*
+            :return:            (PlayerShip) New ship at the center of the scene
+        """
+
+        remote_ship = ship.Factory.create(ship_type, self.game.rect.centerx, self.game.rect.centery, self.game)
+
+        self.add_node(remote_ship, GameScene._SCENE_LAYER_PLAYER_SHIP)
+        self._remote_ships.append(remote_ship)
+
+        return remote_ship
+
+    def remove_remote_ship(self, remote_ship):
+        if remote_ship in self._remote_ships:
+            self._remote_ships.remove(remote_ship)
+            remote_ship.kill()
+
+    def get_entities(self):
+
+        """
+            :return:    (list) (kind, subtype, node) of every dynamic sprite in draw order, kind is one of
+                        ENTITY_* and the subtype the ship, asteroid, power-up, photon color or explosion type
+        """
+
+        entities = []
+
+        for node in self._nodes:
+            entity_type = GameScene.__get_entity_type(node)
+
+            if entity_type is not None:
+                entities.append(entity_type + (node,))
+
+        return entities
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def asteroid_count(self):
+        return len(self._asteroids)
+
+    @property
+    def background(self):
+        return self._background
+
+    def save_snapshot(self, compress=False):
+
+        """
+            Saves the simulation state of the scene (ship, asteroids, power-ups, photons, explosions, floating
+            text, score, background scroll and random streams) as a compact binary snapshot, e.g for rollback,
+            crash recovery or benchmark fixtures. Sprites are stored in draw order so a restored scene updates
+            (and checksums) exactly like the original
+
+            :param compress:    (bool) zlib compress the snapshot
+            :return:            (bytes) Encoded snapshot, see restore_snapshot ()
+        """
+
+        data = snapshot.Snapshot()
+
+        for node in self._nodes:
+            record = self.__get_snapshot_record(node)
+
+            if record is not None:
+                kind, subtype, flags, text, extra = record
+                data.add_sprite(kind, subtype, node, node.scene_layer, flags, text, extra)
+
+        data.values.append(self._score)
+
+        for x_offset, y_offset in self._background.get_layer_offsets():
+            data.values.extend((x_offset, y_offset))
+
+        data.random_state = rng.RandomStreams.instance().get_state()
+
+        return data.to_bytes(compress)
+
+    def restore_snapshot(self, data):
+
+        """
+            Replaces the simulation state of the scene with a snapshot from save_snapshot (). The dynamic
+            sprites are recreated through their factories (pooled sprites are recycled) and the random
+            streams are restored last so creating the sprites doesn't affect the numbers drawn afterwards
+
+            :param data:    (bytes) Snapshot from save_snapshot ()
+        """
+
+        state = snapshot.Snapshot.from_bytes(data)
+
+        for node in self._nodes.sprites():
+            if self.__get_snapshot_record(node) is not None:
+                node.kill()
+
+        if self._effects_world is not None:
+            self._effects_world.clear()
+
+        if self._particles is not None:
+            self._particles.clear()
+
+        self.__clear_effects(self._explosions)
+        self.__clear_effects(self._floating_texts)
+
+        for record in state.records:
+            node = self.__create_snapshot_node(record)
+
+            self.add_node(node, record.layer)
+            node.set_snapshot_state(*record.state)
+
+        self._score = int(state.values[0])
+        self._background.set_layer_offsets(zip(state.values[1::2], state.values[2::2]))
+
+        self._asteroid_hash.rebuild(self._asteroids)
+        self._powerup_hash.rebuild(self._powerups)
+
+        rng.RandomStreams.instance().set_state(state.random_state)
+
+    def __get_snapshot_record(self, node):
+        # Returns the kind, subtype, flags, text and extra value of a node or None if it isn't saved (remote
+        # ships belong to their network connections so they are left out)
+
+        entity_type = GameScene.__get_entity_type(node)
+
+        if entity_type is None or node in self._remote_ships:
+            return None
+
+        kind, subtype = entity_type
+
+        if kind == GameScene.ENTITY_SHIP:
+            flags = GameScene._SNAPSHOT_FLAG_THRUST if node.thrust else 0
+            flags |= GameScene._SNAPSHOT_FLAG_DRAG if node.has_drag else 0
+            flags |= GameScene._SNAPSHOT_FLAG_SHIELD if node.has_shield else 0
+
+            return kind, subtype, flags, None, 0.0
+        elif kind == GameScene.ENTITY_FLOATING_TEXT:
+            r, g, b = node.color[0:3]
+            return kind, subtype, 0, node.text, float((r << 16) | (g << 8) | b)
+
+        return kind, subtype, 0, None, 0.0
+
+    @staticmethod
+    def __get_entity_type(node):
+        if isinstance(node, ship.PlayerShip):
+            return GameScene.ENTITY_SHIP, node.ship_type
+        elif isinstance(node, asteroid.Asteroid):
+            return GameScene.ENTITY_ASTEROID, node.asteroid_type
+        elif isinstance(node, powerup.PowerUp):
+            return GameScene.ENTITY_POWERUP, node.powerup_type
+        elif isinstance(node, weapons.Photon):
+            return GameScene.ENTITY_PHOTON, weapons.Photon.get_color(node.frames[0])
+        elif isinstance(node, explosion.Explosion):
+            return GameScene.ENTITY_EXPLOSION, explosion.Factory.get_type(node.frames)
+        elif isinstance(node, floatingtext.FloatingText):
+            return GameScene.ENTITY_FLOATING_TEXT, 0
+
+        return None
+
+    def __create_snapshot_node(self, record):
+        kind = record.kind
+        x, y = record.state[0:2]
+
+        if kind == GameScene.ENTITY_SHIP:
+            if self._playerShip.ship_type != record.subtype:
+                self._playerShip = ship.Factory.create(record.subtype, x, y, self.game)
+
+            self._playerShip.set_thrust(bool(record.flags & GameScene._SNAPSHOT_FLAG_THRUST))
+            self._playerShip.set_drag_enabled(bool(record.flags & GameScene._SNAPSHOT_FLAG_DRAG))
+            self._playerShip.set_shield(bool(record.flags & GameScene._SNAPSHOT_FLAG_SHIELD))
+
+            return self._playerShip
+        elif kind == GameScene.ENTITY_ASTEROID:
+            node = asteroid.Factory.create(x, y, record.subtype)
+            self._asteroids.add(node)
+        elif kind == GameScene.ENTITY_POWERUP:
+            node = powerup.Factory.create(x, y, record.subtype)
+            self._powerups.add(node)
+        elif kind == GameScene.ENTITY_PHOTON:
+            node = weapons.Photon.create(x, y, weapons.Photon.get_tileset(self.game).get_tile(record.subtype), 1.0,
+                                         pygame.math.Vector2(), 0)
+            self._playerShip.projectiles.add(node)
+        elif kind == GameScene.ENTITY_EXPLOSION:
+            node = explosion.Factory.create(x, y, record.subtype)
+        elif kind == GameScene.ENTITY_FLOATING_TEXT:
+            color = int(record.extra)
+            node = floatingtext.Factory.create(x, y, record.text, (color >> 16, (color >> 8) & 0xff, color & 0xff))
+        else:
+            raise ValueError('Unknown snapshot record kind ({0})'.format(kind))
+
+        return node
+
+    def spawn_asteroids(self, count, asteroid_type=None):
+
+        """
+            Adds asteroids at random positions in the scene
+
+            :param count:           (int) Number of asteroids to add
+            :param asteroid_type:   (int) One of Asteroid.TYPE_* or None for random types
+        """
+
+        for n in range(count):
+            x = self._random.randrange(self.game.rect.width)
+            y = self._random.randrange(self.game.rect.height)
+
+            a = asteroid.Factory.create(x, y, asteroid_type)
+
+            self.add_node(a, GameScene._SCENE_LAYER_ASTEROID)
+            self._asteroids.add(a)
+
+    def clear_asteroids(self):
+        for a in self._asteroids:
+            a.kill()
+
+    @property
+    def effects_world(self):
+        return self._effects_world
+
+    @property
+    def particles(self):
+        return self._particles
+
+    def set_dirty_rect_mode(self, enabled, max_dirty_area=scene.Scene.DEFAULT_MAX_DIRTY_AREA, clear_color=(0, 0, 0)):
+
+        """
+            Particles aren't tracked for dirty rectangles so they are turned off while dirty rectangle mode is
+            enabled (an ECS effects world can't be used in dirty rectangle mode at all)
+        """
+
+        if self._particle_system is not None and enabled and self._effects_world is None:
+            self.__set_particles_installed(False)
+
+        super().set_dirty_rect_mode(enabled, max_dirty_area, clear_color)
+
+        if self._particle_system is not None and not enabled:
+            self.__set_particles_installed(True)
+
+    def __set_particles_installed(self, installed):
+        if installed == (self._particles is not None):
+            return
+
+        if installed:
+            self._particles = self._particle_system
+            self.add_world(self._particles)
+        else:
+            self._particles.clear()
+            self.remove_world(self._particles)
+            self._particles = None
+
+        for player_ship in self.player_ships:
+            player_ship.set_thrust_emitter(effects.Factory.create_thrust_emitter(self._particles)
+                                           if installed else None)
+
+    def add_node(self, node, scene_layer=-1):
+        super().add_node(node, scene_layer)
+
+        if self._particles is not None and isinstance(node, ship.PlayerShip):
+            node.set_thrust_emitter(effects.Factory.create_thrust_emitter(self._particles))
+
+        # Asteroids and power-ups outside the viewport keep moving (and power-ups keep expiring) every tick
+        # but aren't animated or transformed. Throttles only apply once a viewport is set (see
+        # Scene.set_viewport ()) so the default full scene view pays nothing for them
+        if isinstance(node, (asteroid.Asteroid, powerup.PowerUp)):
+            node.set_update_throttle(scene.Scene.Node.UPDATE_PHYSICS)
+
+    def spawn_explosion(self, x, y):
+
+        """
+            :return:    (tuple) Explosion (node or entity id in the effects world) and the sound to play
+        """
+
+        if self._effects_world is not None:
+            exp, sound = explosion.Factory.create_entity(self._effects_world, x, y, GameScene._SCENE_LAYER_EXPLOSION)
+        else:
+            exp = explosion.Factory.create(x, y)
+            sound = exp.sound
+
+            self.add_node(exp, GameScene._SCENE_LAYER_EXPLOSION)
+
+        if self._max_explosions is not None:
+            self.__limit_effects(self._explosions, exp, self._max_explosions)
+
+        return exp, sound
+
+    def spawn_floating_text(self, x, y, text, color):
+        if self._effects_world is not None:
+            text = floatingtext.Factory.create_entity(self._effects_world, x, y, text, color,
+                                                      GameScene._SCENE_LAYER_HUD)
+        else:
+            text = floatingtext.Factory.create(x, y, text, color)
+            self.add_node(text, GameScene._SCENE_LAYER_HUD)
+
+        if self._max_floating_texts is not None:
+            self.__limit_effects(self._floating_texts, text, self._max_floating_texts)
+
+        return text
+
+    def set_effect_limits(self, max_explosions=None, max_floating_texts=None):
+
+        """
+            Caps the number of explosions and floating texts shown at once (the oldest are removed to make
+            room), e.g to keep the frame time down on slow machines. Random numbers are drawn for every
+            effect whether it is shown or not so the game plays the same
+
+            :param max_explosions:      (int) Maximum number of explosions or None for no limit
+            :param max_floating_texts:  (int) Maximum number of floating texts or None for no limit
+        """
+
+        self._max_explosions = max_explosions
+        self._max_floating_texts = max_floating_texts
+
+        if max_explosions is None:
+            self.__clear_effects(self._explosions)
+
+        if max_floating_texts is None:
+            self.__clear_effects(self._floating_texts)
+
+    def get_quality_steps(self):
+
+        """
+            :return:    (QualityStep[]) Ways to lower the rendering quality of the scene, least noticeable
+                        first, for a QualityGovernor
+        """
+
+        frame_cache = framecache.FrameCache.instance()
+        angle_step = frame_cache.angle_step
+
+        steps = [
+            quality.QualityStep('effect limits (32 explosions, 16 texts)',
+                                lambda: self.set_effect_limits(32, 16), lambda: self.set_effect_limits()),
+            quality.QualityStep('rotation angle step {0}'.format(angle_step * 3),
+                                lambda: frame_cache.set_angle_step(angle_step * 3),
+                                lambda: frame_cache.set_angle_step(angle_step)),
+            quality.QualityStep('animation frame skip', lambda: self.set_animation_frame_step(2),
+                                lambda: self.set_animation_frame_step(1)),
+            quality.QualityStep('unfiltered rotation', lambda: frame_cache.set_smooth(False),
+                                lambda: frame_cache.set_smooth(True)),
+        ]
+
+        # Drop the background layers front to back, the back layer is always drawn
+        layer_count = self._background.layer_count
+
+        for count in range(layer_count - 1, 0, -1):
+            steps.append(quality.QualityStep('background layers {0}'.format(count),
+                                             lambda count=count: self._background.set_active_layer_count(count),
+                                             lambda count=count: self._background.set_active_layer_count(
+                                                 count + 1 if count + 1 < layer_count else None)))
+
+        steps.append(quality.QualityStep('effect limits (8 explosions, 4 texts)',
+                                         lambda: self.set_effect_limits(8, 4), lambda: self.set_effect_limits(32, 16)))
+
+        return steps
+
+    def set_animation_frame_step(self, frame_step):
+
+        """
+            :param frame_step:  (int) Animation frames advanced at a time (2 skips every other frame)
+        """
+
+        sprite.LinearFrameAnimator.set_frame_step(frame_step)
+
+        if self._effects_world is not None:
+            for system in self._effects_world.systems:
+                if isinstance(system, ecs.AnimationSystem):
+                    system.frame_step = frame_step
+
+    def __limit_effects(self, spawned, effect, max_count):
+        self._effect_serial += 1
+        self._effect_serials[effect] = self._effect_serial
+
+        # Only effects that are still alive count towards the limit, entries for effects that have expired
+        # (or been recycled for this spawn) are dropped wherever they are in the queue
+        live = [entry for entry in spawned if self.__is_effect_alive(entry)]
+
+        if len(live) < len(spawned):
+            self.__clear_effects(spawned)
+
+            for entry in live:
+                self._effect_serials[entry[0]] = entry[1]
+
+            spawned.extend(live)
+
+        spawned.append((effect, self._effect_serial))
+
+        while len(spawned) > max_count:
+            oldest, serial = spawned.popleft()
+            del self._effect_serials[oldest]
+
+            if isinstance(oldest, int):
+                self._effects_world.destroy(oldest)
+            else:
+                oldest.kill()
+
+    def __clear_effects(self, spawned):
+        for effect, serial in spawned:
+            if self._effect_serials.get(effect) == serial:
+                del self._effect_serials[effect]
+
+        spawned.clear()
+
+    def __is_effect_alive(self, entry):
+        effect, serial = entry
+
+        if self._effect_serials.get(effect) != serial:
+            return False
+
+        if isinstance(effect, int):
+            return self._effects_world.is_alive(effect)
+
+        return effect.alive()
+
     def check_collisions(self, dt):
+        # Bring the broad phase up to date with this frames positions before running any checks
+        self._asteroid_hash.rebuild(self._asteroids)
+        self._powerup_hash.rebuild(self._powerups)
+
         # self.check_asteroid_collisions (dt)
         self.check_player_collisions(dt)
         self.check_projectile_collisions(dt)
@@ -103,60 +621,73 @@ class GameScene(scene.Scene):
 
     def check_asteroid_collisions(self, dt):
         for asteroid in self._asteroids:
-            collisions = pygame.sprite.spritecollide(asteroid, self._asteroids, False, pygame.sprite.collide_circle)
-            for colliding_asteroid in collisions:
-                if asteroid is not colliding_asteroid:
-                    colliding_asteroid.reflect()
+            for colliding_asteroid in self._asteroid_hash.query_node(asteroid):
+                colliding_asteroid.reflect()
 
     def check_player_collisions(self, dt):
-        # TODO: Check for player + asteroid collisions
+        # TODO: Decide what happens when a ship hits an asteroid, there is no damage or lives model yet so the
+        # asteroids found by the broad phase are not acted on
         # TODO: Check for player + powerup collisions here too instead of in check_powerup_collisions ()
-        pass
+        for player_ship in self.player_ships:
+            colliding_asteroids = self._asteroid_hash.query_node(player_ship)
 
     def check_projectile_collisions(self, dt):
-        for projectile in self._playerShip.projectiles:
-            colliding_asteroids = pygame.sprite.spritecollide(projectile, self._asteroids, False, pygame.sprite.collide_circle)
+        for player_ship in self.player_ships:
+            self.__check_projectile_collisions(player_ship.projectiles)
+
+    def __check_projectile_collisions(self, projectiles):
+        for projectile in projectiles:
+            colliding_asteroids = self._asteroid_hash.query_node(projectile)
 
             if colliding_asteroids:
                 projectile.kill()
 
                 for asteroid in colliding_asteroids:
-                    exp = explosion.Factory.create(asteroid.rect.centerx, asteroid.rect.centery)
-                    self.add_node(exp, GameScene._SCENE_LAYER_EXPLOSION)
+                    self.__destroy_asteroid(asteroid)
+
+    def __destroy_asteroid(self, asteroid):
+        # Explodes the asteroid, breaks it into shards, maybe drops a power-up and scores it
+        _, sound = self.spawn_explosion(asteroid.rect.centerx, asteroid.rect.centery)
+
+        if self._particles is not None:
+            effects.Factory.emit_asteroid_debris(self._particles, asteroid.position.x, asteroid.position.y,
+                                                 asteroid.radius, asteroid.velocity)
 
-                    asteroid_shards = asteroid.get_shards()
+        asteroid_shards = asteroid.get_shards()
 
-                    if asteroid_shards:
-                        self.add_nodes(asteroid_shards, GameScene._SCENE_LAYER_ASTEROID)
-                        self._asteroids.add(asteroid_shards)
+        if asteroid_shards:
+            self.add_nodes(asteroid_shards, GameScene._SCENE_LAYER_ASTEROID)
+            self._asteroids.add(asteroid_shards)
+            self._asteroid_hash.insert_all(asteroid_shards)
 
-                    if random.randint(1, 10) == 5:
-                        p = powerup.Factory.create(asteroid.rect.centerx, asteroid.rect.centery)
-                        self.add_node(p, GameScene._SCENE_LAYER_POWERUP)
-                        self._powerups.add(p)
+        if self._random.randint(1, 10) == 5:
+            p = powerup.Factory.create(asteroid.rect.centerx, asteroid.rect.centery)
+            self.add_node(p, GameScene._SCENE_LAYER_POWERUP)
+            self._powerups.add(p)
+            self._powerup_hash.insert(p)
 
-                    text = floatingtext.Factory.create(asteroid.position.x, asteroid.position.y,
-                                                       '+{0}'.format(asteroid.score), (200, 200, 0))
+        self.spawn_floating_text(asteroid.position.x, asteroid.position.y, '+{0}'.format(asteroid.score),
+                                 (200, 200, 0))
 
-                    self.add_node(text, GameScene._SCENE_LAYER_HUD)
-                    self._score += asteroid.score
+        self._score += asteroid.score
 
-                    exp.sound.play()
-                    asteroid.kill()
+        self.game.play_sound(sound)
+        asteroid.kill()
+        self._asteroid_hash.remove(asteroid)
 
     def check_powerup_collisions(self, dt):
 
         # TODO - Apply powerup to player
-        collisions = pygame.sprite.spritecollide(self._playerShip, self._powerups, False, pygame.sprite.collide_circle)
+        for player_ship in self.player_ships:
+            collisions = self._powerup_hash.query_node(player_ship)
 
-        for powerup in collisions:
-            text = floatingtext.Factory.create(powerup.position.x, powerup.position.y,
-                                               powerup.config.name, powerup.config.text_color)
+            for powerup in collisions:
+                self.spawn_floating_text(powerup.position.x, powerup.position.y, powerup.config.name,
+                                         powerup.config.text_color)
 
-            self.add_node(text, GameScene._SCENE_LAYER_HUD)
-
-            powerup.config.sound.play()
-            powerup.kill()
+                self.game.play_sound(powerup.config.sound)
+                powerup.kill()
+                self._powerup_hash.remove(powerup)
 
     def on_key_down(self, key, event):
 
@@ -196,6 +727,10 @@ class GameScene(scene.Scene):
             self._playerShip.kill()
             self._playerShip = ship.YellowHawk(self.game.rect.centerx, self.game.rect.centery, self.game)
             self.add_node(self._playerShip, GameScene._SCENE_LAYER_PLAYER_SHIP)
+        elif key == pygame.K_F3:
+            self.toggle_profiler_overlay()
+        elif key == pygame.K_F4:
+            self.dbg_export_profile()
         elif key == pygame.K_q:
             self.game.quit()
 
@@ -219,6 +754,23 @@ class GameScene(scene.Scene):
 
         pass
 
+    def toggle_profiler_overlay(self):
+
+        if self._profiler_overlay is None:
+            if self.game.profiler is None:
+                self.game.set_profiler(profiler.FrameProfiler())
+
+            self._profiler_overlay = profiler.ProfilerOverlay(5, 45, self.game.profiler)
+            self.add_node(self._profiler_overlay, GameScene._SCENE_LAYER_HUD)
+        else:
+            self._profiler_overlay.kill()
+            self._profiler_overlay = None
+
+    def dbg_export_profile(self):
+        if self.game.profiler:
+            self.game.profiler.export_chrome_trace(os.path.join(self.game.root_path, 'profile_trace.json'))
+            self.game.profiler.export_json_lines(os.path.join(self.game.root_path, 'profile_frames.jsonl'))
+
     def dbg_spawn_asteroids(self):
         # DEBUG - Create some random asteroids for testing
 
@@ -230,14 +782,7 @@ class GameScene(scene.Scene):
         ]
 
         for asteroid_type in asteroid_types:
-            for n in range(0, 3):
-                x = random.randrange(self.game.rect.width)
-                y = random.randrange(self.game.rect.height)
-
-                a = asteroid.Factory.create(x, y, asteroid_type)
-
-                self.add_node(a, GameScene._SCENE_LAYER_ASTEROID)
-                self._asteroids.add(a)
+            self.spawn_asteroids(3, asteroid_type)
 
         # x = random.randrange (game.rect.width)
         # y = random.randrange (game.rect.height)
@@ -0,0 +1,258 @@
+"""
+    Batch simulation runner
+
+    Runs many independent headless GameScene episodes across CPU cores, each with its own seed and
+    input policy, and aggregates per episode score, tick counts and timing into a single JSON report.
+
+    Usage: python -m simulation.batch [--episodes N] [--processes N] [--ticks N] [--policy random|spin|idle]
+                                      [--seed N] [--render] [--output report.json]
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+# The report can go to stdout so pygame mustn't print its banner there (set before pygame is imported, spawned
+# workers inherit it)
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import spacerocks
+
+from scenes import level
+from simulation import policies
+
+
+class Episode(object):
+    """
+        Configuration of one episode, sent to a worker process so it must stay picklable
+    """
+
+    def __init__(self, index, seed, policy, ticks):
+
+        """
+            :param index:   (int) Episode number
+            :param seed:    (int) Game seed
+            :param policy:  (str|InputPolicy) Policy name (see policies.create_policy ()) or policy
+            :param ticks:   (int) Number of simulation ticks to run
+        """
+
+        self.index = index
+        self.seed = seed
+        self.policy = policy
+        self.ticks = ticks
+
+
+# Each worker process builds a single game (decoding assets is far more expensive than an episode)
+# and runs all of its episodes on fresh scenes
+_worker_game = None
+
+
+def _init_worker(render):
+    global _worker_game
+
+    # SDL turns SIGTERM into a quit event by default, which would stop Pool.terminate () from ending workers
+    os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1'
+
+    _worker_game = spacerocks.Spacerocks(headless=True)
+    _worker_game.set_render_enabled(render)
+
+
+def _init_worker_process(render):
+    # Workers return their results through the pool, anything the game prints goes to stderr so it can't end
+    # up in a report written to stdout
+    sys.stdout = sys.stderr
+
+    _init_worker(render)
+
+
+def run_episode(episode):
+
+    """
+        Runs an episode on the worker's game
+
+        :param episode:     (Episode) Episode to run
+        :return:            (dict) Episode results
+    """
+
+    game = _worker_game
+
+    game.set_seed(episode.seed)
+
+    policy = episode.policy
+
+    if isinstance(policy, str):
+        policy = policies.create_policy(policy, episode.seed)
+
+    scene = level.GameScene(game)
+    game.set_active_scene(scene)
+    game.set_input_source(policy)
+
+    max_object_count = 0
+    frame_times = []
+
+    start_time = time.perf_counter()
+
+    try:
+        for tick in range(episode.ticks):
+            frame_start = time.perf_counter()
+
+            game.step()
+
+            frame_times.append(time.perf_counter() - frame_start)
+            max_object_count = max(max_object_count, scene.object_count)
+    finally:
+        game.set_input_source(None)
+
+    elapsed = time.perf_counter() - start_time
+
+    result = {
+        'episode': episode.index,
+        'seed': episode.seed,
+        'ticks': episode.ticks,
+        'score': scene.score,
+        'asteroid_count': scene.asteroid_count,
+        'max_object_count': max_object_count,
+        'elapsed_seconds': elapsed,
+        'ticks_per_second': episode.ticks / elapsed if elapsed else 0.0,
+        'mean_frame_ms': sum(frame_times) / len(frame_times) * 1000.0 if frame_times else 0.0,
+        'max_frame_ms': max(frame_times) * 1000.0 if frame_times else 0.0,
+        'checksum': scene.get_state_checksum().hex(),
+        'pid': os.getpid(),
+    }
+
+    result.update(policy.describe())
+
+    # Return pooled sprites before the next episode's scene replaces this one
+    scene.clear()
+
+    return result
+
+
+class BatchRunner(object):
+
+    DEFAULT_EPISODES = 8
+    DEFAULT_TICKS = 1800
+
+    def __init__(self, processes=None, render=False):
+
+        """
+            :param processes:   (int) Number of worker processes, None for one per CPU core, 1 to run the
+                                episodes in this process
+            :param render:      (bool) Draw every frame (e.g when used as a load generator)
+        """
+
+        self._processes = processes or os.cpu_count() or 1
+        self._render = render
+
+    @property
+    def processes(self):
+        return self._processes
+
+    @staticmethod
+    def create_episodes(count, ticks, policy, seed=0):
+
+        """
+            :return:    (Episode[]) Episodes with consecutive seeds starting at seed
+        """
+
+        return [Episode(index, seed + index, policy, ticks) for index in range(count)]
+
+    def run(self, episodes):
+
+        """
+            :param episodes:    (Episode[]) Episodes to run
+            :return:            (dict) Aggregated report
+        """
+
+        start_time = time.perf_counter()
+
+        if self._processes == 1:
+            _init_worker(self._render)
+            results = [run_episode(episode) for episode in episodes]
+        else:
+            # Spawned (not forked) workers so each gets a clean pygame and SDL state
+            context = multiprocessing.get_context('spawn')
+
+            with context.Pool(self._processes, _init_worker_process, (self._render,)) as pool:
+                results = pool.map(run_episode, episodes, chunksize=1)
+
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - start_time
+
+        return BatchRunner.get_report(results, elapsed, self._processes, self._render)
+
+    @staticmethod
+    def get_report(results, elapsed, processes, render):
+        total_ticks = sum(result['ticks'] for result in results)
+        episode_seconds = sum(result['elapsed_seconds'] for result in results)
+
+        by_policy = dict()
+
+        for result in results:
+            by_policy.setdefault(result['policy'], []).append(result)
+
+        return {
+            'timestamp': time.time(),
+            'python': sys.version.split()[0],
+            'episodes': len(results),
+            'processes': processes,
+            'render': render,
+            'wall_seconds': elapsed,
+            'total_ticks': total_ticks,
+            'ticks_per_second': total_ticks / elapsed if elapsed else 0.0,
+            'parallel_speedup': episode_seconds / elapsed if elapsed else 0.0,
+            'score': BatchRunner.get_stats([result['score'] for result in results]),
+            'policies': {name: {'episodes': len(policy_results),
+                                'score': BatchRunner.get_stats([result['score'] for result in policy_results]),
+                                'ticks_per_second': BatchRunner.get_stats([result['ticks_per_second'] for result in policy_results])}
+                         for name, policy_results in by_policy.items()},
+            'results': results,
+        }
+
+    @staticmethod
+    def get_stats(values):
+        if not values:
+            return {}
+
+        return {
+            'mean': statistics.mean(values),
+            'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+            'min': min(values),
+            'max': max(values),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Spacerocks batch simulation runner')
+    parser.add_argument('--episodes', type=int, default=BatchRunner.DEFAULT_EPISODES)
+    parser.add_argument('--processes', type=int, help='Worker processes (default: one per CPU core)')
+    parser.add_argument('--ticks', type=int, default=BatchRunner.DEFAULT_TICKS, help='Simulation ticks per episode')
+    parser.add_argument('--policy', choices=policies.POLICY_NAMES, default='random')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first episode, the others follow on')
+    parser.add_argument('--render', action='store_true', help='Draw every frame')
+    parser.add_argument('--output', help='Write the JSON report to a file instead of stdout')
+
+    args = parser.parse_args(argv)
+
+    # Anything the game prints while running goes to stderr so a report written to stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        runner = BatchRunner(args.processes, args.render)
+        report = runner.run(BatchRunner.create_episodes(args.episodes, args.ticks, args.policy, args.seed))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+    Reinforcement learning style environments
+
+    SpacerocksEnv wraps a GameScene and the PlayerShip controls in a reset () / step () / observe ()
+    interface, VectorEnv steps several environments in lockstep in one process. Scenes are updated
+    directly (no events, drawing or frame pacing) with batched physics, observations are read straight
+    from the PhysicsWorld arrays.
+
+    Actions are integer arrays of ACTION_SIZE values:
+
+        [thrust (0 or 1), rotate (-1 left, 0 or 1 right), fire primary (0 or 1), fire secondary (0 or 1)]
+
+    Observations are (max_objects, OBSERVATION_COLUMNS) float32 arrays, one row per object: the player ship
+    first then the other objects nearest first, unused rows are zero (OBJECT_NONE). Positions are
+    fractions of the scene size and velocities scene widths per second so observations don't depend on
+    the render resolution. The heading (fraction of a turn) is only set for the ship.
+
+    Note: Requires NumPy
+"""
+
+import numpy
+
+import spacerocks
+
+from entities import asteroid
+from entities import powerup
+from gamelib import rng
+from player import ship
+from player import weapons
+from scenes import level
+
+
+ACTION_SIZE = 4
+
+ACTION_THRUST = 0
+ACTION_ROTATE = 1
+ACTION_FIRE_PRIMARY = 2
+ACTION_FIRE_SECONDARY = 3
+
+OBSERVATION_COLUMNS = 6
+
+COLUMN_TYPE = 0
+COLUMN_X = 1
+COLUMN_Y = 2
+COLUMN_VX = 3
+COLUMN_VY = 4
+COLUMN_HEADING = 5
+
+OBJECT_NONE = 0
+OBJECT_SHIP = 1
+OBJECT_PROJECTILE = 2
+OBJECT_POWERUP = 3
+OBJECT_ASTEROID = 4             # Asteroids are OBJECT_ASTEROID + Asteroid.TYPE_* (tiny to large)
+
+
+def create_game():
+
+    """
+        :return:    (Spacerocks) Headless game with rendering disabled for environments to share
+    """
+
+    game = spacerocks.Spacerocks(headless=True)
+    game.set_render_enabled(False)
+
+    return game
+
+
+class SpacerocksEnv(object):
+    """
+        Single environment, several environments can share a game (each owns its own scene and random
+        state, see VectorEnv)
+    """
+
+    DEFAULT_MAX_OBJECTS = 64
+    DEFAULT_MAX_TICKS = 3600
+    DEFAULT_FRAME_SKIP = 4
+
+    _OBJECT_CLASSES = [(ship.PlayerShip, OBJECT_SHIP), (weapons.Photon, OBJECT_PROJECTILE),
+                       (weapons.Missile, OBJECT_PROJECTILE), (powerup.PowerUp, OBJECT_POWERUP),
+                       (asteroid.Asteroid, OBJECT_ASTEROID)]
+
+    _object_types = {}          # Sprite class -> object type
+
+    def __init__(self, game, max_objects=DEFAULT_MAX_OBJECTS, max_ticks=DEFAULT_MAX_TICKS,
+                 frame_skip=DEFAULT_FRAME_SKIP, seed=0):
+
+        """
+            :param game:            (Game) Headless game, e.g from create_game ()
+            :param max_objects:     (int) Number of rows in each observation (including the ship)
+            :param max_ticks:       (int) Simulation ticks before an episode is truncated
+            :param frame_skip:      (int) Simulation ticks per step, the action is repeated each tick
+            :param seed:            (int) Seed of the first episode, later episodes count on from it
+        """
+
+        self._game = game
+        self._max_objects = max_objects
+        self._max_ticks = max_ticks
+        self._frame_skip = max(1, frame_skip)
+        self._next_seed = seed
+
+        self._dt = 1.0 / (game.tick_rate or spacerocks.Spacerocks.TICK_RATE)
+
+        self._scene = None
+        self._random_state = None
+        self._seed = None
+        self._ticks = 0
+        self._episode_reward = 0
+
+        self._observation = numpy.zeros((max_objects, OBSERVATION_COLUMNS), numpy.float32)
+
+        rect = game.rect
+        self._position_scale = numpy.array([1.0 / rect.width, 1.0 / rect.height])
+        self._velocity_scale = 1.0 / rect.width
+
+    @property
+    def scene(self):
+        return self._scene
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def ticks(self):
+        return self._ticks
+
+    @property
+    def observation_shape(self):
+        return self._observation.shape
+
+    def reset(self, seed=None, out=None):
+
+        """
+            Starts a new episode on a fresh scene
+
+            :param seed:    (int) Episode seed or None for the next seed
+            :param out:     (ndarray) Array to write the observation to, None to use the env's own array
+            :return:        (ndarray) First observation
+        """
+
+        if seed is None:
+            seed = self._next_seed
+
+        self._next_seed = seed + 1
+        self._seed = seed
+
+        self.close()
+
+        streams = rng.RandomStreams.instance()
+        streams.set_seed(seed)
+
+        self._scene = level.GameScene(self._game, use_physics_world=True)
+        self._random_state = streams.get_state()
+
+        self._ticks = 0
+        self._episode_reward = 0
+
+        return self.observe(out)
+
+    def step(self, action, out=None):
+
+        """
+            Applies an action and advances the scene frame_skip ticks
+
+            :param action:  Sequence of ACTION_SIZE integers
+            :param out:     (ndarray) Array to write the observation to, None to use the env's own array
+            :return:        (tuple) observation, reward (score gained), terminated (no asteroids left),
+                            truncated (max_ticks reached), info
+        """
+
+        scene = self._scene
+        player_ship = scene.player_ship
+
+        player_ship.set_thrust(bool(action[ACTION_THRUST]))
+        player_ship.rotate(int(action[ACTION_ROTATE]))
+
+        score = scene.score
+
+        # The random streams are process wide so swap this episode's state in for the update
+        streams = rng.RandomStreams.instance()
+        streams.set_state(self._random_state)
+
+        if action[ACTION_FIRE_PRIMARY]:
+            player_ship.fire_weapon(ship.PlayerShip.PRIMARY_WEAPON)
+
+        if action[ACTION_FIRE_SECONDARY]:
+            player_ship.fire_weapon(ship.PlayerShip.SECONDARY_WEAPON)
+
+        for tick in range(self._frame_skip):
+            scene.update(self._dt)
+
+        self._random_state = streams.get_state()
+        self._ticks += self._frame_skip
+
+        reward = scene.score - score
+        self._episode_reward += reward
+
+        terminated = scene.asteroid_count == 0
+        truncated = self._ticks >= self._max_ticks
+
+        info = {'seed': self._seed, 'ticks': self._ticks, 'score': scene.score}
+
+        return self.observe(out), reward, terminated, truncated, info
+
+    def observe(self, out=None):
+
+        """
+            :param out:     (ndarray) Array to write the observation to, None to use the env's own array
+            :return:        (ndarray) (max_objects, OBSERVATION_COLUMNS) observation of the current scene
+        """
+
+        observation = self._observation if out is None else out
+        observation.fill(0)
+
+        world = self._scene.physics_world
+        bodies = world.bodies
+
+        types = numpy.fromiter(map(SpacerocksEnv.__get_object_type, bodies), numpy.int8, len(bodies))
+
+        positions = world.positions * self._position_scale
+        velocities = world.velocities * self._velocity_scale
+
+        player_ship = self._scene.player_ship
+        ship_body = bodies.index(player_ship)
+
+        observation[0, COLUMN_TYPE] = OBJECT_SHIP
+        observation[0, COLUMN_X:COLUMN_Y + 1] = positions[ship_body]
+        observation[0, COLUMN_VX:COLUMN_VY + 1] = velocities[ship_body]
+        observation[0, COLUMN_HEADING] = (player_ship.rotation % 360.0) / 360.0
+
+        # Keep the objects nearest the ship when there are more than fit in the observation
+        objects = numpy.flatnonzero(types > OBJECT_SHIP)
+        distances = numpy.square(positions[objects] - positions[ship_body]).sum(axis=1)
+        objects = objects[numpy.argsort(distances, kind='stable')[:self._max_objects - 1]]
+
+        count = len(objects)
+
+        observation[1:count + 1, COLUMN_TYPE] = types[objects]
+        observation[1:count + 1, COLUMN_X:COLUMN_Y + 1] = positions[objects]
+        observation[1:count + 1, COLUMN_VX:COLUMN_VY + 1] = velocities[objects]
+
+        return observation
+
+    def close(self):
+        if self._scene is not None:
+            self._scene.clear()
+            self._scene = None
+
+    @staticmethod
+    def __get_object_type(sprite):
+        sprite_class = type(sprite)
+        object_type = SpacerocksEnv._object_types.get(sprite_class)
+
+        if object_type is None:
+            object_type = next((object_type for base_class, object_type in SpacerocksEnv._OBJECT_CLASSES
+                                if issubclass(sprite_class, base_class)), OBJECT_NONE)
+
+            SpacerocksEnv._object_types[sprite_class] = object_type
+
+        if object_type == OBJECT_ASTEROID:
+            return OBJECT_ASTEROID + sprite.asteroid_type
+
+        return object_type
+
+
+class VectorEnv(object):
+    """
+        Steps several SpacerocksEnv instances sharing one game in lockstep. Observations, rewards and flags
+        are returned as stacked arrays and finished episodes are reset automatically (the step's info
+        for that environment holds the final score)
+    """
+
+    def __init__(self, count, game=None, seed=0, **kwargs):
+
+        """
+            :param count:   (int) Number of environments
+            :param game:    (Game) Headless game to share or None to create one
+            :param seed:    (int) Seed of the first environment's first episode, the environments use
+                            consecutive seeds and each environment counts on by count seeds per episode
+            :param kwargs:  Options passed to each SpacerocksEnv
+        """
+
+        self._game = game or create_game()
+        self._envs = [SpacerocksEnv(self._game, seed=seed + index, **kwargs) for index in range(count)]
+
+        self._count = count
+        self._observations = numpy.zeros((count,) + self._envs[0].observation_shape, numpy.float32)
+        self._rewards = numpy.zeros(count, numpy.float32)
+        self._terminated = numpy.zeros(count, bool)
+        self._truncated = numpy.zeros(count, bool)
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def envs(self):
+        return self._envs
+
+    @property
+    def game(self):
+        return self._game
+
+    def reset(self):
+
+        """
+            :return:    (ndarray) (count, max_objects, OBSERVATION_COLUMNS) observations
+        """
+
+        for index, env in enumerate(self._envs):
+            env.reset(out=self._observations[index])
+
+        return self._observations
+
+    def step(self, actions):
+
+        """
+            :param actions:     (count, ACTION_SIZE) integer array, one action per environment
+            :return:            (tuple) observations, rewards, terminated, truncated, infos
+        """
+
+        infos = []
+
+        for index, env in enumerate(self._envs):
+            observation, reward, terminated, truncated, info = env.step(actions[index], self._observations[index])
+
+            if terminated or truncated:
+                info['final_score'] = info['score']
+                env.reset(env.seed + self._count, out=observation)
+
+            self._rewards[index] = reward
+            self._terminated[index] = terminated
+            self._truncated[index] = truncated
+
+            infos.append(info)
+
+        return self._observations, self._rewards, self._terminated, self._truncated, infos
+
+    def close(self):
+        for env in self._envs:
+            env.close()
@@ -0,0 +1,206 @@
+import abc
+import random
+import pygame
+
+
+class InputPolicy(abc.ABC):
+    """
+        Base class for automated players. A policy is used as the game's input source (see
+        Game.set_input_source ()) and generates the key events a player would press. Ticks passed to
+        get_events () are counted from the first tick the policy sees so a policy can be attached at any
+        point of a game
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._start_tick = None
+
+    @property
+    def name(self):
+        return self._name
+
+    def get_events(self, tick):
+        if self._start_tick is None:
+            self._start_tick = tick
+
+        return self._get_events(tick - self._start_tick)
+
+    @abc.abstractmethod
+    def _get_events(self, tick):
+        """
+            :param tick:    (int) Ticks since the policy was attached
+            :return:        (Event[]) Events to handle before the tick
+        """
+
+        pass
+
+    def describe(self):
+        return {'policy': self._name}
+
+    @staticmethod
+    def key_event(event_type, key):
+        return pygame.event.Event(event_type, key=key, mod=0)
+
+
+class RandomPolicy(InputPolicy):
+    """
+        Mashes the controls: every decision interval the policy picks a new thrust and rotate state and
+        fires with a given probability
+    """
+
+    DEFAULT_DECISION_INTERVAL = 10
+    DEFAULT_FIRE_PROBABILITY = 0.5
+    DEFAULT_SECONDARY_PROBABILITY = 0.05
+
+    _ROTATE_KEYS = [None, pygame.K_LEFT, pygame.K_RIGHT]
+
+    def __init__(self, seed, decision_interval=DEFAULT_DECISION_INTERVAL, fire_probability=DEFAULT_FIRE_PROBABILITY,
+                 secondary_probability=DEFAULT_SECONDARY_PROBABILITY, name='random'):
+
+        """
+            :param seed:                    (int) Seed of the policy's own random number generator
+            :param decision_interval:       (int) Ticks between changes of the controls
+            :param fire_probability:        (float) Chance of firing the primary weapon at each decision
+            :param secondary_probability:   (float) Chance of firing the secondary weapon at each decision
+            :param name:                    (str) Name used in reports
+        """
+
+        super().__init__(name)
+
+        self._seed = seed
+        self._random = random.Random(seed)
+        self._decision_interval = max(1, decision_interval)
+        self._fire_probability = fire_probability
+        self._secondary_probability = secondary_probability
+
+        self._thrust = False
+        self._rotate_key = None
+
+    def _get_events(self, tick):
+        if tick % self._decision_interval:
+            return []
+
+        events = []
+
+        thrust = self._random.random() < 0.5
+
+        if thrust != self._thrust:
+            events.append(InputPolicy.key_event(pygame.KEYDOWN if thrust else pygame.KEYUP, pygame.K_UP))
+            self._thrust = thrust
+
+        rotate_key = self._random.choice(RandomPolicy._ROTATE_KEYS)
+
+        if rotate_key != self._rotate_key:
+            if self._rotate_key is not None:
+                events.append(InputPolicy.key_event(pygame.KEYUP, self._rotate_key))
+
+            if rotate_key is not None:
+                events.append(InputPolicy.key_event(pygame.KEYDOWN, rotate_key))
+
+            self._rotate_key = rotate_key
+
+        # Weapons fire when the key is released
+        if self._random.random() < self._fire_probability:
+            events.append(InputPolicy.key_event(pygame.KEYDOWN, pygame.K_SPACE))
+            events.append(InputPolicy.key_event(pygame.KEYUP, pygame.K_SPACE))
+
+        if self._random.random() < self._secondary_probability:
+            events.append(InputPolicy.key_event(pygame.KEYDOWN, pygame.K_x))
+            events.append(InputPolicy.key_event(pygame.KEYUP, pygame.K_x))
+
+        return events
+
+    def describe(self):
+        return {
+            'policy': self._name,
+            'seed': self._seed,
+            'decision_interval': self._decision_interval,
+            'fire_probability': self._fire_probability,
+            'secondary_probability': self._secondary_probability,
+        }
+
+
+class ScriptedPolicy(InputPolicy):
+    """
+        Plays back a fixed script of (tick, event type, key) entries, optionally looping every
+        loop_ticks ticks. Scripts are plain lists so policies can be pickled and sent to worker processes
+    """
+
+    def __init__(self, script, loop_ticks=None, name='scripted'):
+
+        """
+            :param script:      (list) (tick, event type, key) entries, e.g (0, pygame.KEYDOWN, pygame.K_LEFT)
+            :param loop_ticks:  (int) Length of the loop or None to play the script once
+            :param name:        (str) Name used in reports
+        """
+
+        super().__init__(name)
+
+        self._script = sorted(script, key=lambda entry: entry[0])
+        self._loop_ticks = loop_ticks
+
+        self._events = dict()
+
+        for tick, event_type, key in self._script:
+            self._events.setdefault(tick, []).append((event_type, key))
+
+    @classmethod
+    def from_log(cls, log, name='scripted'):
+
+        """
+            Creates a script from the key events of a recorded InputLog (see gamelib.replay)
+        """
+
+        script = [(tick, event.type, event.key) for tick, event in log.events
+                  if event.type in (pygame.KEYDOWN, pygame.KEYUP)]
+
+        start_tick = script[0][0] if script else 0
+
+        return ScriptedPolicy([(tick - start_tick, event_type, key) for tick, event_type, key in script], name=name)
+
+    def _get_events(self, tick):
+        if self._loop_ticks:
+            tick %= self._loop_ticks
+
+        return [InputPolicy.key_event(event_type, key) for event_type, key in self._events.get(tick, [])]
+
+    def describe(self):
+        return {'policy': self._name, 'script_length': len(self._script), 'loop_ticks': self._loop_ticks}
+
+
+def create_spin_policy():
+
+    """
+        Turns slowly in place firing a burst every quarter second
+    """
+
+    script = [(0, pygame.KEYDOWN, pygame.K_LEFT)]
+
+    for tick in range(0, 120, 15):
+        script.append((tick, pygame.KEYDOWN, pygame.K_SPACE))
+        script.append((tick, pygame.KEYUP, pygame.K_SPACE))
+
+    script.append((119, pygame.KEYUP, pygame.K_LEFT))
+
+    return ScriptedPolicy(script, loop_ticks=120, name='spin')
+
+
+def create_policy(name, seed):
+
+    """
+        :param name:    (str) One of POLICY_NAMES
+        :param seed:    (int) Episode seed (only used by random policies)
+        :return:        (InputPolicy) New policy
+    """
+
+    if name == 'random':
+        return RandomPolicy(seed)
+    elif name == 'spin':
+        return create_spin_policy()
+    elif name == 'idle':
+        return ScriptedPolicy([], name='idle')
+
+    raise ValueError('Unknown policy: {0}'.format(name))
+
+
+POLICY_NAMES = ['random', 'spin', 'idle']
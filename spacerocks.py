@@ -25,10 +25,19 @@
 """
 
 
+import argparse
+import json
 import os
+import sys
+import time
 import pygame
 
+from gamelib import atlas
+from gamelib import diskcache
 from gamelib import game
+from gamelib import pacing
+from gamelib import quality
+from gamelib import replay
 from scenes import level
 
 
@@ -36,7 +45,8 @@ class Spacerocks (game.Game):
 
     WINDOW_TITLE = 'Space Rocks'
 
-    # TODO: Scale all game objects based on resolution
+    # The game is designed for the first resolution, the others can be used as the internal render
+    # resolution (everything is scaled by Game.render_scale and the frame is upscaled to the window)
 
     SCREEN_RESOLUTIONS = [(1920, 1080), (1280, 720), (854, 480)]
 
@@ -46,27 +56,147 @@ class Spacerocks (game.Game):
     SCREEN_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
 
     FPS = 100
+    TICK_RATE = 60
+
+    ASSET_LOADER_THREADS = 4
+
+    CACHE_DIRECTORY = '.cache'
+
+    ATLAS_PAGE_SIZE = 2048
+
+    def __init__(self, headless=None, render_resolution=None, seed=None, frame_pacing=None, fps=FPS):
+
+        """
+            :param headless:            (bool) Run without a window or audio output
+            :param render_resolution:   (tuple) Internal render resolution (e.g one of SCREEN_RESOLUTIONS),
+                                        None to render at the window resolution
+            :param seed:                (int) Random seed, None to choose one
+            :param frame_pacing:        (str) How to wait for the next frame (FramePacer.MODE_*), None to sleep
+            :param fps:                 (int) Maximum frames per second
+        """
 
-    def __init__(self):
         super().__init__(Spacerocks.SCREEN_WIDTH, Spacerocks.SCREEN_HEIGHT,
-                         Spacerocks.WINDOW_TITLE, Spacerocks.FPS)
+                         Spacerocks.WINDOW_TITLE, fps, Spacerocks.TICK_RATE,
+                         headless=headless, root_path=os.path.dirname(os.path.abspath(__file__)),
+                         render_size=render_resolution, seed=seed, frame_pacing=frame_pacing)
+
+        self._print_pacing_stats = False
+
+        # Decoded images (and other surfaces built from them) are baked to disk for faster restarts
+        self.image_cache.set_disk_cache(diskcache.SurfaceDiskCache(os.path.join(self.root_path, Spacerocks.CACHE_DIRECTORY)))
+
+        # Sprite sheets are trimmed and packed into a few large atlas pages as each factory requests them
+        self.image_cache.set_atlas(atlas.TextureAtlas(Spacerocks.ATLAS_PAGE_SIZE))
+
+        # Images are only decoded when first used (several large backgrounds are never used) while all
+        # sounds are needed up front so they are decoded in parallel
 
-        self.image_cache.load(self.get_assets_path('images'))
-        self.audio_cache.load(self.get_assets_path('sounds'))
+        self.image_cache.load(self.get_assets_path('images'), lazy=True)
+        self.audio_cache.load(self.get_assets_path('sounds'), workers=Spacerocks.ASSET_LOADER_THREADS)
+
+        self._fonts = dict()
 
         self._scene = level.GameScene(self)
 
         self.set_active_scene(self._scene)
 
     def load_font(self, filename, size):
-        path = self.get_assets_path('fonts')
 
-        return pygame.font.Font(os.path.join(path, filename), size)
+        """
+            Fonts are shared so scenes created for every episode (see simulation) reuse their glyph atlases
+
+            :param filename:    (str) Font file in the fonts folder or None for the pygame default font
+            :param size:        (int) Font size
+        """
+
+        font = self._fonts.get((filename, size))
+
+        if font is None:
+            font = pygame.font.Font(os.path.join(self.get_assets_path('fonts'), filename) if filename else None, size)
+            self._fonts[(filename, size)] = font
+
+        return font
+
+    def set_print_pacing_stats(self, print_pacing_stats):
+        self._print_pacing_stats = print_pacing_stats
 
     def on_quit(self):
+        if self._print_pacing_stats:
+            print(json.dumps(self.get_frame_pacing_stats(), indent=2))
+
         return True
 
 
+def parse_resolution(text):
+
+    """
+        :param text:    (str) Resolution as WIDTHxHEIGHT, e.g 1280x720
+        :return:        (tuple) Width and height
+    """
+
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected a resolution as WIDTHxHEIGHT, e.g 1280x720')
+
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError('Resolution must be positive: {0}'.format(text))
+
+    return width, height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Space Rocks')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('--record', help='Record input to a file (written when the game quits)')
+    parser.add_argument('--replay', help='Re-run a recorded input file headless and verify its final state')
+    parser.add_argument('--fps', type=int, default=Spacerocks.FPS, help='Maximum frames per second')
+    parser.add_argument('--pacing', choices=pacing.FramePacer.MODES,
+                        help='How to wait for the next frame (default sleep)')
+    parser.add_argument('--render-resolution', type=parse_resolution, metavar='WxH',
+                        help='Internal render resolution upscaled to the window, e.g {0}x{1} (replays use the '
+                             'resolution they were recorded at)'.format(*Spacerocks.SCREEN_RESOLUTIONS[1]))
+    parser.add_argument('--pacing-stats', action='store_true',
+                        help='Print frame time jitter and missed deadline statistics on exit')
+    parser.add_argument('--frame-budget', type=float,
+                        help='Lower the rendering quality when frames take longer than this many milliseconds')
+
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        log = replay.InputLog.load(args.replay)
+
+        # Replays run at the resolution they were recorded at (older logs don't store it)
+        if args.render_resolution and log.render_size and tuple(log.render_size) != args.render_resolution:
+            parser.error('{0} was recorded at a render resolution of {1}x{2}, drop --render-resolution to use it'
+                         .format(args.replay, *log.render_size))
+
+        app = Spacerocks(headless=True, render_resolution=log.render_size or args.render_resolution, seed=log.seed)
+
+        start = time.perf_counter()
+        matches = app.replay(log)
+        elapsed = time.perf_counter() - start
+
+        print('Replayed {0} ticks in {1:.2f}s ({2:.0f} ticks/s), checksum {3}'.format(
+            log.tick_count, elapsed, log.tick_count / elapsed if elapsed else 0.0, 'OK' if matches else 'MISMATCH'))
+
+        return 0 if matches else 1
+
+    app = Spacerocks(render_resolution=args.render_resolution, seed=args.seed, frame_pacing=args.pacing,
+                     fps=args.fps)
+    app.set_print_pacing_stats(args.pacing_stats)
+
+    if args.record:
+        app.start_recording(args.record)
+    elif args.frame_budget:
+        # Not while recording, some quality steps change sprite sizes (and so the recorded game state)
+        governor = quality.QualityGovernor(args.frame_budget)
+        governor.add_steps(app.active_scene.get_quality_steps())
+
+        app.set_quality_governor(governor)
+
+    app.run()
+
+
 if __name__ == "__main__":
-    app = Spacerocks()
-    app.run()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file